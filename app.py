@@ -1,9 +1,21 @@
 # app.py
+import time
 import streamlit as st
-from modules.config_loader import load_configs
-from modules.k8s_utils import *
-from modules.llm_analyzer import LLMAnalyzer
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.config_loader import (
+    load_configs, load_collector_config, load_metrics_config, load_rules_config, load_store_config
+)
+from modules.llm_analyzer import get_llm_analyzer
+from modules.grouping import group_abnormal_pods
+from modules.change_tracker import CHANGED, NEW, RESOLVED, failure_state, get_change_tracker, pod_key
+from modules.pod_logs import close_diagnostic_data, diagnostic_preview
+from modules.search_index import get_search_index
+from modules.pod_table import paged_table
+from modules.node_rollup import build_rollup, concentrated_nodes, format_digest, rollup_rows
+from modules import metrics
+from modules.snapshot_store import (
+    ABNORMAL_PODS, APPLICATIONS, DEFAULT_MAX_AGE, SUMMARY, get_snapshot_store
+)
+from modules.result_store import get_result_store
 
 st.set_page_config(
     layout="wide",
@@ -14,7 +26,26 @@ st.set_page_config(
 
 # 初始化配置
 clusters, llm_config = load_configs()
-analyzer = LLMAnalyzer(llm_config)
+# 配置按文件修改时间缓存、分析器按配置共享，页面重跑不重复解析与构建
+analyzer = get_llm_analyzer(llm_config, load_rules_config())
+# 后台采集进程（python -m modules.collector）写入的快照，页面优先读取
+collector_config = load_collector_config()
+snapshot_store = get_snapshot_store(collector_config)
+snapshot_max_age = collector_config.get("max_age", DEFAULT_MAX_AGE)
+# 扫描结果与诊断数据在各会话之间共享，会话中只保存对共享记录的引用
+store_config = load_store_config()
+result_store = get_result_store(store_config)
+# Prometheus 指标端点，进程内只启动一次
+metrics_config = load_metrics_config()
+if metrics_config.get("enabled", True):
+    metrics.start_metrics_server(
+        metrics_config.get("port", metrics.DEFAULT_METRICS_PORT),
+        metrics_config.get("host", metrics.DEFAULT_METRICS_HOST)
+    )
+
+def snapshot_caption(created_at: float) -> str:
+    return (f"📦 数据来自 {time.strftime('%H:%M:%S', time.localtime(created_at))} 的后台采集快照，"
+            "点击刷新获取实时数据")
 
 # 页面布局
 st.title("K8s 集群诊断工具")
@@ -37,6 +68,57 @@ with st.sidebar:
     else:
         selected_cluster = None
 
+    force_refresh = False
+    if selected_function != "集群概览":
+        force_refresh = st.checkbox("🔁 忽略分析缓存", help="跳过本地规则，重新调用LLM分析并覆盖缓存结果")
+
+# kubernetes 客户端导入较慢，放在标题与侧边栏导航渲染之后，冷启动时页面先出现
+from modules.k8s_utils import *
+from modules.informer import (
+    DEFAULT_CACHE_IDLE_SECONDS, cache_stats, get_cluster_cache, peek_cluster_cache, set_cache_idle_seconds
+)
+from modules.k8s_client import get_pool_stats
+from modules.pipeline import DiagnosisPipeline
+from modules.cluster_scan import scan_clusters
+# 集群 informer 缓存不计入共享结果存储的内存上限，闲置超时后停止并释放
+set_cache_idle_seconds(store_config.get("cluster_cache_idle_seconds", DEFAULT_CACHE_IDLE_SECONDS))
+
+with st.sidebar:
+    with st.expander("连接池"):
+        pool_stats = get_pool_stats()
+        if pool_stats:
+            st.dataframe(pool_stats, hide_index=True)
+        else:
+            st.caption("暂无已建立的集群连接")
+
+    if analyzer.cache is not None:
+        with st.expander("分析缓存"):
+            st.json(analyzer.cache.stats())
+
+    with st.expander("性能"):
+        k8s_rows = metrics.k8s_summary()
+        st.caption("Kubernetes API")
+        if k8s_rows:
+            st.dataframe(k8s_rows, hide_index=True)
+        else:
+            st.caption("暂无请求")
+        llm_rows = metrics.llm_summary()
+        st.caption("LLM")
+        if llm_rows:
+            st.dataframe(llm_rows, hide_index=True)
+        else:
+            st.caption("暂无请求")
+        st.caption("LLM 端点")
+        st.dataframe(analyzer.pool.stats(), hide_index=True)
+        st.caption("共享结果存储")
+        st.json(result_store.stats(), expanded=False)
+        st.caption("集群缓存（不计入共享结果存储的内存上限）")
+        st.dataframe(cache_stats(), hide_index=True)
+        rule_rows = metrics.rule_summary()
+        if rule_rows:
+            st.caption("本地规则命中")
+            st.dataframe(rule_rows, hide_index=True)
+
 # ==========================
 # 公共逻辑：集群连接
 # ==========================
@@ -45,21 +127,171 @@ if selected_function != "集群概览" and selected_cluster != "请选择一个
     
     if 'prev_cluster' not in st.session_state or st.session_state.prev_cluster != selected_cluster:
         with st.spinner(f"正在连接集群 {selected_cluster}..."):
-            st.session_state.api_client = create_k8s_client(
-                current_cluster["api_url"],
-                current_cluster["token"]
-            )
+            st.session_state.api_client = get_api_client(current_cluster)
+            # 集群缓存在首次需要实时数据时才启动，读取快照时不访问 apiserver
+            st.session_state.cluster_cache = peek_cluster_cache(selected_cluster)
             st.session_state.prev_cluster = selected_cluster
             
             states_to_clear = [
-                'pods', 'all_applications',
+                'pods', 'pods_changes', 'pods_partial', 'all_applications', 'pods_snapshot_at', 'apps_snapshot_at', 'apps_kind_errors',
                 'exploring_app', 'exploring_app_name', 'exploring_namespace', 'exploring_app_kind',
-                'app_search_term', 'selected_app_option'
+                'app_search_term', 'selected_app_option',
+                'batch_running', 'batch_results'
             ]
             for state in states_to_clear:
                 if state in st.session_state:
                     del st.session_state[state]
 
+def live_cluster_cache():
+    """启动（或复用）当前集群的 informer 缓存，用于实时扫描"""
+    cache = st.session_state.get('cluster_cache')
+    if cache is None or cache.stopped:
+        with st.spinner(f"正在同步集群 {selected_cluster} 的资源缓存..."):
+            # 集群配置变更后客户端会重建，旧客户端上的缓存已停止，按当前配置重新获取
+            st.session_state.api_client = get_api_client(current_cluster)
+            cache = get_cluster_cache(selected_cluster, st.session_state.api_client)
+            cache.wait_for_sync(timeout=30)
+            st.session_state.cluster_cache = cache
+    cache.touch()
+    return cache
+
+# ==========================
+# Pod 表格与诊断详情（fragment：选择行只重跑表格，诊断只重跑详情）
+# ==========================
+@st.fragment
+def pod_detail(pod, group=None, tracker=None):
+    st.markdown(f"**{pod['namespace']} / {pod['pod_name']}** · `{pod['status']}` · 重启 {pod.get('restart_count', 0)} 次")
+    cluster_cache = st.session_state.get('cluster_cache')
+    if pod.get("uid") and cluster_cache is not None and cluster_cache.has_synced():
+        owner_chain = cluster_cache.topology.owner_chain(pod["uid"])
+        if owner_chain:
+            st.caption("所属控制器: " + " → ".join(f"{kind}/{name}" for kind, _, name in owner_chain))
+    if group is not None and group["replicas"] > 1:
+        st.caption(
+            f"诊断代表Pod {pod['pod_name']}，同组其余Pod: "
+            + "、".join(p["pod_name"] for p in group["pods"] if p is not pod)
+        )
+
+    if not st.button("🔍 诊断", type="primary", key=f"diag_{pod['namespace']}_{pod['pod_name']}"):
+        return
+    # 故障状态（重启次数、原因）自上次诊断后未变化时直接复用，不再收集诊断数据
+    previous = tracker.analysis_for(pod) if tracker is not None and not force_refresh else None
+    if previous is not None:
+        with st.expander("💡 AI分析结果", expanded=True):
+            st.caption("♻️ Pod 故障状态自上次诊断后没有变化，沿用上次的分析结果，勾选侧边栏「忽略分析缓存」可重新诊断")
+            st.markdown(previous)
+        return
+    # 故障状态相同的诊断数据在时限内各会话共用，不再重复读取日志与事件
+    payload_key = (selected_cluster, pod_key(pod), failure_state(pod))
+    diagnostic_data = None if force_refresh else result_store.get_payload(payload_key)
+    if diagnostic_data is None:
+        with st.spinner("收集诊断信息中..."):
+            diagnostic_data = get_pod_diagnostic_data(
+                st.session_state.api_client,
+                pod["namespace"],
+                pod["pod_name"]
+            )
+        if "error" not in diagnostic_data:
+            result_store.put_payload(payload_key, diagnostic_data)
+
+    if "error" in diagnostic_data:
+        close_diagnostic_data(diagnostic_data)
+        st.error(diagnostic_data["error"])
+        return
+    if diagnostic_data.get("part_errors"):
+        st.warning("部分诊断数据未能获取: " + "、".join(diagnostic_data["part_errors"]))
+    with st.expander("📜 原始数据"):
+        st.json(diagnostic_preview(diagnostic_data))
+
+    with st.expander("💡 AI分析结果", expanded=True):
+        analysis = analyzer.stream_analysis(diagnostic_data, force_refresh=force_refresh)
+        if analysis["rule"]:
+            st.caption("⚙️ 命中本地诊断规则，未调用 LLM，勾选侧边栏「忽略分析缓存」可改由 LLM 分析")
+        elif analysis["cached"]:
+            st.caption("⚡ 结果来自分析缓存，勾选侧边栏「忽略分析缓存」可重新分析")
+        content = st.write_stream(analysis["stream"])
+    if tracker is not None and not analysis["failed"]:
+        tracker.record_analysis(pod, content)
+
+CHANGE_LABELS = {NEW: "🆕 新增", CHANGED: "🔁 变化"}
+
+@st.fragment
+def abnormal_group_browser(groups, tracker):
+    rows = []
+    for group in groups:
+        pod = group["representative"]
+        reason = group["reason"] or group["status"]
+        if group["exit_code"] is not None:
+            reason += f" (exit {group['exit_code']})"
+        if group["top_event_reason"]:
+            reason += f" · {group['top_event_reason']}"
+        changes = {tracker.change_of(p) for p in group["pods"]}
+        rows.append({
+            "namespace": group["namespace"],
+            "workload": pod["pod_name"] if group["owner_kind"] == "Pod" else f"{group['owner_kind']}/{group['owner_name']}",
+            "status": group["status"],
+            "reason": reason,
+            "replicas": group["replicas"],
+            "restart_count": pod.get("restart_count", 0),
+            "change": CHANGE_LABELS[NEW] if NEW in changes else CHANGE_LABELS.get(CHANGED if CHANGED in changes else None, ""),
+            "diagnosed": "✅" if tracker.analysis_for(pod) is not None else "",
+            "group": group
+        })
+    row = paged_table(
+        rows,
+        {"namespace": "命名空间", "workload": "工作负载", "status": "状态", "reason": "原因",
+         "replicas": "Pod数", "restart_count": "重启次数", "change": "变化", "diagnosed": "已诊断"},
+        key="abnormal_groups",
+        default_sort="replicas",
+        row_key=lambda row: (row["namespace"], row["workload"], row["status"], row["reason"])
+    )
+    if row is None:
+        st.caption("在表格中选择一行查看详情并诊断")
+        return
+    pod_detail(row["group"]["representative"], row["group"], tracker)
+
+@st.fragment
+def node_rollup_panel(pods):
+    """异常 Pod 按节点聚合后整体分析一次：节点故障导致的大面积异常不必逐个 Pod 诊断"""
+    suspects = concentrated_nodes(pods)
+    with st.expander("🧭 节点关联分析", expanded=bool(suspects)):
+        if suspects:
+            st.warning(f"异常Pod集中在节点 {', '.join(suspects[:5])}，可能是节点层面的故障，建议先做集群级分析")
+        if not st.button("🧭 集群级根因分析", key="node_rollup"):
+            st.caption("按节点聚合异常Pod并读取节点状况，只调用一次 LLM 给出整体判断")
+            return
+        with st.spinner("读取节点状况中..."):
+            cache = st.session_state.get('cluster_cache')
+            health = get_node_health(
+                st.session_state.api_client,
+                {pod["node"] for pod in pods if pod.get("node")},
+                cache=cache if cache is not None and cache.has_synced() else None
+            )
+        rollup = build_rollup(pods, health)
+        st.dataframe(
+            rollup_rows(rollup),
+            column_config={"node": "节点", "pods": "异常Pod", "suspect": "可疑", "problems": "节点状况",
+                           "taints": "污点", "reasons": "原因", "namespaces": "命名空间"},
+            hide_index=True
+        )
+        analysis = analyzer.stream_incident_summary(format_digest(rollup, analyzer.prompt_budget), force_refresh)
+        if analysis["cached"]:
+            st.caption("⚡ 结果来自分析缓存，勾选侧边栏「忽略分析缓存」可重新分析")
+        st.write_stream(analysis["stream"])
+
+@st.fragment
+def application_pod_browser(pod_list):
+    row = paged_table(
+        pod_list,
+        {"namespace": "命名空间", "pod_name": "Pod", "status": "状态", "restart_count": "重启次数"},
+        key="application_pods",
+        default_sort="restart_count"
+    )
+    if row is None:
+        st.caption("在表格中选择一行查看详情并诊断")
+        return
+    pod_detail(row)
+
 # ==========================
 # 页面状态清理逻辑
 # ==========================
@@ -70,9 +302,11 @@ if st.session_state.active_function != selected_function:
     st.session_state.active_function = selected_function
 
     states_to_clear = [
-        'pods', 'all_applications', 'cluster_stats',
+        'pods', 'pods_changes', 'pods_partial', 'all_applications', 'cluster_stats', 'cluster_stats_snapshot_at',
+        'pods_snapshot_at', 'apps_snapshot_at', 'apps_kind_errors',
         'apps_cluster', 'apps_error', 'pods_error',
-        'exploring_app', 'exploring_app_name', 'exploring_namespace', 'exploring_app_kind'
+        'exploring_app', 'exploring_app_name', 'exploring_namespace', 'exploring_app_kind',
+        'batch_running', 'batch_results'
     ]
     for state in states_to_clear:
         if state in st.session_state:
@@ -87,82 +321,219 @@ if selected_function == "异常Pod诊断":
         st.stop()
 
     refresh_flag = False
-    col1, col2 = st.columns([4, 1])
+    col1, col2, col3 = st.columns([3, 1, 1])
     with col2:
         if st.button('🔄 刷新列表'):
             refresh_flag = True
             if 'pods' in st.session_state:
                 del st.session_state.pods  # 修正后的行
+    with col3:
+        if st.session_state.get('batch_running'):
+            # 点击取消会触发重跑，正在执行的批量诊断随之停止
+            if st.button('⏹ 取消批量诊断'):
+                st.session_state.batch_running = False
+        elif st.button('🩺 诊断全部'):
+            st.session_state.batch_running = True
+            st.rerun()
+
+    # 按集群对比相邻两次扫描，故障状态未变化的 Pod 复用上次的诊断结果
+    tracker = get_change_tracker(selected_cluster)
 
     if 'pods' not in st.session_state or refresh_flag or st.session_state.get('pods_cluster') != selected_cluster:
-        with st.spinner("正在获取集群状态..."):
-            try:
-                st.session_state.pods = get_non_running_pods(st.session_state.api_client)
-                st.session_state.pods_cluster = selected_cluster
-                st.session_state.pods_error = None
-            except Exception as e:
-                st.session_state.pods_error = f"集群连接失败: {str(e)}"
-                st.session_state.pods = []
+        # 其他会话或后台采集已有的结果直接共用，只有刷新或没有可用结果时才实时扫描
+        shared = None if refresh_flag else result_store.latest(snapshot_store, selected_cluster, ABNORMAL_PODS, snapshot_max_age)
+        if shared is not None:
+            st.session_state.pods = shared["items"]
+            st.session_state.pods_changes = tracker.update(shared["items"], shared["created_at"])
+            st.session_state.pods_snapshot_at = shared["created_at"]
+            st.session_state.pods_partial = False
+            st.session_state.pods_cluster = selected_cluster
+            st.session_state.pods_error = None
+        else:
+            with st.spinner("正在获取集群状态..."):
+                try:
+                    scanned = get_non_running_pods(st.session_state.api_client, cache=live_cluster_cache())
+                    # 与后台采集一致，在扫描时写入各 Pod 最主要的事件原因，随快照共享
+                    add_top_event_reasons(st.session_state.api_client, scanned)
+                    if scanned.partial:
+                        # 不完整的结果只在本会话展示，不写入快照，也不据此判定 Pod 已恢复
+                        st.session_state.pods = tuple(scanned)
+                        st.session_state.pods_changes = tracker.update(scanned, partial=True)
+                    else:
+                        shared = result_store.publish(snapshot_store, selected_cluster, ABNORMAL_PODS, scanned)
+                        st.session_state.pods = shared["items"]
+                        st.session_state.pods_changes = tracker.update(shared["items"], shared["created_at"])
+                    st.session_state.pods_snapshot_at = None
+                    st.session_state.pods_partial = scanned.partial
+                    st.session_state.pods_cluster = selected_cluster
+                    st.session_state.pods_error = None
+                except Exception as e:
+                    st.session_state.pods_error = f"集群连接失败: {str(e)}"
+                    st.session_state.pods = []
 
     if st.session_state.get('pods_error'):
         st.error(st.session_state.pods_error)
         st.stop()
 
     pods = st.session_state.pods
+    if st.session_state.get('pods_snapshot_at'):
+        st.caption(snapshot_caption(st.session_state.pods_snapshot_at))
+    if st.session_state.get('pods_partial'):
+        st.warning("⚠️ 异常Pod扫描中途停止，列表不完整，未列出的Pod不代表已恢复；可稍后点击刷新重试")
+    changes = st.session_state.get('pods_changes')
+    if changes and any(changes[change] for change in (NEW, CHANGED, RESOLVED)):
+        st.caption(
+            f"与上次扫描相比：新增 {len(changes[NEW])} 个，故障状态变化 {len(changes[CHANGED])} 个，"
+            f"恢复 {len(changes[RESOLVED])} 个"
+        )
+    feed = tracker.feed()
+    if feed:
+        with st.expander("🕘 变化记录"):
+            st.dataframe(
+                [dict(entry, time=time.strftime('%H:%M:%S', time.localtime(entry["time"]))) for entry in feed],
+                hide_index=True
+            )
 
     if not pods:
         st.success("🎉 当前集群没有异常Pod")
         st.stop()
 
-    st.subheader("异常Pod列表")
-    for pod in pods:
-        cols = st.columns([3, 2, 2, 3])
-        cols[0].write(f"🏢 {pod['namespace']}")
-        cols[1].write(f"🐳 {pod['pod_name']}")
-        cols[2].code(pod["status"])
-        
-        if cols[3].button("🔍 诊断", key=f"btn_{pod['namespace']}_{pod['pod_name']}"):
-            with st.spinner("收集诊断信息中..."):
-                diagnostic_data = get_pod_diagnostic_data(
-                    st.session_state.api_client,
-                    pod["namespace"], 
-                    pod["pod_name"]
-                )
-            
-            if "error" in diagnostic_data:
-                st.error(diagnostic_data["error"])
-            else:
-                with st.expander("📜 原始数据"):
-                    st.json(diagnostic_data)
-                
-                with st.spinner("🤖 AI 分析中..."):
-                    analysis = analyzer.analyze_pod(diagnostic_data)
-                    
-                with st.expander("💡 AI分析结果", expanded=True):
-                    st.markdown(analysis)
+    node_rollup_panel(pods)
+
+    # 同一控制器下故障签名（含最主要的事件原因）相同的副本聚为一组，只诊断每组的代表Pod
+    groups = group_abnormal_pods(pods)
+
+    if st.session_state.get('batch_running'):
+        st.subheader("批量诊断")
+        st.session_state.batch_results = []
+        # 故障状态未变化的组沿用上次诊断结果，只有新增或变化的组重新收集数据并调用 LLM
+        pending_groups = []
+        for group in groups:
+            previous = None if force_refresh else tracker.analysis_for(group["representative"])
+            if previous is None:
+                pending_groups.append(group)
+                continue
+            st.session_state.batch_results.append({
+                "pod": group["representative"],
+                "replicas": group["replicas"],
+                "analysis": previous,
+                "cached": True,
+                "reused": True,
+                "rule": None,
+                "error": None
+            })
+        if len(pending_groups) < len(groups):
+            st.caption(f"♻️ {len(groups) - len(pending_groups)} 组故障状态未变化，沿用上次诊断结果")
+        representatives = {
+            (g["representative"]["namespace"], g["representative"]["pod_name"]): g for g in pending_groups
+        }
+        done = len(st.session_state.batch_results)
+        progress_bar = st.progress(done / len(groups), text=f"已完成 {done}/{len(groups)} 组")
+        pipeline = DiagnosisPipeline(
+            st.session_state.api_client, analyzer, llm_config,
+            force_refresh=force_refresh
+        )
+        try:
+            for result in pipeline.run([g["representative"] for g in pending_groups]):
+                pod = result["pod"]
+                group = representatives[(pod["namespace"], pod["pod_name"])]
+                if result["diagnostic_data"] is not None and "error" not in result["diagnostic_data"]:
+                    result_store.put_payload((selected_cluster, pod_key(pod), failure_state(pod)), result["diagnostic_data"])
+                else:
+                    close_diagnostic_data(result["diagnostic_data"])
+                if not result["error"]:
+                    tracker.record_analysis(pod, result["analysis"])
+                st.session_state.batch_results.append({
+                    "pod": pod,
+                    "replicas": group["replicas"],
+                    "analysis": result["analysis"],
+                    "cached": result["cached"],
+                    "reused": False,
+                    "rule": result["rule"],
+                    "error": result["error"]
+                })
+                done = len(st.session_state.batch_results)
+                progress_bar.progress(done / len(groups), text=f"已完成 {done}/{len(groups)} 组")
+                status_icon = "❌" if result["error"] else ("⚙️" if result["rule"] else ("⚡" if result["cached"] else "✅"))
+                with st.expander(f"{status_icon} {pod['namespace']} / {pod['pod_name']}（同组 {group['replicas']} 个Pod）"):
+                    if result["error"]:
+                        st.error(result["error"])
+                    else:
+                        st.markdown(result["analysis"])
+        finally:
+            pipeline.cancel()
+        st.session_state.batch_running = False
+        st.rerun()
+
+    if st.session_state.get('batch_results'):
+        with st.expander(f"📋 批量诊断结果（{len(st.session_state.batch_results)} 个Pod）", expanded=True):
+            for result in st.session_state.batch_results:
+                pod = result["pod"]
+                if result.get("reused"):
+                    cached_note = "（沿用上次诊断）"
+                elif result.get("rule"):
+                    cached_note = "（本地规则）"
+                else:
+                    cached_note = "（缓存）" if result["cached"] else ""
+                st.markdown(f"**{pod['namespace']} / {pod['pod_name']}**（同组 {result['replicas']} 个Pod）{cached_note}")
+                if result["error"]:
+                    st.error(result["error"])
+                else:
+                    st.markdown(result["analysis"])
+                st.divider()
+
+    st.subheader(f"异常Pod列表（{len(pods)} 个Pod，{len(groups)} 组）")
+    abnormal_group_browser(groups, tracker)
 
 elif selected_function == "应用状态探测":
     if selected_cluster == "请选择一个集群":
         st.info("请先选择一个集群")
         st.stop()
 
-    st.subheader("应用Pod探测")
-
-    if 'all_applications' not in st.session_state or st.session_state.get('apps_cluster') != selected_cluster:
-        with st.spinner("⏳ 正在扫描全集群应用..."):
-            try:
-                st.session_state.all_applications = get_all_applications(st.session_state.api_client)
-                st.session_state.apps_cluster = selected_cluster
-                st.session_state.apps_error = None
-            except Exception as e:
-                st.session_state.apps_error = f"应用扫描失败: {str(e)}"
-                st.session_state.all_applications = []
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.subheader("应用Pod探测")
+    with col2:
+        refresh_flag = st.button('🔄 刷新应用列表')
+
+    if 'all_applications' not in st.session_state or refresh_flag or st.session_state.get('apps_cluster') != selected_cluster:
+        shared = None if refresh_flag else result_store.latest(snapshot_store, selected_cluster, APPLICATIONS, snapshot_max_age)
+        if shared is not None:
+            st.session_state.all_applications = shared["items"]
+            st.session_state.apps_kind_errors = shared["errors"]
+            st.session_state.apps_snapshot_at = shared["created_at"]
+            st.session_state.apps_cluster = selected_cluster
+            st.session_state.apps_error = None
+        else:
+            with st.spinner("⏳ 正在扫描全集群应用..."):
+                try:
+                    applications, kind_errors = get_all_applications(
+                        st.session_state.api_client,
+                        cache=live_cluster_cache()
+                    )
+                    shared = result_store.publish(
+                        snapshot_store, selected_cluster, APPLICATIONS,
+                        {"applications": applications, "errors": kind_errors}
+                    )
+                    st.session_state.all_applications = shared["items"]
+                    st.session_state.apps_kind_errors = kind_errors
+                    st.session_state.apps_snapshot_at = None
+                    st.session_state.apps_cluster = selected_cluster
+                    st.session_state.apps_error = None
+                except Exception as e:
+                    st.session_state.apps_error = f"应用扫描失败: {str(e)}"
+                    st.session_state.all_applications = []
+                    st.session_state.apps_kind_errors = {}
 
     if st.session_state.get('apps_error'):
         st.error(st.session_state.apps_error)
         st.stop()
 
     all_apps = st.session_state.all_applications
+    if st.session_state.get('apps_snapshot_at'):
+        st.caption(snapshot_caption(st.session_state.apps_snapshot_at))
+    for kind, error in st.session_state.get('apps_kind_errors', {}).items():
+        st.warning(f"{kind} 列表获取失败，结果中不包含该类型: {error}")
     if not all_apps:
         st.error("⚠️ 集群中没有发现部署应用")
         st.stop()
@@ -171,13 +542,15 @@ elif selected_function == "应用状态探测":
         "🔍 输入应用名称（支持模糊搜索）",
         value=st.session_state.get('app_search_term', ''),
         key='app_search_term'
-    ).lower()
-    
-    app_options = [
-    f"{app['name']}::{app['namespace']}::{app['kind']}"  # 修改分隔符为::
-    for app in all_apps
+    )
+
+    # 索引按集群缓存，应用列表变化时增量更新；结果按匹配度排序
+    search_index = get_search_index(selected_cluster, all_apps)
+    matched_apps = search_index.search(search_term) if search_term.strip() else all_apps
+    filtered_options = [
+        f"{app['name']}::{app['namespace']}::{app['kind']}"  # 修改分隔符为::
+        for app in matched_apps
     ]
-    filtered_options = [opt for opt in app_options if search_term in opt.lower()]
 
     if not filtered_options:
         st.warning("没有找到匹配的应用")
@@ -208,7 +581,8 @@ elif selected_function == "应用状态探测":
                 st.session_state.api_client,
                 namespace,
                 app_name,
-                kind
+                kind,
+                cache=st.session_state.cluster_cache
             )
         
         if not pod_list:
@@ -217,34 +591,7 @@ elif selected_function == "应用状态探测":
             st.stop()
             
         st.subheader("Pod列表")
-        
-        for pod in pod_list:
-            cols = st.columns([3, 2, 2, 3, 2])
-            cols[0].write(f"🏢 {pod['namespace']}")
-            cols[1].write(f"🐳 {pod['pod_name']}")
-            cols[2].code(pod["status"])
-            cols[3].write(f"🔄 重启 {pod['restart_count']} 次")
-            
-            btn_key = f"diag_{st.session_state['exploring_app_name']}_{pod['namespace']}_{pod['pod_name']}"
-            if cols[4].button("🔍 诊断", key=btn_key):
-                with st.spinner("收集诊断信息中..."):
-                    diagnostic_data = get_pod_diagnostic_data(
-                        st.session_state.api_client,
-                        pod["namespace"], 
-                        pod["pod_name"]
-                    )
-                
-                if "error" in diagnostic_data:
-                    st.error(diagnostic_data["error"])
-                else:
-                    with st.expander("📜 原始数据"):
-                        st.json(diagnostic_data)
-                    
-                    with st.spinner("🤖 AI 分析中..."):
-                        analysis = analyzer.analyze_pod(diagnostic_data)
-                        
-                    with st.expander("💡 AI分析结果", expanded=True):
-                        st.markdown(analysis)
+        application_pod_browser(pod_list)
 
         st.stop()
 
@@ -257,44 +604,64 @@ elif selected_function == "集群概览":
         if 'cluster_stats' in st.session_state:
             del st.session_state.cluster_stats
     
-    if 'cluster_stats' not in st.session_state or refresh_flag:
-        all_stats = []
-        with st.spinner("正在扫描所有集群..."):
-            # 初始化进度条
-            progress_bar = st.progress(0)
-            total_clusters = len(clusters)
-            processed = 0
-
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                futures = []
-                for idx, cluster in enumerate(clusters):
-                    futures.append(executor.submit(
-                        lambda c, i: (i, get_cluster_summary(c)),
-                        cluster,
-                        idx
-                    ))
-                
-                temp_results = []
-                for future in as_completed(futures):
-                    try:
-                        index, result = future.result()
-                        temp_results.append( (index, result) )
-                    except Exception as e:
-                        st.error(f"集群扫描失败: {str(e)}")
-                    finally:
-                        # 更新进度条
-                        processed += 1
-                        progress = processed / total_clusters
-                        progress_bar.progress(min(progress, 1.0))  # 确保不超过100%
-
-                # 处理完成后排序结果
-                temp_results.sort(key=lambda x: x[0])
-                all_stats = [result for (index, result) in temp_results]
-
-            # 扫描完成后移除进度条
-            progress_bar.empty()
+    def render_cluster_row(stats):
+        with st.container():
+            cols = st.columns([2,1,1,1,1,3])
+            
+            status_icon = {"success": "✅", "stale": "⏳"}.get(stats["status"], "❌")
+            cols[0].subheader(f"{status_icon} {stats['cluster_name']}")
+            
+            if stats["status"] in ("success", "stale"):
+                cols[1].metric("节点", stats["nodes"])
+                cols[2].metric("Pods", stats["pods"])
+                cols[3].metric("Deploy", stats["deployments"])
+                cols[4].metric("Stateful", stats["statefulsets"])
+                if stats["status"] == "stale":
+                    cols[5].warning(stats["error"])
+                else:
+                    cols[5].code(f"更新时间: {stats['timestamp']}")
+            else:
+                cols[1].error("连接失败")
+                cols[2].error("N/A")
+                cols[3].error("N/A")
+                cols[4].error("N/A")
+                cols[5].error(stats["error"])
+            
+            st.divider()
 
+    if 'cluster_stats' not in st.session_state or refresh_flag:
+        all_stats = [None] * len(clusters)
+        snapshot_times = []
+        if not refresh_flag:
+            for index, cluster in enumerate(clusters):
+                shared = result_store.latest(snapshot_store, cluster["cluster_name"], SUMMARY, snapshot_max_age)
+                if shared is not None:
+                    all_stats[index] = shared["items"][0]
+                    snapshot_times.append(shared["created_at"])
+
+        # 只实时扫描没有可用快照的集群
+        pending = [index for index, stats in enumerate(all_stats) if stats is None]
+        if pending:
+            scan_area = st.empty()
+            with scan_area.container():
+                # 初始化进度条，每个集群完成后立即渲染其结果
+                progress_bar = st.progress(0.0, text="正在扫描集群...")
+                rows = [st.empty() for _ in pending]
+                processed = 0
+
+                for position, result in scan_clusters([clusters[index] for index in pending]):
+                    if result["status"] == "success":
+                        result = result_store.publish(snapshot_store, result["cluster_name"], SUMMARY, result)["items"][0]
+                    all_stats[pending[position]] = result
+                    with rows[position].container():
+                        render_cluster_row(result)
+                    processed += 1
+                    progress_bar.progress(processed / len(pending), text=f"已扫描 {processed}/{len(pending)} 个集群")
+
+            # 扫描完成后移除临时区域，按统一布局展示
+            scan_area.empty()
         st.session_state.cluster_stats = all_stats
+        st.session_state.cluster_stats_snapshot_at = min(snapshot_times) if snapshot_times else None
 
     # 剩余保持原有统计和展示逻辑不变...
     total_stats = {
@@ -307,7 +674,7 @@ elif selected_function == "集群概览":
     
     valid_clusters = []
     for stats in st.session_state.cluster_stats:
-        if stats["status"] == "success":
+        if stats["status"] in ("success", "stale"):
             total_stats["nodes"] += stats["nodes"]
             total_stats["pods"] += stats["pods"]
             total_stats["deployments"] += stats["deployments"]
@@ -323,6 +690,12 @@ elif selected_function == "集群概览":
     cols[2].metric("🐳 总Pod数", total_stats["pods"])
     cols[3].metric("🚀 总无状态应用", total_stats["deployments"])
     cols[4].metric("🔒 总有状态应用", total_stats["statefulsets"])
+
+    stale_count = sum(1 for stats in st.session_state.cluster_stats if stats["status"] == "stale")
+    if stale_count:
+        st.caption(f"⏳ {stale_count} 个集群扫描超时，汇总中包含其上次成功扫描的数据")
+    if st.session_state.get('cluster_stats_snapshot_at'):
+        st.caption(snapshot_caption(st.session_state.cluster_stats_snapshot_at))
     
     st.divider()
     
@@ -335,28 +708,9 @@ elif selected_function == "集群概览":
         show_problems = st.checkbox("显示异常集群", value=True)
     
     for stats in st.session_state.cluster_stats:
-        if stats["status"] == "error" and not show_problems:
+        if stats["status"] != "success" and not show_problems:
             continue
         if stats["status"] == "success" and not show_healthy:
             continue
         
-        with st.container():
-            cols = st.columns([2,1,1,1,1,3])
-            
-            status_icon = "✅" if stats["status"] == "success" else "❌"
-            cols[0].subheader(f"{status_icon} {stats['cluster_name']}")
-            
-            if stats["status"] == "success":
-                cols[1].metric("节点", stats["nodes"])
-                cols[2].metric("Pods", stats["pods"])
-                cols[3].metric("Deploy", stats["deployments"])
-                cols[4].metric("Stateful", stats["statefulsets"])
-                cols[5].code(f"更新时间: {stats['timestamp']}")
-            else:
-                cols[1].error("连接失败")
-                cols[2].error("N/A")
-                cols[3].error("N/A")
-                cols[4].error("N/A")
-                cols[5].error(stats["error"])
-            
-            st.divider()
\ No newline at end of file
+        render_cluster_row(stats)
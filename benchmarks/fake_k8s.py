@@ -0,0 +1,377 @@
+# fake_k8s.py
+"""本地 Kubernetes API 替身：按参数生成合成集群，支持分页、字段/标签过滤、日志与事件，可注入延迟与失败"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+_NAME_ALPHABET = "bcdfghjklmnpqrstvwxz2456789"
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """客户端进程退出时断开的长连接不打印异常"""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+def _suffix(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(_NAME_ALPHABET) for _ in range(length))
+
+def _metadata(name: str, namespace: Optional[str], uid: str, labels: Optional[Dict] = None,
+              owner: Optional[Dict] = None) -> Dict:
+    metadata = {
+        "name": name,
+        "uid": uid,
+        "resourceVersion": "1",
+        "creationTimestamp": "2024-01-01T00:00:00Z",
+        "labels": labels or {}
+    }
+    if namespace:
+        metadata["namespace"] = namespace
+    if owner:
+        metadata["ownerReferences"] = [dict(owner, controller=True)]
+    return metadata
+
+def _owner(kind: str, obj: Dict, api_version: str = "apps/v1") -> Dict:
+    return {"apiVersion": api_version, "kind": kind, "name": obj["metadata"]["name"], "uid": obj["metadata"]["uid"]}
+
+class SyntheticCluster:
+    """确定性的合成集群：每个命名空间若干 Deployment/StatefulSet/Job，另有全局 DaemonSet
+
+    abnormal_ratio 比例的 Pod 处于 CrashLoopBackOff（phase 为 Pending/Failed），并带有事件与历史日志。
+    同样的参数与 seed 总是生成同样的集群，便于前后对比。
+    """
+
+    def __init__(self, namespaces: int = 20, deployments_per_namespace: int = 10, replicas: int = 3,
+                 statefulsets_per_namespace: int = 2, jobs_per_namespace: int = 2, daemonsets: int = 3,
+                 nodes: int = 20, containers_per_pod: int = 1, abnormal_ratio: float = 0.05,
+                 events_per_pod: int = 5, log_bytes: int = 64 * 1024, seed: int = 42):
+        rng = random.Random(seed)
+        self.log_bytes = log_bytes
+        self.objects: Dict[str, List[Dict]] = {
+            kind: [] for kind in ("namespaces", "nodes", "pods", "deployments", "replicasets",
+                                  "statefulsets", "daemonsets", "jobs", "events")
+        }
+        self._uid = 0
+        self._containers = [f"app-{i}" if i else "app" for i in range(containers_per_pod)]
+
+        for i in range(nodes):
+            self.objects["nodes"].append({
+                "metadata": _metadata(f"node-{i:04d}", None, self._next_uid()),
+                "status": {"conditions": [{"type": "Ready", "status": "True", "reason": "KubeletReady"}]}
+            })
+
+        def add_pods(owner: Dict, namespace: str, prefix: str, count: int, labels: Dict,
+                     names: Optional[List[str]] = None):
+            for index in range(count):
+                name = names[index] if names else f"{prefix}-{_suffix(rng, 5)}"
+                abnormal = rng.random() < abnormal_ratio
+                self.objects["pods"].append(
+                    self._pod(rng, owner, namespace, name, labels, abnormal, nodes, events_per_pod)
+                )
+
+        for n in range(namespaces):
+            namespace = f"team-{n:03d}"
+            self.objects["namespaces"].append({"metadata": _metadata(namespace, None, self._next_uid())})
+
+            for d in range(deployments_per_namespace):
+                name = f"svc-{n:03d}-{d:03d}"
+                labels = {"app": name}
+                deployment = self._workload(namespace, name, labels, replicas)
+                self.objects["deployments"].append(deployment)
+                template_hash = _suffix(rng, 10)
+                rs_name = f"{name}-{template_hash}"
+                replicaset = {"metadata": _metadata(rs_name, namespace, self._next_uid(), labels, _owner("Deployment", deployment)),
+                              "spec": {"selector": {"matchLabels": dict(labels, **{"pod-template-hash": template_hash})}}}
+                self.objects["replicasets"].append(replicaset)
+                add_pods(_owner("ReplicaSet", replicaset), namespace, rs_name, replicas, dict(labels, **{"pod-template-hash": template_hash}))
+
+            for s in range(statefulsets_per_namespace):
+                name = f"db-{n:03d}-{s:03d}"
+                labels = {"app": name}
+                statefulset = self._workload(namespace, name, labels, replicas)
+                statefulset["spec"]["serviceName"] = name
+                self.objects["statefulsets"].append(statefulset)
+                add_pods(_owner("StatefulSet", statefulset), namespace, name, replicas, labels,
+                         names=[f"{name}-{i}" for i in range(replicas)])
+
+            for j in range(jobs_per_namespace):
+                name = f"job-{n:03d}-{j:03d}"
+                labels = {"job-name": name}
+                job = self._workload(namespace, name, labels, 1)
+                self.objects["jobs"].append(job)
+                add_pods(_owner("Job", job, "batch/v1"), namespace, name, 1, labels)
+
+        for d in range(daemonsets):
+            name = f"agent-{d}"
+            labels = {"app": name}
+            daemonset = self._workload("kube-system", name, labels, nodes)
+            self.objects["daemonsets"].append(daemonset)
+            add_pods(_owner("DaemonSet", daemonset), "kube-system", name, nodes, labels)
+
+        self._by_key = {
+            kind: {(o["metadata"].get("namespace"), o["metadata"]["name"]): o for o in objs}
+            for kind, objs in self.objects.items()
+        }
+        self._events_by_pod: Dict[tuple, List[Dict]] = {}
+        for event in self.objects["events"]:
+            involved = event["involvedObject"]
+            self._events_by_pod.setdefault((involved["namespace"], involved["name"]), []).append(event)
+        self._log_text = self._make_log(rng, log_bytes)
+
+    def _next_uid(self) -> str:
+        self._uid += 1
+        return f"00000000-0000-0000-0000-{self._uid:012d}"
+
+    def _workload(self, namespace: str, name: str, labels: Dict, replicas: int) -> Dict:
+        return {
+            "metadata": _metadata(name, namespace, self._next_uid(), labels),
+            "spec": {"replicas": replicas, "selector": {"matchLabels": labels}, "template": {}}
+        }
+
+    def _pod(self, rng: random.Random, owner: Dict, namespace: str, name: str, labels: Dict,
+             abnormal: bool, nodes: int, events_per_pod: int) -> Dict:
+        statuses = []
+        for container in self._containers:
+            status = {"name": container, "ready": not abnormal, "restartCount": 0, "image": "app:1", "imageID": "",
+                      "state": {"running": {"startedAt": "2024-01-01T00:00:00Z"}}}
+            if abnormal:
+                status["restartCount"] = rng.randint(1, 50)
+                status["state"] = {"waiting": {"reason": "CrashLoopBackOff", "message": "back-off restarting failed container"}}
+                status["lastState"] = {"terminated": {"exitCode": rng.choice([1, 137, 143]), "reason": "Error"}}
+            statuses.append(status)
+        uid = self._next_uid()
+        pod = {
+            "metadata": _metadata(name, namespace, uid, labels, owner),
+            "spec": {"nodeName": f"node-{rng.randrange(nodes):04d}", "containers": [{"name": c, "image": "app:1"} for c in self._containers]},
+            "status": {"phase": rng.choice(["Pending", "Failed"]) if abnormal else "Running", "containerStatuses": statuses}
+        }
+        if abnormal:
+            # 与真实 apiserver 一样不保证按时间返回：时间戳打乱顺序
+            minutes = rng.sample(range(60), min(events_per_pod, 60))
+            for i in range(events_per_pod):
+                self.objects["events"].append({
+                    "metadata": _metadata(f"{name}.{i:x}", namespace, self._next_uid()),
+                    "involvedObject": {"kind": "Pod", "namespace": namespace, "name": name, "uid": uid},
+                    "type": "Warning",
+                    "reason": "BackOff" if i % 2 else "Unhealthy",
+                    "message": f"Back-off restarting failed container (attempt {i})",
+                    "lastTimestamp": f"2024-01-01T{i // 60:02d}:{minutes[i % len(minutes)]:02d}:00Z",
+                    "count": i + 1
+                })
+        return pod
+
+    @staticmethod
+    def _make_log(rng: random.Random, size: int) -> str:
+        lines = []
+        total = 0
+        second = 0
+        while total < size:
+            second += 1
+            if rng.random() < 0.02:
+                line = f"2024-01-01T00:{second // 60 % 60:02d}:{second % 60:02d}Z ERROR request failed: connection refused (upstream=db:5432)"
+            else:
+                line = f"2024-01-01T00:{second // 60 % 60:02d}:{second % 60:02d}Z INFO handled request id={rng.getrandbits(32):08x} status=200"
+            lines.append(line)
+            total += len(line) + 1
+        return "\n".join(lines)[:size]
+
+    def abnormal_pods(self) -> List[Dict]:
+        return [p for p in self.objects["pods"] if p["status"]["phase"] not in ("Running", "Succeeded")]
+
+    def get(self, kind: str, namespace: Optional[str], name: str) -> Optional[Dict]:
+        return self._by_key[kind].get((namespace, name))
+
+    def events_for(self, namespace: str, name: str) -> List[Dict]:
+        return self._events_by_pod.get((namespace, name), [])
+
+    def log(self, tail_lines: Optional[int], limit_bytes: Optional[int]) -> bytes:
+        text = self._log_text
+        if tail_lines is not None:
+            text = "\n".join(text.split("\n")[-tail_lines:])
+        data = text.encode()
+        return data[:limit_bytes] if limit_bytes else data
+
+# list 路由：(正则, 是否为命名空间内的 list)
+_LIST_ROUTES = [
+    (re.compile(r"^/api/v1/(pods|nodes|namespaces|events)$"), False),
+    (re.compile(r"^/apis/(?:apps|batch)/v1/(deployments|replicasets|statefulsets|daemonsets|jobs)$"), False),
+    (re.compile(r"^/api/v1/namespaces/([^/]+)/(pods|events)$"), True),
+    (re.compile(r"^/apis/(?:apps|batch)/v1/namespaces/([^/]+)/(deployments|replicasets|statefulsets|daemonsets|jobs)$"), True)
+]
+_READ_ROUTE = re.compile(r"^/apis?/(?:v1|apps/v1|batch/v1)/namespaces/([^/]+)/(pods|deployments|statefulsets|daemonsets|jobs)/([^/]+)$")
+_NODE_ROUTE = re.compile(r"^/api/v1/nodes/([^/]+)$")
+_LOG_ROUTE = re.compile(r"^/api/v1/namespaces/([^/]+)/pods/([^/]+)/log$")
+
+def _matches_field_selector(obj: Dict, selector: str) -> bool:
+    for term in filter(None, selector.split(",")):
+        negate = "!=" in term
+        field, value = term.split("!=" if negate else "=", 1)
+        current = obj
+        for part in field.split("."):
+            current = (current or {}).get(part) if isinstance(current, dict) else None
+        if (str(current) == value) == negate:
+            return False
+    return True
+
+def _matches_label_selector(obj: Dict, selector: str) -> bool:
+    """只解析 k=v 形式的条件，其余形式（in/notin/exists）视为满足"""
+    labels = obj["metadata"].get("labels") or {}
+    for term in re.split(r",(?![^(]*\))", selector):
+        if "=" in term and " " not in term:
+            key, value = term.split("=", 1)
+            if labels.get(key.rstrip("!=")) != value:
+                return False
+    return True
+
+class FakeKubeServer:
+    """在本地端口提供合成集群的 Kubernetes API，记录请求数与响应字节数
+
+    latency 为每个请求的固定延迟（秒），failure_rate 为返回 500 的概率。
+    watch 请求直接以空响应结束，基准测试不使用 informer。
+    """
+
+    def __init__(self, cluster: SyntheticCluster, latency: float = 0.0, failure_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.cluster = cluster
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+        self._server = QuietHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeKubeServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-k8s", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {"requests": 0, "bytes_sent": 0, "failures": 0, "by_resource": {}}
+
+    def _record(self, resource: str, size: int, failed: bool = False):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_sent"] += size
+            self.stats["failures"] += int(failed)
+            self.stats["by_resource"][resource] = self.stats["by_resource"].get(resource, 0) + 1
+
+    def _should_fail(self) -> bool:
+        with self._stats_lock:
+            return self.failure_rate > 0 and self._rng.random() < self.failure_rate
+
+    def _list(self, items: List[Dict], query: Dict, partial: bool) -> Dict:
+        if "fieldSelector" in query:
+            items = [o for o in items if _matches_field_selector(o, query["fieldSelector"])]
+        if "labelSelector" in query:
+            items = [o for o in items if _matches_label_selector(o, query["labelSelector"])]
+        start = int(query.get("continue", 0))
+        limit = int(query["limit"]) if query.get("limit") else len(items)
+        page = items[start:start + limit]
+        metadata = {"resourceVersion": "1"}
+        if start + limit < len(items):
+            metadata["continue"] = str(start + limit)
+            metadata["remainingItemCount"] = len(items) - start - limit
+        if partial:
+            page = [{"metadata": o["metadata"]} for o in page]
+        return {"kind": "List", "apiVersion": "v1", "metadata": metadata, "items": page}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: bytes, resource: str, content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                server._record(resource, len(body), failed=status >= 500)
+
+            def _send_json(self, status: int, payload: Dict, resource: str):
+                self._send(status, json.dumps(payload).encode(), resource)
+
+            def _status(self, code: int, reason: str, resource: str):
+                self._send_json(code, {"kind": "Status", "apiVersion": "v1", "status": "Failure",
+                                       "code": code, "reason": reason, "message": reason}, resource)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                if server.latency:
+                    time.sleep(server.latency)
+                if query.get("watch") in ("true", "1"):
+                    self._send(200, b"", "watch")
+                    return
+                if server._should_fail():
+                    self._status(500, "InternalError", "injected")
+                    return
+
+                match = _LOG_ROUTE.match(parsed.path)
+                if match:
+                    namespace, name = match.groups()
+                    if server.cluster.get("pods", namespace, name) is None:
+                        self._status(404, "NotFound", "log")
+                        return
+                    body = server.cluster.log(
+                        int(query["tailLines"]) if "tailLines" in query else None,
+                        int(query["limitBytes"]) if "limitBytes" in query else None
+                    )
+                    self._send(200, body, "log", "text/plain")
+                    return
+
+                match = _READ_ROUTE.match(parsed.path)
+                node_match = _NODE_ROUTE.match(parsed.path)
+                if match or node_match:
+                    namespace, kind, name = match.groups() if match else (None, "nodes", node_match.group(1))
+                    obj = server.cluster.get(kind, namespace, name)
+                    if obj is None:
+                        self._status(404, "NotFound", kind)
+                    else:
+                        self._send_json(200, obj, kind)
+                    return
+
+                partial = "PartialObjectMetadataList" in (self.headers.get("Accept") or "")
+                for pattern, namespaced in _LIST_ROUTES:
+                    match = pattern.match(parsed.path)
+                    if not match:
+                        continue
+                    if namespaced:
+                        namespace, kind = match.groups()
+                        if kind == "events" and "involvedObject.name=" in query.get("fieldSelector", ""):
+                            # 按 Pod 索引缩小范围，其余字段条件仍由 _list 过滤
+                            name = query["fieldSelector"].split("involvedObject.name=", 1)[1].split(",", 1)[0]
+                            items = server.cluster.events_for(namespace, name)
+                        else:
+                            items = [o for o in server.cluster.objects[kind] if o["metadata"].get("namespace") == namespace]
+                    else:
+                        kind = match.group(1)
+                        items = server.cluster.objects[kind]
+                    self._send_json(200, server._list(items, query, partial), kind)
+                    return
+
+                self._status(404, "NotFound", "unknown")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
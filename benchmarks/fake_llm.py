@@ -0,0 +1,126 @@
+# fake_llm.py
+"""本地 OpenAI 兼容 /chat/completions 替身：可配置首 token 延迟、生成速度、回复长度与失败率，支持流式与非流式"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Optional
+
+from benchmarks.fake_k8s import QuietHTTPServer
+
+_REPLY_WORDS = ["根因", "分析", "：", "容器", "因", "内存", "不足", "被", "OOMKilled", "，",
+                "建议", "提高", "limits", "或", "排查", "内存", "泄漏", "。"]
+
+class FakeLLMServer:
+    """每个请求先等待 time_to_first_token 秒，再按 tokens_per_second 逐段产出 completion_tokens 个 token
+
+    failure_status 为按 failure_rate 概率返回的错误码（默认 429）。统计请求数、提示字节数与产出 token 数。
+    """
+
+    def __init__(self, time_to_first_token: float = 0.2, tokens_per_second: float = 200.0,
+                 completion_tokens: int = 150, failure_rate: float = 0.0, failure_status: int = 429,
+                 chunk_tokens: int = 5, host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.time_to_first_token = time_to_first_token
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.chunk_tokens = chunk_tokens
+        self._rng = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+        self._server = QuietHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {"requests": 0, "failures": 0, "prompt_bytes": 0, "completion_tokens": 0}
+
+    def _record(self, prompt_bytes: int, completion_tokens: int, failed: bool):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["failures"] += int(failed)
+            self.stats["prompt_bytes"] += prompt_bytes
+            self.stats["completion_tokens"] += completion_tokens
+
+    def _should_fail(self) -> bool:
+        with self._stats_lock:
+            return self.failure_rate > 0 and self._rng.random() < self.failure_rate
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                request = json.loads(raw or b"{}")
+                if server._should_fail():
+                    body = json.dumps({"error": {"message": "injected failure", "type": "rate_limit"}}).encode()
+                    self.send_response(server.failure_status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    server._record(len(raw), 0, failed=True)
+                    return
+
+                time.sleep(server.time_to_first_token)
+                tokens = [_REPLY_WORDS[i % len(_REPLY_WORDS)] for i in range(server.completion_tokens)]
+                usage = {"prompt_tokens": len(raw) // 4, "completion_tokens": len(tokens),
+                         "total_tokens": len(raw) // 4 + len(tokens)}
+                if not request.get("stream"):
+                    time.sleep(len(tokens) / server.tokens_per_second)
+                    body = json.dumps({
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                                     "finish_reason": "stop"}],
+                        "usage": usage
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    server._record(len(raw), len(tokens), failed=False)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = max(server.chunk_tokens, 1)
+                for start in range(0, len(tokens), step):
+                    if start:
+                        time.sleep(step / server.tokens_per_second)
+                    chunk = {"choices": [{"index": 0, "delta": {"content": "".join(tokens[start:start + step])}}]}
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+                final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+                self._write_chunk(f"data: {json.dumps(final)}\n\n".encode())
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+                server._record(len(raw), len(tokens), failed=False)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
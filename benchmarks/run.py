@@ -0,0 +1,221 @@
+# run.py
+"""基准测试：在本地假 Kubernetes API 与假 LLM 网关上测量集群扫描与诊断流程
+
+用法：python -m benchmarks.run [--scenario small|large] [--only NAME ...] [--baseline FILE]
+
+每个基准在独立子进程中运行，峰值 RSS 互不影响；请求数与响应字节数由假服务端统计。
+结果写入 benchmarks/results/<scenario>-<时间>.json，并与上一次同场景结果（或 --baseline）对比，
+耗时、请求数或字节数超出阈值的项标记为回退。
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fake_k8s import FakeKubeServer, SyntheticCluster
+from benchmarks.fake_llm import FakeLLMServer
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# 与基线相比超过该比例视为回退
+DEFAULT_THRESHOLD = 0.2
+# 耗时差值小于该秒数时不计为回退，避免毫秒级基准的抖动
+MIN_WALL_DELTA = 0.05
+
+SCENARIOS = {
+    "small": {
+        "cluster": {"namespaces": 10, "deployments_per_namespace": 10, "replicas": 3, "nodes": 10,
+                    "abnormal_ratio": 0.05, "events_per_pod": 5, "log_bytes": 32 * 1024},
+        "k8s": {"latency": 0.002},
+        "llm": {"time_to_first_token": 0.2, "tokens_per_second": 200, "completion_tokens": 150},
+        "diagnose_pods": 5,
+        "analyze_groups": 5
+    },
+    "large": {
+        "cluster": {"namespaces": 200, "deployments_per_namespace": 20, "replicas": 3, "nodes": 200,
+                    "abnormal_ratio": 0.03, "events_per_pod": 10, "log_bytes": 1024 * 1024},
+        "k8s": {"latency": 0.01},
+        "llm": {"time_to_first_token": 0.5, "tokens_per_second": 80, "completion_tokens": 400},
+        "diagnose_pods": 20,
+        "analyze_groups": 20
+    }
+}
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 计，macOS 以字节计
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+# ---------- 子进程中运行的基准 ----------
+
+def _bench_non_running_pods(env: Dict) -> Dict:
+    from modules.k8s_utils import get_non_running_pods
+    return {"items": len(get_non_running_pods(env["api_client"]))}
+
+def _bench_all_applications(env: Dict) -> Dict:
+    from modules.k8s_utils import get_all_applications
+    applications, errors = get_all_applications(env["api_client"])
+    return {"items": len(applications), "errors": len(errors)}
+
+def _bench_cluster_summary(env: Dict) -> Dict:
+    from modules.k8s_utils import get_cluster_summary
+    summary = get_cluster_summary(env["cluster_config"])
+    return {"items": summary["pods"], "errors": int(summary["status"] != "success")}
+
+def _bench_pod_diagnostic(env: Dict) -> Dict:
+    from modules.k8s_utils import get_pod_diagnostic_data
+    errors = 0
+    for namespace, name in env["diagnose_pods"]:
+        data = get_pod_diagnostic_data(env["api_client"], namespace, name)
+        errors += int("error" in data) + len(data.get("part_errors", {}))
+    return {"items": len(env["diagnose_pods"]), "errors": errors}
+
+def _bench_end_to_end(env: Dict) -> Dict:
+    from modules.grouping import group_abnormal_pods
+    from modules.k8s_utils import get_non_running_pods
+    from modules.llm_analyzer import LLMAnalyzer
+    from modules.pipeline import DiagnosisPipeline
+    llm_config = {"api_key": "benchmark", "base_url": env["llm_url"], "model": "gpt-4o",
+                  "cache": {"enabled": False}}
+    groups = group_abnormal_pods(get_non_running_pods(env["api_client"]))[:env["analyze_groups"]]
+    pipeline = DiagnosisPipeline(env["api_client"], LLMAnalyzer(llm_config), llm_config)
+    results = list(pipeline.run([g["representative"] for g in groups]))
+    return {"items": len(results), "errors": sum(1 for r in results if r["error"])}
+
+BENCHMARKS: Dict[str, Callable[[Dict], Dict]] = {
+    "non_running_pods": _bench_non_running_pods,
+    "all_applications": _bench_all_applications,
+    "cluster_summary": _bench_cluster_summary,
+    "pod_diagnostic": _bench_pod_diagnostic,
+    "end_to_end": _bench_end_to_end
+}
+
+def _run_in_child(name: str, params: Dict, queue):
+    from modules.k8s_client import create_k8s_client
+    env = dict(params)
+    env["api_client"] = create_k8s_client(params["k8s_url"], "benchmark")
+    env["cluster_config"] = {"cluster_name": "benchmark", "api_url": params["k8s_url"], "token": "benchmark"}
+    started = time.perf_counter()
+    try:
+        result = BENCHMARKS[name](env)
+    except Exception as e:
+        result = {"exception": f"{type(e).__name__}: {e}"}
+    result["wall_seconds"] = round(time.perf_counter() - started, 3)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    queue.put(result)
+
+# ---------- 主进程 ----------
+
+def run_benchmark(name: str, params: Dict, k8s: FakeKubeServer, llm: FakeLLMServer) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    k8s.reset_stats()
+    llm.reset_stats()
+    process = context.Process(target=_run_in_child, args=(name, params, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    result["api_calls"] = k8s.stats["requests"]
+    result["bytes_received"] = k8s.stats["bytes_sent"]
+    result["api_calls_by_resource"] = dict(k8s.stats["by_resource"])
+    if llm.stats["requests"]:
+        result["llm_requests"] = llm.stats["requests"]
+        result["llm_prompt_bytes"] = llm.stats["prompt_bytes"]
+    return result
+
+def _latest_result(scenario: str, exclude: Optional[Path] = None) -> Optional[Path]:
+    candidates = sorted(p for p in RESULTS_DIR.glob(f"{scenario}-*.json") if p != exclude)
+    return candidates[-1] if candidates else None
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """返回回退说明：耗时、请求数、字节数比基线增加超过 threshold 的项"""
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("wall_seconds", "api_calls", "bytes_received", "peak_rss_mb"):
+            before, after = previous.get(metric), result.get(metric)
+            if metric == "wall_seconds" and after is not None and before is not None and after - before < MIN_WALL_DELTA:
+                continue
+            if before and after and after > before * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {before} → {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="集群扫描与诊断流程基准测试")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="small")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="只运行指定基准，可重复")
+    parser.add_argument("--k8s-latency", type=float, help="覆盖场景的 apiserver 单请求延迟（秒）")
+    parser.add_argument("--k8s-failure-rate", type=float, default=0.0, help="apiserver 返回 500 的概率")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="LLM 网关返回 429 的概率")
+    parser.add_argument("--baseline", type=Path, help="对比的基线结果文件，默认取上一次同场景结果")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--no-save", action="store_true", help="不保存本次结果")
+    args = parser.parse_args(argv)
+
+    scenario = SCENARIOS[args.scenario]
+    print(f"生成合成集群（{args.scenario}）...")
+    cluster = SyntheticCluster(**scenario["cluster"])
+    k8s = FakeKubeServer(
+        cluster,
+        latency=args.k8s_latency if args.k8s_latency is not None else scenario["k8s"]["latency"],
+        failure_rate=args.k8s_failure_rate
+    ).start()
+    llm = FakeLLMServer(failure_rate=args.llm_failure_rate, **scenario["llm"]).start()
+    params = {
+        "k8s_url": k8s.url,
+        "llm_url": llm.url,
+        "diagnose_pods": [
+            (p["metadata"]["namespace"], p["metadata"]["name"])
+            for p in cluster.abnormal_pods()[:scenario["diagnose_pods"]]
+        ],
+        "analyze_groups": scenario["analyze_groups"]
+    }
+
+    report = {
+        "scenario": args.scenario,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cluster": dict(scenario["cluster"], pods=len(cluster.objects["pods"]),
+                        abnormal_pods=len(cluster.abnormal_pods())),
+        "results": {}
+    }
+    try:
+        for name in args.only or BENCHMARKS:
+            result = run_benchmark(name, params, k8s, llm)
+            report["results"][name] = result
+            print(f"{name:<18} {result['wall_seconds']:>8.3f}s  calls={result['api_calls']:<6} "
+                  f"bytes={result['bytes_received']:<10} rss={result['peak_rss_mb']}MB"
+                  + (f"  错误: {result['exception']}" if "exception" in result else ""))
+    finally:
+        k8s.stop()
+        llm.stop()
+
+    output = None
+    if not args.no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / f"{args.scenario}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"结果已保存: {output}")
+
+    baseline_path = args.baseline or _latest_result(args.scenario, exclude=output)
+    if baseline_path is None:
+        return 0
+    regressions = compare(report, json.loads(baseline_path.read_text()), args.threshold)
+    if regressions:
+        print(f"相对 {baseline_path.name} 的回退：")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"相对 {baseline_path.name} 无回退")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
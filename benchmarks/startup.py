@@ -0,0 +1,140 @@
+# startup.py
+"""启动预算检查：测量 app.py 冷启动的导入耗时、首次完整运行与页面重跑耗时
+
+用法：python -m benchmarks.startup [--repeat N]
+
+每项测量在全新的子进程中进行（导入缓存互不影响），取 N 次中的最小值，与 BUDGETS 比较，
+超出预算时退出码为 1。app.py 使用临时目录中的配置运行，不访问任何集群或 LLM 网关。
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).parent.parent
+
+# 首屏之前 app.py 需要导入的模块（标题与侧边栏导航渲染前）
+FIRST_PAINT_MODULES = [
+    "modules.config_loader", "modules.llm_analyzer", "modules.grouping", "modules.pod_logs",
+    "modules.search_index", "modules.pod_table", "modules.metrics", "modules.snapshot_store",
+    "modules.node_rollup", "modules.result_store"
+]
+# 首屏之后才导入的模块
+DEFERRED_MODULES = [
+    "modules.k8s_utils", "modules.informer", "modules.k8s_client", "modules.pipeline", "modules.cluster_scan"
+]
+
+# 单位：秒
+BUDGETS = {
+    "first_paint_import_seconds": 0.3,
+    "cold_run_seconds": 2.0,
+    "warm_rerun_seconds": 0.3
+}
+
+_IMPORT_PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+for name in {first_paint!r}:
+    importlib.import_module(name)
+first_paint_done = time.perf_counter()
+heavy_loaded = sorted(m for m in ("kubernetes", "aiohttp") if m in sys.modules)
+for name in {deferred!r}:
+    importlib.import_module(name)
+print(json.dumps({{
+    "streamlit_import_seconds": round(streamlit_done - started, 3),
+    "first_paint_import_seconds": round(first_paint_done - streamlit_done, 3),
+    "deferred_import_seconds": round(time.perf_counter() - first_paint_done, 3),
+    "heavy_before_first_paint": heavy_loaded
+}}))
+"""
+
+_RUN_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+import modules.config_loader
+from pathlib import Path
+modules.config_loader.CONFIG_PATH = Path({config_dir!r})
+app = AppTest.from_file({app_path!r}, default_timeout=60)
+started = time.perf_counter()
+app.run()
+cold = time.perf_counter() - started
+started = time.perf_counter()
+app.run()
+warm = time.perf_counter() - started
+print(json.dumps({{
+    "cold_run_seconds": round(cold, 3),
+    "warm_rerun_seconds": round(warm, 3),
+    "exceptions": [str(e.value) for e in app.exception]
+}}))
+"""
+
+def _write_configs(config_dir: Path):
+    """最小配置：一个不会被访问的集群、关闭缓存与指标端口，快照库放在临时目录"""
+    (config_dir / "clusters.yaml").write_text(json.dumps({"clusters": [
+        {"cluster_name": "startup", "api_url": "https://127.0.0.1:1", "token": "startup"}
+    ]}))
+    (config_dir / "llm.yaml").write_text(json.dumps({"llm": {
+        "api_key": "startup", "base_url": "http://127.0.0.1:1/v1", "model": "gpt-4o", "cache": {"enabled": False}
+    }}))
+    (config_dir / "collector.yaml").write_text(json.dumps({"collector": {
+        "store_path": str(config_dir / "snapshots.db")
+    }}))
+    (config_dir / "metrics.yaml").write_text(json.dumps({"metrics": {"enabled": False}}))
+
+def _probe(code: str) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure(repeat: int) -> Dict:
+    """各项取 repeat 次中的最小值，减少机器抖动的影响"""
+    results: List[Dict] = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        _write_configs(Path(config_dir))
+        for _ in range(repeat):
+            result = _probe(_IMPORT_PROBE.format(first_paint=FIRST_PAINT_MODULES, deferred=DEFERRED_MODULES))
+            result.update(_probe(_RUN_PROBE.format(config_dir=config_dir, app_path=str(ROOT / "app.py"))))
+            results.append(result)
+    merged = dict(results[-1])
+    for key, value in merged.items():
+        if isinstance(value, float):
+            merged[key] = min(r[key] for r in results)
+    return merged
+
+def check(result: Dict) -> List[str]:
+    """返回超出预算的项"""
+    failures = [
+        f"{name}: {result[name]}s > {budget}s" for name, budget in BUDGETS.items() if result[name] > budget
+    ]
+    if result["heavy_before_first_paint"]:
+        failures.append("首屏前已导入: " + ", ".join(result["heavy_before_first_paint"]))
+    if result["exceptions"]:
+        failures.append("app.py 运行异常: " + "; ".join(result["exceptions"]))
+    return failures
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="app.py 启动耗时预算检查")
+    parser.add_argument("--repeat", type=int, default=3, help="重复测量次数，取最小值")
+    args = parser.parse_args(argv)
+
+    result = measure(args.repeat)
+    for name, value in result.items():
+        budget = BUDGETS.get(name)
+        print(f"{name:<28} {value}" + (f"  (预算 {budget}s)" if budget is not None else ""))
+    failures = check(result)
+    if failures:
+        print("超出启动预算：")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print("启动耗时在预算内")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
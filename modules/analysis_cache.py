@@ -0,0 +1,177 @@
+# analysis_cache.py
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from modules.pod_logs import iter_log_lines
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / ".cache" / "analysis.db"
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MEMORY_ENTRIES = 500
+
+# 指纹归一化规则：抹掉同一故障在不同副本、不同时刻之间必然不同的部分
+_NORMALIZE_PATTERNS = [
+    # UID
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uid>"),
+    # 时间戳：ISO8601、常见日志时间格式
+    (re.compile(r"\d{4}[-/]\d{2}[-/]\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<ts>"),
+    # IPv4（可带端口）与 IPv6
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b(?:[0-9a-f]{1,4}:){3,7}[0-9a-f]{1,4}\b", re.I), "<ip>"),
+    # 容器 ID、镜像 digest 等长十六进制串
+    (re.compile(r"\b[0-9a-f]{12,64}\b"), "<hex>"),
+    # 控制器生成的 Pod 名后缀（ReplicaSet 哈希与随机后缀均取自 Kubernetes 的无元音字母表）
+    (re.compile(r"-[bcdfghjklmnpqrstvwxz2456789]{8,10}-[bcdfghjklmnpqrstvwxz2456789]{5}\b"), "-<hash>"),
+    (re.compile(r"-[bcdfghjklmnpqrstvwxz2456789]{5}\b"), "-<hash>"),
+]
+
+def normalize_text(text: str) -> str:
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+def fingerprint(diagnostic_data: Dict) -> str:
+    """诊断数据的归一化指纹，同一 Deployment 多个副本的相同故障得到相同指纹
+
+    日志按行归一化后逐行送入哈希，转存到临时文件的大日志不会整段读入内存。
+    """
+    basic = diagnostic_data.get("basic", {})
+    pod_name = basic.get("name") or ""
+
+    def clean(text) -> str:
+        text = text or ""
+        if pod_name:
+            text = text.replace(pod_name, "<pod>")
+        return normalize_text(text)
+
+    logs = sorted(diagnostic_data.get("logs", {}).items())
+    normalized = {
+        "status": basic.get("status"),
+        "restarted": bool(basic.get("restart_count")),
+        "events": sorted(
+            (e.get("type") or "", e.get("reason") or "", clean(e.get("message")))
+            for e in diagnostic_data.get("events", [])
+        ),
+        "containers": [clean(container) for container, _ in logs]
+    }
+    hasher = hashlib.sha256(json.dumps(normalized, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    for container, container_logs in logs:
+        for kind in ("current", "previous", "error"):
+            hasher.update(f"\0{container}\0{kind}\0".encode("utf-8"))
+            for line in iter_log_lines(container_logs.get(kind)):
+                hasher.update(clean(line).encode("utf-8"))
+                hasher.update(b"\n")
+    return hasher.hexdigest()
+
+class AnalysisCache:
+    """LLM 分析结果缓存：内存 LRU + 本地 SQLite，两级均按 TTL 过期、按条数 LRU 淘汰"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "fingerprint TEXT PRIMARY KEY, content TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_last_access ON analyses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                content, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.metrics["memory_hits"] += 1
+                    return content
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT content, created_at FROM analyses WHERE fingerprint = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM analyses WHERE fingerprint = ?", (key,))
+                    self._conn.commit()
+                self.metrics["misses"] += 1
+                return None
+
+            self._conn.execute("UPDATE analyses SET last_access = ? WHERE fingerprint = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, row[0], row[1])
+            self.metrics["disk_hits"] += 1
+            return row[0]
+
+    def put(self, key: str, content: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, content, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (fingerprint, content, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM analyses WHERE fingerprint IN "
+                    "(SELECT fingerprint FROM analyses ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                )
+                self.metrics["evictions"] += overflow
+            self._conn.commit()
+            self.metrics["writes"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            hits = self.metrics["memory_hits"] + self.metrics["disk_hits"]
+            lookups = hits + self.metrics["misses"]
+            return dict(
+                self.metrics,
+                memory_entries=len(self._memory),
+                disk_entries=disk_entries,
+                hit_rate=round(hits / lookups, 3) if lookups else 0.0
+            )
+
+    def _remember(self, key: str, content: str, created_at: float):
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+_caches: Dict[str, AnalysisCache] = {}
+_caches_lock = threading.Lock()
+
+def get_analysis_cache(cache_config: Dict) -> Optional[AnalysisCache]:
+    """按缓存文件路径共享缓存实例；配置 enabled: false 时返回 None"""
+    if not cache_config.get("enabled", True):
+        return None
+    path = str(cache_config.get("path", DEFAULT_CACHE_PATH))
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = AnalysisCache(
+                path,
+                ttl_seconds=cache_config.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+                max_entries=cache_config.get("max_entries", DEFAULT_MAX_ENTRIES),
+                memory_entries=cache_config.get("memory_entries", DEFAULT_MEMORY_ENTRIES)
+            )
+        return _caches[path]
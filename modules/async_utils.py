@@ -0,0 +1,37 @@
+# async_utils.py
+import asyncio
+import threading
+from typing import AsyncIterator, Iterator, Optional
+
+class _EventLoopThread:
+    """进程内共享的后台事件循环，供同步代码（Streamlit 脚本、线程池）调用协程"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="async-event-loop", daemon=True).start()
+            return self._loop
+
+_loop_thread = _EventLoopThread()
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """在后台事件循环中执行协程并等待结果"""
+    return asyncio.run_coroutine_threadsafe(coro, _loop_thread.loop).result(timeout)
+
+def iterate_sync(agen: AsyncIterator) -> Iterator:
+    """把异步生成器转换为同步迭代器；同步端提前关闭时一并关闭异步生成器"""
+    loop = _loop_thread.loop
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop)
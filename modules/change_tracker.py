@@ -0,0 +1,118 @@
+# change_tracker.py
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+NEW = "new"
+CHANGED = "changed"
+RESOLVED = "resolved"
+UNCHANGED = "unchanged"
+
+DEFAULT_FEED_SIZE = 500
+
+def pod_key(pod: Dict) -> str:
+    """Pod 的身份：优先 UID，旧快照中没有 UID 时退回命名空间 + 名称"""
+    return pod.get("uid") or f"{pod['namespace']}/{pod['pod_name']}"
+
+def failure_state(pod: Dict) -> Tuple:
+    """故障状态：重启次数与最近的等待/终止原因，任一变化都视为故障有了新进展"""
+    return (pod.get("restart_count") or 0, pod.get("reason"), pod.get("exit_code"))
+
+class ChangeTracker:
+    """对比同一集群相邻两次扫描的异常 Pod，产出新增、恢复与变化，并保存各 Pod 当前状态下的诊断结果
+
+    Pod 的故障状态不变时，上一次的诊断结果可直接复用，无需重新收集诊断数据与调用 LLM。
+    """
+
+    def __init__(self, feed_size: int = DEFAULT_FEED_SIZE):
+        self._lock = threading.Lock()
+        # {pod_key: (故障状态, Pod)}
+        self._states: Dict[str, Tuple[Tuple, Dict]] = {}
+        # {pod_key: (诊断时的故障状态, 诊断结果)}
+        self._analyses: Dict[str, Tuple[Tuple, str]] = {}
+        # {pod_key: 最近一次扫描中的变化类型}
+        self._changes: Dict[str, str] = {}
+        self._feed = deque(maxlen=feed_size)
+        self.scanned_at: Optional[float] = None
+        self._last_diff: Dict[str, List[Dict]] = {NEW: [], CHANGED: [], RESOLVED: [], UNCHANGED: []}
+
+    def update(self, pods: List[Dict], scanned_at: Optional[float] = None,
+               partial: bool = False) -> Dict[str, List[Dict]]:
+        """用本次扫描结果替换上一次的状态，返回 {new, changed, resolved, unchanged: [Pod]}
+
+        首次扫描只建立基线，所有 Pod 记为 unchanged；恢复的 Pod 同时丢弃其诊断结果。scanned_at 为扫描时间
+        （如快照的生成时间），与上一次相同时视为同一次扫描，直接返回上一次的对比结果。
+        partial 表示扫描中途停止、结果不完整：此时不判定恢复，未扫描到的 Pod 保留上一次的状态与诊断结果。
+        """
+        now = scanned_at or time.time()
+        diff = {NEW: [], CHANGED: [], RESOLVED: [], UNCHANGED: []}
+        current = {pod_key(pod): (failure_state(pod), pod) for pod in pods}
+        with self._lock:
+            if scanned_at is not None and scanned_at == self.scanned_at:
+                return self._last_diff
+            baseline = self.scanned_at is None
+            for key, (state, pod) in current.items():
+                previous = self._states.get(key)
+                if baseline:
+                    diff[UNCHANGED].append(pod)
+                elif previous is None:
+                    diff[NEW].append(pod)
+                elif previous[0] != state:
+                    diff[CHANGED].append(pod)
+                else:
+                    diff[UNCHANGED].append(pod)
+            for key, previous in self._states.items():
+                if key in current:
+                    continue
+                if partial:
+                    current[key] = previous
+                else:
+                    diff[RESOLVED].append(previous[1])
+                    self._analyses.pop(key, None)
+            self._states = current
+            self._changes = {pod_key(pod): change for change in (NEW, CHANGED, UNCHANGED) for pod in diff[change]}
+            self.scanned_at = now
+            self._last_diff = diff
+            for change in (NEW, CHANGED, RESOLVED):
+                for pod in diff[change]:
+                    self._feed.append({
+                        "time": now,
+                        "change": change,
+                        "namespace": pod["namespace"],
+                        "pod_name": pod["pod_name"],
+                        "status": pod["status"],
+                        "reason": pod.get("reason"),
+                        "restart_count": pod.get("restart_count") or 0
+                    })
+        return diff
+
+    def change_of(self, pod: Dict) -> Optional[str]:
+        """Pod 在最近一次扫描中的变化类型；不在最近一次扫描中时返回 None"""
+        return self._changes.get(pod_key(pod))
+
+    def analysis_for(self, pod: Dict) -> Optional[str]:
+        """Pod 当前故障状态下已有的诊断结果，状态变化后失效"""
+        with self._lock:
+            saved = self._analyses.get(pod_key(pod))
+        if saved is not None and saved[0] == failure_state(pod):
+            return saved[1]
+        return None
+
+    def record_analysis(self, pod: Dict, analysis: str):
+        with self._lock:
+            self._analyses[pod_key(pod)] = (failure_state(pod), analysis)
+
+    def feed(self, limit: int = 100) -> List[Dict]:
+        """最近的变化记录，新的在前"""
+        with self._lock:
+            return list(self._feed)[-limit:][::-1]
+
+_trackers: Dict[str, ChangeTracker] = {}
+_trackers_lock = threading.Lock()
+
+def get_change_tracker(cluster_name: str) -> ChangeTracker:
+    with _trackers_lock:
+        if cluster_name not in _trackers:
+            _trackers[cluster_name] = ChangeTracker()
+        return _trackers[cluster_name]
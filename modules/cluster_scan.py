@@ -0,0 +1,89 @@
+# cluster_scan.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+from modules.async_utils import iterate_sync
+from modules.informer import peek_cluster_cache
+from modules.k8s_utils import ScanTruncated, get_cluster_summary
+
+# 同时扫描的集群数上限与单个集群的扫描时限（秒）
+DEFAULT_SCAN_CONCURRENCY = 16
+DEFAULT_CLUSTER_DEADLINE = 20.0
+# 扫描线程自身按 deadline 限制请求超时；超出 deadline 这么多秒仍未返回时不再等待
+DEADLINE_GRACE = 5.0
+
+# 各集群最近一次成功的概览，超时的集群以此作为带标注的旧数据展示
+_last_success: Dict[str, dict] = {}
+_last_success_lock = threading.Lock()
+
+# 集群 API 调用是同步的，放在独立线程池中执行；请求超时不超过剩余时限，超时的扫描线程随之退出并释放线程
+_executor = ThreadPoolExecutor(max_workers=DEFAULT_SCAN_CONCURRENCY * 2, thread_name_prefix="cluster-scan")
+
+def _timeout_result(cluster: dict, deadline: float) -> dict:
+    with _last_success_lock:
+        stale = _last_success.get(cluster["cluster_name"])
+    if stale is not None:
+        return dict(stale, status="stale", error=f"{deadline:g}s 内未完成扫描，显示 {stale['timestamp']} 的数据")
+    return {
+        "cluster_name": cluster["cluster_name"],
+        "status": "error",
+        "timestamp": "",
+        "nodes": 0,
+        "pods": 0,
+        "deployments": 0,
+        "statefulsets": 0,
+        "error": f"{deadline:g}s 内未完成扫描"
+    }
+
+def _summarize(cluster: dict, expires_at: float):
+    """在扫描线程中执行，expires_at 为提交时确定的 time.monotonic() 时刻；超出时限返回 None"""
+    if time.monotonic() >= expires_at:
+        # 排队等待线程期间已经超时，不再发起请求
+        return None
+    try:
+        return get_cluster_summary(cluster, peek_cluster_cache(cluster["cluster_name"]), deadline=expires_at)
+    except ScanTruncated:
+        return None
+
+async def _scan_cluster(index: int, cluster: dict, semaphore: asyncio.Semaphore, deadline: float) -> Tuple[int, dict]:
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        # 时限从提交时开始计算，线程池被卡住的集群占满时，排队等待线程的时间同样计入
+        expires_at = time.monotonic() + deadline
+        future = loop.run_in_executor(_executor, _summarize, cluster, expires_at)
+        try:
+            result = await asyncio.wait_for(future, deadline + DEADLINE_GRACE)
+        except asyncio.TimeoutError:
+            result = None
+
+    if result is None:
+        return index, _timeout_result(cluster, deadline)
+    if result["status"] == "success":
+        with _last_success_lock:
+            _last_success[cluster["cluster_name"]] = result
+    return index, result
+
+async def _scan(clusters: List[dict], concurrency: int, deadline: float) -> AsyncIterator[Tuple[int, dict]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.ensure_future(_scan_cluster(index, cluster, semaphore, deadline))
+        for index, cluster in enumerate(clusters)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def scan_clusters(clusters: List[dict], concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+                  deadline: float = DEFAULT_CLUSTER_DEADLINE) -> Iterator[Tuple[int, dict]]:
+    """并发扫描所有集群概览，按完成顺序产出 (集群下标, 概览)
+
+    所有集群同时发起，最多 concurrency 个同时执行；单个集群从提交扫描起超过 deadline 秒未完成时，
+    有历史成功数据则产出 status 为 stale 的旧数据，否则产出超时错误，不会阻塞其余集群。
+    deadline 同时作为各请求的超时上限传给客户端，卡住的请求到期即返回，不会长期占用扫描线程。
+    """
+    return iterate_sync(_scan(clusters, concurrency, deadline))
@@ -0,0 +1,173 @@
+# collector.py
+"""后台采集进程：按计划扫描 clusters.yaml 中的所有集群，把结果写入快照库供页面读取
+
+用法：python -m modules.collector [--once] [--cluster NAME ...]
+"""
+import argparse
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from modules.config_loader import load_collector_config, load_metrics_config, read_config_section
+from modules.k8s_client import close_all_clients, get_api_client
+from modules.metrics import DEFAULT_METRICS_HOST, start_metrics_server
+from modules.k8s_utils import add_top_event_reasons, get_all_applications, get_cluster_summary, get_non_running_pods
+from modules.snapshot_store import ABNORMAL_PODS, APPLICATIONS, SUMMARY, SnapshotStore, get_snapshot_store
+
+logger = logging.getLogger(__name__)
+
+# 集群未配置 scan_interval 时的默认采集间隔（秒）
+DEFAULT_INTERVAL = 60
+# 每次间隔随机浮动的比例，避免多个集群、多个采集进程同时打到 apiserver
+DEFAULT_JITTER = 0.2
+DEFAULT_MAX_WORKERS = 8
+# 单个集群异常 Pod 扫描的时间预算（秒）
+DEFAULT_POD_SCAN_BUDGET = 30
+
+def _applications_payload(api_client) -> Dict:
+    applications, errors = get_all_applications(api_client)
+    return {"applications": applications, "errors": errors}
+
+def _abnormal_pods_payload(api_client, time_budget: float):
+    pods = get_non_running_pods(api_client, time_budget=time_budget)
+    if not pods.partial:
+        # 分组用的事件原因在采集时写入快照，页面读取快照时无需再请求事件
+        add_top_event_reasons(api_client, pods)
+    return pods
+
+def collect_cluster(cluster: Dict, store: SnapshotStore, pod_scan_budget: float = DEFAULT_POD_SCAN_BUDGET) -> Dict:
+    """扫描单个集群的概览、异常 Pod 与应用列表并写入快照库，返回概览
+
+    异常 Pod 扫描超出时间预算而不完整时不写入快照，保留上一次的完整快照，以免页面把未扫描到的 Pod 当作已恢复。
+    """
+    name = cluster["cluster_name"]
+    summary = get_cluster_summary(cluster)
+    store.put(name, SUMMARY, summary)
+    if summary["status"] != "success":
+        # 连接失败时保留上次的 Pod 与应用快照
+        return summary
+
+    api_client = get_api_client(cluster)
+    for kind, scan in (
+        (ABNORMAL_PODS, lambda: _abnormal_pods_payload(api_client, pod_scan_budget)),
+        (APPLICATIONS, lambda: _applications_payload(api_client))
+    ):
+        try:
+            payload = scan()
+            if getattr(payload, "partial", False):
+                logger.warning("集群 %s 的 %s 扫描不完整（%d 条），本次不写入快照", name, kind, len(payload))
+                continue
+            store.put(name, kind, payload)
+        except Exception as e:
+            logger.warning("集群 %s 的 %s 采集失败: %s", name, kind, e)
+    return summary
+
+class Collector:
+    """按集群各自的间隔调度采集，每次间隔加随机抖动；同一集群上一轮未完成时不会重复提交"""
+
+    def __init__(self, clusters: List[Dict], store: SnapshotStore, collector_config: Dict):
+        self.clusters = clusters
+        self.store = store
+        self.default_interval = collector_config.get("default_interval", DEFAULT_INTERVAL)
+        self.jitter = collector_config.get("jitter", DEFAULT_JITTER)
+        self.pod_scan_budget = collector_config.get("pod_scan_budget", DEFAULT_POD_SCAN_BUDGET)
+        self.max_workers = collector_config.get("max_workers", DEFAULT_MAX_WORKERS)
+        self._schedule = []
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+
+    def interval(self, cluster: Dict) -> float:
+        return cluster.get("scan_interval", self.default_interval)
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _collect(self, index: int):
+        cluster = self.clusters[index]
+        started = time.monotonic()
+        try:
+            summary = collect_cluster(cluster, self.store, self.pod_scan_budget)
+            logger.info("集群 %s 采集完成（%s，%.1fs）", cluster["cluster_name"], summary["status"],
+                        time.monotonic() - started)
+        except Exception as e:
+            logger.warning("集群 %s 采集失败: %s", cluster["cluster_name"], e)
+
+    def _collect_and_reschedule(self, index: int):
+        try:
+            self._collect(index)
+        finally:
+            # 从本轮结束时开始计时，慢集群不会堆积任务
+            with self._cond:
+                heapq.heappush(self._schedule, (time.monotonic() + self._jittered(self.interval(self.clusters[index])), index))
+                self._cond.notify()
+
+    def run_once(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector") as executor:
+            list(executor.map(self._collect, range(len(self.clusters))))
+
+    def run_forever(self):
+        now = time.monotonic()
+        # 首轮在各自间隔的抖动范围内错开启动
+        self._schedule = [
+            (now + random.uniform(0, self.interval(cluster) * self.jitter), index)
+            for index, cluster in enumerate(self.clusters)
+        ]
+        heapq.heapify(self._schedule)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector")
+        try:
+            while not self._stopped.is_set():
+                with self._cond:
+                    wait_seconds = self._schedule[0][0] - time.monotonic() if self._schedule else None
+                    if wait_seconds is None or wait_seconds > 0:
+                        self._cond.wait(wait_seconds)
+                        continue
+                    _, index = heapq.heappop(self._schedule)
+                executor.submit(self._collect_and_reschedule, index)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="按计划扫描所有集群并写入快照库")
+    parser.add_argument("--once", action="store_true", help="扫描一轮后退出")
+    parser.add_argument("--cluster", action="append", help="只采集指定集群，可重复")
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--metrics-port", type=int, help="指标端口，默认取 metrics.yaml 的 collector_port")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    clusters = read_config_section("clusters.yaml", "clusters", [])
+    if args.cluster:
+        clusters = [c for c in clusters if c["cluster_name"] in args.cluster]
+    if not clusters:
+        parser.error("集群配置文件中未找到有效的配置")
+
+    metrics_config = load_metrics_config()
+    if args.metrics_port or (not args.once and metrics_config.get("enabled", True)):
+        start_metrics_server(
+            args.metrics_port or metrics_config.get("collector_port", 9109),
+            metrics_config.get("host", DEFAULT_METRICS_HOST)
+        )
+
+    collector_config = load_collector_config()
+    collector = Collector(clusters, get_snapshot_store(collector_config), collector_config)
+    try:
+        if args.once:
+            collector.run_once()
+        else:
+            logger.info("开始采集 %d 个集群", len(clusters))
+            collector.run_forever()
+    except KeyboardInterrupt:
+        collector.stop()
+    finally:
+        close_all_clients()
+
+if __name__ == "__main__":
+    main()
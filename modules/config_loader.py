@@ -1,38 +1,79 @@
+import copy
+import threading
 import yaml
 import streamlit as st
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+CONFIG_PATH = Path(__file__).parent.parent / "config"
+
+# {文件路径: ((mtime_ns, size), 解析结果)}，文件修改后自动重新解析
+_parsed: Dict[Path, Tuple[tuple, Dict]] = {}
+_parsed_lock = threading.Lock()
+
+def _read_yaml(config_file: Path) -> Dict:
+    """解析 YAML 文件，按修改时间与大小缓存，页面每次重跑不必重复读盘"""
+    stat = config_file.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _parsed_lock:
+        cached = _parsed.get(config_file)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    with open(config_file, "r") as f:
+        data = yaml.safe_load(f) or {}
+    with _parsed_lock:
+        _parsed[config_file] = (signature, data)
+    return data
+
+def read_config_section(filename: str, section: str, default: Any) -> Any:
+    """读取 config 目录下某个 YAML 文件的顶层字段，文件或字段不存在时返回 default
+
+    返回的是缓存内容的副本，调用方可以随意修改。
+    """
+    config_file = CONFIG_PATH / filename
+    if not config_file.exists():
+        return default
+    return copy.deepcopy(_read_yaml(config_file).get(section, default))
+
+def load_collector_config() -> Dict:
+    """加载后台采集配置，未配置时使用各项默认值"""
+    return read_config_section("collector.yaml", "collector", {}) or {}
+
+def load_metrics_config() -> Dict:
+    """加载指标导出配置，未配置时使用各项默认值"""
+    return read_config_section("metrics.yaml", "metrics", {}) or {}
+
+def load_store_config() -> Dict:
+    """加载共享结果存储配置，未配置时使用各项默认值"""
+    return read_config_section("store.yaml", "result_store", {}) or {}
+
+def load_rules_config() -> Dict:
+    """加载本地诊断规则：rule_engine 段的开关与阈值，加上 rules 段的规则列表"""
+    config = read_config_section("rules.yaml", "rule_engine", {}) or {}
+    config["rules"] = read_config_section("rules.yaml", "rules", []) or []
+    return config
 
 def load_configs() -> tuple:
     """加载所有配置文件"""
     try:
-        config_path = Path(__file__).parent.parent / "config"
-        
         # 加载集群配置
-        clusters = []
-        cluster_config = config_path / "clusters.yaml"
-        if cluster_config.exists():
-            with open(cluster_config, "r") as f:
-                clusters = yaml.safe_load(f).get("clusters", [])
+        clusters = read_config_section("clusters.yaml", "clusters", [])
         if not clusters:
             st.error("集群配置文件中未找到有效的配置")
             st.stop()
-            
+
         # 加载LLM配置
-        llm_config = {}
-        llm_file = config_path / "llm.yaml"
-        if llm_file.exists():
-            with open(llm_file, "r") as f:
-                llm_config = yaml.safe_load(f).get("llm", {})
-        if not llm_config.get("api_key"):
+        llm_config = read_config_section("llm.yaml", "llm", {})
+        endpoints = llm_config.get("endpoints") or [{}]
+        if not all(endpoint.get("api_key", llm_config.get("api_key")) for endpoint in endpoints):
             st.error("LLM配置文件中未找到有效的API密钥")
             st.stop()
-            
+
         return clusters, llm_config
-        
+
     except FileNotFoundError as e:
         st.error(f"配置文件未找到: {str(e)}")
         st.stop()
     except Exception as e:
         st.error(f"配置加载失败: {str(e)}")
-        st.stop()
\ No newline at end of file
+        st.stop()
@@ -0,0 +1,76 @@
+# event_index.py
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_EVENT_LIMIT = 5
+
+def event_time(event) -> Optional[datetime]:
+    """事件最近一次发生的时间：series.lastObservedTime > lastTimestamp > eventTime > firstTimestamp > 创建时间"""
+    candidates = (
+        event.series.last_observed_time if event.series else None,
+        event.last_timestamp,
+        event.event_time,
+        event.first_timestamp,
+        event.metadata.creation_timestamp if event.metadata else None
+    )
+    return next((value for value in candidates if value is not None), None)
+
+def _sort_key(value: Optional[datetime]) -> float:
+    return value.timestamp() if value is not None else float("-inf")
+
+def compact_event(event) -> Dict:
+    """只保留诊断需要的字段，series.count（新版事件 API）优先于 count"""
+    return {
+        "type": event.type,
+        "reason": event.reason,
+        "message": event.message,
+        "last_time": event_time(event),
+        "count": (event.series.count if event.series else None) or event.count or 1,
+        "uid": event.involved_object.uid if event.involved_object else None
+    }
+
+def collapse_events(events: Iterable[Dict], limit: Optional[int] = DEFAULT_EVENT_LIMIT) -> List[Dict]:
+    """类型/原因/消息相同的事件合并为一条并累加次数，按最近发生时间倒序取前 limit 条"""
+    merged: Dict[tuple, Dict] = {}
+    for event in events:
+        key = (event["type"], event["reason"], event["message"])
+        entry = merged.get(key)
+        if entry is None:
+            merged[key] = {k: event[k] for k in ("type", "reason", "message", "last_time", "count")}
+            continue
+        entry["count"] += event["count"]
+        if _sort_key(event["last_time"]) > _sort_key(entry["last_time"]):
+            entry["last_time"] = event["last_time"]
+    ordered = sorted(merged.values(), key=lambda e: _sort_key(e["last_time"]), reverse=True)
+    return ordered[:limit] if limit else ordered
+
+class EventIndex:
+    """按涉及对象（类型、命名空间、名称）索引的事件，一次批量 list 的结果供多个 Pod 的诊断共用"""
+
+    def __init__(self, events: Iterable = ()):
+        self._by_object: Dict[tuple, List[Dict]] = defaultdict(list)
+        self.size = 0
+        for event in events:
+            self.add(event)
+
+    def add(self, event):
+        involved = event.involved_object
+        if involved is None:
+            return
+        namespace = involved.namespace or (event.metadata.namespace if event.metadata else None)
+        self._by_object[(involved.kind, namespace, involved.name)].append(compact_event(event))
+        self.size += 1
+
+    def events_for(self, kind: str, namespace: str, name: str, uid: Optional[str] = None,
+                   limit: Optional[int] = DEFAULT_EVENT_LIMIT) -> List[Dict]:
+        """对象最近的事件；给出 uid 时排除同名旧对象（如重建的 StatefulSet Pod）留下的事件"""
+        events = self._by_object.get((kind, namespace, name), [])
+        if uid:
+            events = [e for e in events if not e["uid"] or e["uid"] == uid]
+        return collapse_events(events, limit)
+
+    def top_reason(self, kind: str, namespace: str, name: str, uid: Optional[str] = None) -> Optional[str]:
+        """对象最主要的事件原因：合并后次数最多的 Warning 事件，次数相同时取最近发生的；没有 Warning 事件时为 None"""
+        warnings = [e for e in self.events_for(kind, namespace, name, uid, limit=None) if e["type"] == "Warning"]
+        return max(warnings, key=lambda e: e["count"])["reason"] if warnings else None
@@ -0,0 +1,39 @@
+# grouping.py
+from typing import Dict, List
+
+def failure_signature(pod: Dict) -> tuple:
+    """故障签名：Pod 阶段、容器等待/终止原因、退出码、最主要的事件原因（扫描时写入的 top_event_reason）"""
+    return (pod["status"], pod.get("reason"), pod.get("exit_code"), pod.get("top_event_reason"))
+
+def group_abnormal_pods(pods: List[Dict]) -> List[Dict]:
+    """按所属控制器 + 故障签名聚合异常 Pod，同组副本只需诊断一个代表
+
+    没有控制器的 Pod 单独成组。每组的代表取重启次数最多的 Pod，其日志通常最有信息量。
+    返回的分组按副本数降序排列。
+    """
+    groups: Dict[tuple, Dict] = {}
+    for pod in pods:
+        owner = (pod.get("owner_kind"), pod.get("owner_name")) if pod.get("owner_name") else ("Pod", pod["pod_name"])
+        key = (pod["namespace"],) + owner + failure_signature(pod)
+
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "namespace": pod["namespace"],
+                "owner_kind": owner[0],
+                "owner_name": owner[1],
+                "status": pod["status"],
+                "reason": pod.get("reason"),
+                "exit_code": pod.get("exit_code"),
+                "top_event_reason": pod.get("top_event_reason"),
+                "pods": [],
+                "representative": pod
+            }
+        group["pods"].append(pod)
+        if pod.get("restart_count", 0) > group["representative"].get("restart_count", 0):
+            group["representative"] = pod
+
+    results = list(groups.values())
+    for group in results:
+        group["replicas"] = len(group["pods"])
+    return sorted(results, key=lambda g: (-g["replicas"], g["namespace"], g["owner_name"]))
@@ -0,0 +1,359 @@
+# informer.py
+import atexit
+import logging
+import threading
+import time
+from kubernetes import client, watch
+from kubernetes.client import ApiClient
+from typing import Callable, Dict, List, Optional
+from modules.k8s_client import on_client_closed
+from modules.topology import OwnershipGraph
+
+logger = logging.getLogger(__name__)
+
+# 单次 watch 的服务端超时，到期后从最新 resourceVersion 续订
+WATCH_TIMEOUT_SECONDS = 300
+# watch 异常后的重试间隔上限
+MAX_BACKOFF_SECONDS = 30
+# 集群缓存闲置超过该时间（秒）后停止并释放，下次需要实时数据时重新同步
+DEFAULT_CACHE_IDLE_SECONDS = 900
+
+HTTP_GONE = 410
+
+def _object_key(obj) -> str:
+    if obj.metadata.namespace:
+        return f"{obj.metadata.namespace}/{obj.metadata.name}"
+    return obj.metadata.name
+
+class ResourceInformer:
+    """单类资源的本地副本：一次分页 list 填充，之后通过 watch 增量更新
+
+    watch 开启 bookmark 以推进 resourceVersion，收到 410 Gone 时重新 list。
+    indexers 为 {索引名: obj -> 索引值列表}，用于 O(k) 的二级查询。
+    """
+
+    def __init__(self, kind: str, list_func: Callable, indexers: Optional[Dict[str, Callable]] = None,
+                 page_size: int = 500):
+        self.kind = kind
+        self._list_func = list_func
+        self._indexers = indexers or {}
+        self._page_size = page_size
+        self._lock = threading.RLock()
+        self._store: Dict[str, object] = {}
+        self._indices: Dict[str, Dict[str, set]] = {name: {} for name in self._indexers}
+        self._handlers: List[Callable] = []
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._watch: Optional[watch.Watch] = None
+        self._thread: Optional[threading.Thread] = None
+        self.resource_version: Optional[str] = None
+
+    # ---------- 生命周期 ----------
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"informer-{self.kind}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止同步并释放本地副本"""
+        self._stopped.set()
+        if self._watch is not None:
+            self._watch.stop()
+        with self._lock:
+            self._store = {}
+            self._indices = {name: {} for name in self._indexers}
+
+    def has_synced(self) -> bool:
+        """已完成首次同步且未停止；停止后本地副本不再更新，不应再作为实时数据使用"""
+        return self._synced.is_set() and not self._stopped.is_set()
+
+    def wait_for_sync(self, timeout: Optional[float] = None) -> bool:
+        return self._synced.wait(timeout)
+
+    def add_handler(self, handler: Callable):
+        """注册事件回调 handler(event_type, obj)，event_type 为 ADDED/MODIFIED/DELETED"""
+        self._handlers.append(handler)
+
+    # ---------- 查询 ----------
+
+    def get(self, key: str):
+        with self._lock:
+            return self._store.get(key)
+
+    def list(self) -> List:
+        with self._lock:
+            return list(self._store.values())
+
+    def by_index(self, index_name: str, value: str) -> List:
+        with self._lock:
+            keys = self._indices[index_name].get(value, ())
+            return [self._store[k] for k in keys]
+
+    def count(self) -> int:
+        return len(self._store)
+
+    # ---------- 同步循环 ----------
+
+    def _run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            try:
+                if self.resource_version is None:
+                    self._relist()
+                self._watch_once()
+                backoff = 1
+            except client.ApiException as e:
+                if e.status == HTTP_GONE:
+                    logger.info("%s watch 的 resourceVersion 已过期，重新 list", self.kind)
+                    self.resource_version = None
+                    continue
+                logger.warning("%s 同步失败: %s", self.kind, e)
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            except Exception as e:
+                logger.warning("%s 同步异常: %s", self.kind, e)
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+    def _relist(self):
+        items = {}
+        continue_token = None
+        while True:
+            kwargs = {"limit": self._page_size}
+            if continue_token:
+                kwargs["_continue"] = continue_token
+            page = self._list_func(**kwargs)
+            for obj in page.items:
+                items[_object_key(obj)] = obj
+            continue_token = page.metadata._continue
+            if not continue_token:
+                break
+
+        if self._stopped.is_set():
+            return
+        with self._lock:
+            removed = [obj for key, obj in self._store.items() if key not in items]
+            self._store = items
+            self._indices = {name: {} for name in self._indexers}
+            for key, obj in items.items():
+                self._index_add(key, obj)
+        self.resource_version = page.metadata.resource_version
+        self._synced.set()
+
+        for obj in removed:
+            self._notify("DELETED", obj)
+        for obj in items.values():
+            self._notify("ADDED", obj)
+
+    def _watch_once(self):
+        self._watch = watch.Watch()
+        stream = self._watch.stream(
+            self._list_func,
+            resource_version=self.resource_version,
+            allow_watch_bookmarks=True,
+            timeout_seconds=WATCH_TIMEOUT_SECONDS,
+            _request_timeout=(10, WATCH_TIMEOUT_SECONDS + 30)
+        )
+        for event in stream:
+            if self._stopped.is_set():
+                break
+            event_type = event["type"]
+            if event_type == "BOOKMARK":
+                self.resource_version = event["raw_object"]["metadata"]["resourceVersion"]
+                continue
+
+            obj = event["object"]
+            key = _object_key(obj)
+            with self._lock:
+                old = self._store.pop(key, None)
+                if old is not None:
+                    self._index_remove(key, old)
+                if event_type != "DELETED":
+                    self._store[key] = obj
+                    self._index_add(key, obj)
+            self.resource_version = obj.metadata.resource_version
+            self._notify(event_type, obj)
+
+    def _index_add(self, key: str, obj):
+        for name, func in self._indexers.items():
+            for value in func(obj):
+                self._indices[name].setdefault(value, set()).add(key)
+
+    def _index_remove(self, key: str, obj):
+        for name, func in self._indexers.items():
+            for value in func(obj):
+                keys = self._indices[name].get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._indices[name][value]
+
+    def _notify(self, event_type: str, obj):
+        for handler in self._handlers:
+            try:
+                handler(event_type, obj)
+            except Exception as e:
+                logger.warning("%s 事件回调失败: %s", self.kind, e)
+
+def _namespace_index(obj) -> List[str]:
+    return [obj.metadata.namespace]
+
+def _abnormal_pod_index(pod) -> List[str]:
+    if pod.status and pod.status.phase not in ("Running", "Succeeded"):
+        return ["abnormal"]
+    return []
+
+class ClusterCache:
+    """单个集群的 Pod/Deployment/StatefulSet/ReplicaSet/Job/Node 本地缓存与所有权图，进程内所有会话共享"""
+
+    def __init__(self, cluster_name: str, api_client: ApiClient):
+        self.cluster_name = cluster_name
+        self.api_client = api_client
+        self.stopped = False
+        self.last_used = time.monotonic()
+        core_api = client.CoreV1Api(api_client)
+        apps_api = client.AppsV1Api(api_client)
+        batch_api = client.BatchV1Api(api_client)
+
+        self.pods = ResourceInformer(
+            "pods", core_api.list_pod_for_all_namespaces,
+            indexers={"namespace": _namespace_index, "abnormal": _abnormal_pod_index}
+        )
+        self.deployments = ResourceInformer(
+            "deployments", apps_api.list_deployment_for_all_namespaces,
+            indexers={"namespace": _namespace_index}
+        )
+        self.statefulsets = ResourceInformer(
+            "statefulsets", apps_api.list_stateful_set_for_all_namespaces,
+            indexers={"namespace": _namespace_index}
+        )
+        # ReplicaSet 与 Job 只用于还原 Pod → ReplicaSet → Deployment、Pod → Job → CronJob 的所有权链
+        self.replicasets = ResourceInformer("replicasets", apps_api.list_replica_set_for_all_namespaces)
+        self.jobs = ResourceInformer("jobs", batch_api.list_job_for_all_namespaces)
+        self.nodes = ResourceInformer("nodes", core_api.list_node)
+
+        self.topology = OwnershipGraph()
+        self.pods.add_handler(self.topology.handler("Pod"))
+        self.replicasets.add_handler(self.topology.handler("ReplicaSet"))
+        self.jobs.add_handler(self.topology.handler("Job"))
+
+    @property
+    def informers(self) -> List[ResourceInformer]:
+        return [self.pods, self.deployments, self.statefulsets, self.replicasets, self.jobs, self.nodes]
+
+    def start(self):
+        for informer in self.informers:
+            informer.start()
+
+    def touch(self):
+        """标记缓存仍在使用，闲置淘汰按最近一次使用计时"""
+        self.last_used = time.monotonic()
+
+    def stop(self):
+        self.stopped = True
+        for informer in self.informers:
+            informer.stop()
+        self.topology.clear()
+
+    def object_count(self) -> int:
+        return sum(informer.count() for informer in self.informers)
+
+    def has_synced(self) -> bool:
+        return all(informer.has_synced() for informer in self.informers)
+
+    def wait_for_sync(self, timeout: Optional[float] = None) -> bool:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for informer in self.informers:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not informer.wait_for_sync(remaining):
+                return False
+        return True
+
+_caches: Dict[str, ClusterCache] = {}
+_caches_lock = threading.Lock()
+_cache_idle_seconds = DEFAULT_CACHE_IDLE_SECONDS
+_sweeper: Optional[threading.Thread] = None
+
+def get_cluster_cache(cluster_name: str, api_client: ApiClient) -> ClusterCache:
+    """获取（必要时创建并启动）集群缓存，同一集群在进程内只有一份
+
+    缓存绑定创建时的 ApiClient；传入的客户端不同（集群配置变更后客户端已重建）时停止旧缓存并重建。
+    """
+    with _caches_lock:
+        cache = _caches.get(cluster_name)
+        if cache is not None and cache.api_client is not api_client:
+            cache.stop()
+            cache = None
+        if cache is None:
+            cache = ClusterCache(cluster_name, api_client)
+            cache.start()
+            _caches[cluster_name] = cache
+            _start_sweeper()
+        cache.touch()
+        return cache
+
+def peek_cluster_cache(cluster_name: str) -> Optional[ClusterCache]:
+    """返回已存在的集群缓存，不会新建"""
+    with _caches_lock:
+        return _caches.get(cluster_name)
+
+def _drop_caches_of_client(cluster_name: str, api_client: ApiClient):
+    # 客户端关闭后 informer 的请求只会一直失败，停止并丢弃基于它的缓存
+    with _caches_lock:
+        cache = _caches.get(cluster_name)
+        if cache is not None and cache.api_client is api_client:
+            cache.stop()
+            del _caches[cluster_name]
+
+def set_cache_idle_seconds(seconds: float):
+    """设置集群缓存的闲置时限；不大于 0 时不淘汰"""
+    global _cache_idle_seconds
+    _cache_idle_seconds = seconds
+
+def evict_idle_caches() -> List[str]:
+    """停止并丢弃闲置超过时限的集群缓存，返回被淘汰的集群名"""
+    if _cache_idle_seconds <= 0:
+        return []
+    now = time.monotonic()
+    with _caches_lock:
+        idle = [name for name, cache in _caches.items() if now - cache.last_used > _cache_idle_seconds]
+        for name in idle:
+            _caches.pop(name).stop()
+    for name in idle:
+        logger.info("集群 %s 的缓存闲置超过 %ss，已停止并释放", name, _cache_idle_seconds)
+    return idle
+
+def _sweep_loop():
+    while True:
+        time.sleep(min(60, max(_cache_idle_seconds / 4, 1)))
+        try:
+            evict_idle_caches()
+        except Exception as e:
+            logger.warning("集群缓存闲置淘汰失败: %s", e)
+
+def _start_sweeper():
+    # 调用方已持有 _caches_lock
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = threading.Thread(target=_sweep_loop, name="cluster-cache-sweeper", daemon=True)
+        _sweeper.start()
+
+def cache_stats() -> List[Dict]:
+    now = time.monotonic()
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [
+        {"cluster_name": cache.cluster_name, "objects": cache.object_count(),
+         "synced": cache.has_synced(), "idle_seconds": round(now - cache.last_used)}
+        for cache in caches
+    ]
+
+def stop_all_caches():
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.stop()
+        _caches.clear()
+
+on_client_closed(_drop_caches_of_client)
+atexit.register(stop_all_caches)
@@ -0,0 +1,238 @@
+# k8s_client.py
+import atexit
+import logging
+import socket
+import threading
+import time
+from kubernetes.client import ApiClient, Configuration
+from kubernetes.client.rest import ApiException, RESTResponse
+from typing import Callable, Dict, List
+from urllib.parse import urlparse
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import MaxRetryError, TimeoutError as RequestTimeoutError
+from urllib3.util.retry import Retry
+from modules import metrics
+
+logger = logging.getLogger(__name__)
+
+# 连接池与超时的默认值，可在 clusters.yaml 中按集群覆盖
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_REQUEST_TIMEOUT = 30
+
+# 空闲长连接开启 TCP keepalive，避免被中间设备静默断开
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+]
+
+class NoTimeoutRetry(Retry):
+    """连接失败、连接被重置等错误照常重试，请求超时不重试
+
+    请求超时已经等满了调用方给出的时限（按剩余时间预算设置时尤其如此），重试只会让总耗时成倍超出时限。
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, RequestTimeoutError):
+            raise MaxRetryError(_pool, url, error) from error
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def api_operation(method: str, url: str, query_params=None) -> str:
+    """把请求归一为 "动词 资源[/子资源]"，如 list pods、get pods、get pods/log，用作指标标签"""
+    parts = urlparse(url).path.strip("/").split("/")
+    # /api/v1/... 与 /apis/<group>/<version>/...
+    rest = parts[2:] if parts[:1] == ["api"] else parts[3:]
+    if len(rest) >= 3 and rest[0] == "namespaces":
+        rest = rest[2:]
+    if not rest:
+        return f"{method.lower()} discovery"
+    resource = rest[0] if len(rest) < 3 else f"{rest[0]}/{rest[2]}"
+    if method != "GET":
+        verb = method.lower()
+    elif any(key == "watch" and value for key, value in query_params or []):
+        verb = "watch"
+    else:
+        verb = "get" if len(rest) >= 2 else "list"
+    return f"{verb} {resource}"
+
+class CountingResponse:
+    """包装 _preload_content=False 时返回的 urllib3 原始响应，在调用方逐块读取时累计响应字节数
+
+    日志流、watch 与按元数据计数的请求都不预加载响应体，字节数只能在读取时统计；
+    其余属性与方法（status、headers、release_conn 等）直接转发给原始响应。
+    """
+
+    def __init__(self, response, labels: Dict):
+        self._response = response
+        self._labels = labels
+        self._data_counted = False
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def _count(self, chunk):
+        if chunk:
+            metrics.inc("k8s_api_response_bytes_total", len(chunk), **self._labels)
+        return chunk
+
+    def read(self, *args, **kwargs):
+        return self._count(self._response.read(*args, **kwargs))
+
+    def stream(self, *args, **kwargs):
+        for chunk in self._response.stream(*args, **kwargs):
+            yield self._count(chunk)
+
+    @property
+    def data(self):
+        # data 会缓存整个响应体，只在第一次读取时计数
+        data = self._response.data
+        if not self._data_counted:
+            self._data_counted = True
+            self._count(data)
+        return data
+
+class PooledApiClient(ApiClient):
+    """为未显式指定超时的请求补上默认超时，统计连接池使用情况，并为每个请求记录耗时/状态/字节数指标"""
+
+    def __init__(self, configuration: Configuration, request_timeout=None, cluster_name: str = ""):
+        super().__init__(configuration)
+        self.cluster_name = cluster_name
+        self.request_timeout = request_timeout
+        self.pool_size = configuration.connection_pool_maxsize
+        self.rest_client.pool_manager.connection_pool_kw["socket_options"] = KEEPALIVE_SOCKET_OPTIONS
+        self._stats_lock = threading.Lock()
+        self.total_requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def request(self, method, url, query_params=None, headers=None,
+                post_params=None, body=None, _preload_content=True,
+                _request_timeout=None):
+        if _request_timeout is None:
+            _request_timeout = self.request_timeout
+        with self._stats_lock:
+            self.total_requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        labels = {"cluster": self.cluster_name, "operation": api_operation(method, url, query_params)}
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = super().request(
+                method, url, query_params=query_params, headers=headers,
+                post_params=post_params, body=body,
+                _preload_content=_preload_content,
+                _request_timeout=_request_timeout
+            )
+            status = str(response.status)
+            if isinstance(response, RESTResponse):
+                metrics.inc("k8s_api_response_bytes_total", len(response.data or b""), **labels)
+                return response
+            return CountingResponse(response, labels)
+        except ApiException as e:
+            status = str(e.status)
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+            metrics.observe("k8s_api_request_duration_seconds", time.perf_counter() - started, **labels)
+            metrics.inc("k8s_api_requests_total", status=status, **labels)
+
+    def pool_stats(self) -> Dict:
+        pool_container = self.rest_client.pool_manager.pools
+        pools = [pool_container[key] for key in pool_container.keys()]
+        return {
+            "pool_size": self.pool_size,
+            "connections_opened": sum(p.num_connections for p in pools),
+            "idle_connections": sum(p.pool.qsize() - p.pool.queue.count(None) for p in pools if p.pool),
+            "total_requests": self.total_requests,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight
+        }
+
+def create_k8s_client(api_url: str, token: str, pool_size: int = DEFAULT_POOL_SIZE,
+                      connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                      request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                      cluster_name: str = "") -> ApiClient:
+    config = Configuration()
+    config.host = api_url
+    config.api_key_prefix['authorization'] = 'Bearer'
+    config.api_key['authorization'] = token
+    config.verify_ssl = False
+    config.connection_pool_maxsize = pool_size
+    config.retries = NoTimeoutRetry(total=3)
+    return PooledApiClient(config, request_timeout=(connect_timeout, request_timeout), cluster_name=cluster_name)
+
+class ClientRegistry:
+    """按集群名复用 ApiClient，进程内所有会话与线程共享同一个连接池"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, PooledApiClient] = {}
+        self._fingerprints: Dict[str, tuple] = {}
+        self._close_listeners: List[Callable] = []
+
+    def add_close_listener(self, listener: Callable):
+        """注册 listener(cluster_name, api_client)，客户端因集群配置变更重建或进程退出而关闭前调用"""
+        self._close_listeners.append(listener)
+
+    def get(self, cluster_config: dict) -> ApiClient:
+        name = cluster_config["cluster_name"]
+        fingerprint = (
+            cluster_config["api_url"],
+            cluster_config["token"],
+            cluster_config.get("pool_size", DEFAULT_POOL_SIZE),
+            cluster_config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+            cluster_config.get("request_timeout", DEFAULT_REQUEST_TIMEOUT)
+        )
+        with self._lock:
+            api_client = self._clients.get(name)
+            if api_client is not None and self._fingerprints[name] == fingerprint:
+                return api_client
+            if api_client is not None:
+                # 集群配置变更，旧连接池关闭后重建
+                self._close_client(name, api_client)
+            api_client = create_k8s_client(*fingerprint, cluster_name=name)
+            self._clients[name] = api_client
+            self._fingerprints[name] = fingerprint
+            return api_client
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            clients = list(self._clients.items())
+        return [dict(cluster_name=name, **api_client.pool_stats()) for name, api_client in clients]
+
+    def close_all(self):
+        with self._lock:
+            for name, api_client in self._clients.items():
+                self._close_client(name, api_client)
+            self._clients.clear()
+            self._fingerprints.clear()
+
+    def _close_client(self, name: str, api_client: ApiClient):
+        for listener in self._close_listeners:
+            try:
+                listener(name, api_client)
+            except Exception as e:
+                logger.warning("集群 %s 客户端关闭回调失败: %s", name, e)
+        try:
+            api_client.close()
+            api_client.rest_client.pool_manager.clear()
+        except Exception as e:
+            logger.warning("关闭集群 %s 的连接池失败: %s", name, e)
+
+_registry = ClientRegistry()
+atexit.register(_registry.close_all)
+
+def get_api_client(cluster_config: dict) -> ApiClient:
+    """获取集群共享的 ApiClient"""
+    return _registry.get(cluster_config)
+
+def on_client_closed(listener: Callable):
+    """客户端关闭前通知使用它的组件（如集群缓存）停止并丢弃"""
+    _registry.add_close_listener(listener)
+
+def get_pool_stats() -> List[Dict]:
+    return _registry.stats()
+
+def close_all_clients():
+    _registry.close_all()
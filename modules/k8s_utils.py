@@ -1,162 +1,638 @@
 # k8s_utils.py
+import json
+import logging
+import time
 from kubernetes import client
-from kubernetes.client import ApiClient, Configuration
-from typing import List, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib3.exceptions import MaxRetryError, TimeoutError as RequestTimeoutError
+from kubernetes.client import ApiClient
+from typing import List, Dict, Iterable, Iterator, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
+from modules.informer import ClusterCache
+from modules.topology import OwnershipGraph
+from modules.k8s_client import get_api_client
+from modules.pod_logs import DEFAULT_LOG_LIMIT_BYTES, read_pod_log
+from modules.event_index import EventIndex
+from modules.node_rollup import node_health
 
-def create_k8s_client(api_url: str, token: str) -> ApiClient:
-    config = Configuration()
-    config.host = api_url
-    config.api_key_prefix['authorization'] = 'Bearer'
-    config.api_key['authorization'] = token
-    config.verify_ssl = False
-    return ApiClient(config)
+logger = logging.getLogger(__name__)
+
+# 由 apiserver 按 phase 过滤，Running/Succeeded 的 Pod 不再下发
+NON_RUNNING_POD_SELECTOR = "status.phase!=Running,status.phase!=Succeeded"
+
+# 单个 Pod 诊断数据收集的并发数与总时限（秒）
+DIAGNOSTIC_MAX_WORKERS = 8
+DIAGNOSTIC_DEADLINE = 15.0
+
+# 批量诊断预取事件时，涉及的命名空间超过该数则改为全集群分页列出一次
+EVENT_PREFETCH_NAMESPACE_LIMIT = 5
+POD_EVENT_SELECTOR = "involvedObject.kind=Pod"
+
+# 需要读取的节点超过该数时改为分页列出全部节点，少于该数则逐个读取
+NODE_READ_LIMIT = 20
+
+# 集群概览计数的资源路径
+COUNT_RESOURCE_PATHS = {
+    "nodes": "/api/v1/nodes",
+    "pods": "/api/v1/pods",
+    "deployments": "/apis/apps/v1/deployments",
+    "statefulsets": "/apis/apps/v1/statefulsets"
+}
+
+# 应用状态探测覆盖的工作负载类型：(API 组, 全集群分页 list 方法, 单个对象 read 方法)
+WORKLOAD_KINDS = {
+    "Deployment": ("apps", "list_deployment_for_all_namespaces", "read_namespaced_deployment"),
+    "StatefulSet": ("apps", "list_stateful_set_for_all_namespaces", "read_namespaced_stateful_set"),
+    "DaemonSet": ("apps", "list_daemon_set_for_all_namespaces", "read_namespaced_daemon_set"),
+    "Job": ("batch", "list_job_for_all_namespaces", "read_namespaced_job")
+}
+
+# 只请求对象元数据，apiserver 不再下发 spec/status
+PARTIAL_METADATA_ACCEPT = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"
+
+class ScanTruncated(TimeoutError):
+    """分页查询在时间预算内未能完成，已产出的对象有效但不完整"""
+
+class PartialList(list):
+    """分页扫描的结果；partial 为 True 表示扫描中途停止（超出时间预算或翻页失败），列表不完整"""
+    partial = False
+
+def _is_request_timeout(error: Exception) -> bool:
+    if isinstance(error, MaxRetryError):
+        error = error.reason
+    return isinstance(error, RequestTimeoutError)
+
+def _deadline_timeout(deadline: float) -> tuple:
+    """剩余预算对应的请求超时 (连接, 读取)；预算已耗尽时抛出 ScanTruncated"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise ScanTruncated("查询超出时间预算")
+    return min(remaining, 10), remaining
+
+def _paged_list(list_func, page_size: int = 500, deadline: Optional[float] = None, **kwargs) -> Iterator:
+    """按 limit/continue 分页调用 list 接口，逐条产出对象，内存只保留一页
+
+    给出 deadline（time.monotonic() 时刻）时每页的请求超时不超过剩余预算，预算耗尽或请求因此超时
+    都抛出 ScanTruncated。
+    """
+    continue_token = None
+    while True:
+        request_kwargs = dict(kwargs, limit=page_size)
+        if continue_token:
+            request_kwargs["_continue"] = continue_token
+        if deadline is not None:
+            request_kwargs["_request_timeout"] = _deadline_timeout(deadline)
+
+        try:
+            page = list_func(**request_kwargs)
+        except Exception as e:
+            if deadline is not None and _is_request_timeout(e):
+                raise ScanTruncated(f"分页请求在时间预算内未返回: {e}") from e
+            raise
+        for item in page.items:
+            yield item
+
+        continue_token = page.metadata._continue if page.metadata else None
+        if not continue_token:
+            return
+
+def _controller_owner(pod) -> tuple:
+    """返回 Pod 的顶层控制器 (kind, name)；ReplicaSet 按 pod-template-hash 还原为所属 Deployment"""
+    for ref in pod.metadata.owner_references or []:
+        if not ref.controller:
+            continue
+        if ref.kind == "ReplicaSet":
+            template_hash = (pod.metadata.labels or {}).get("pod-template-hash")
+            if template_hash and ref.name.endswith(f"-{template_hash}"):
+                return "Deployment", ref.name[:-len(template_hash) - 1]
+        return ref.kind, ref.name
+    return None, None
+
+def _failure_reason(pod) -> tuple:
+    """提取 Pod 的故障原因与退出码：容器等待/终止原因优先，其次为 Pod 级原因与调度失败原因"""
+    statuses = (pod.status.init_container_statuses or []) + (pod.status.container_statuses or [])
+    for status in statuses:
+        state = status.state
+        if state and state.waiting and state.waiting.reason not in (None, "PodInitializing", "ContainerCreating"):
+            terminated = status.last_state.terminated if status.last_state else None
+            return state.waiting.reason, terminated.exit_code if terminated else None
+        if state and state.terminated and state.terminated.exit_code != 0:
+            return state.terminated.reason, state.terminated.exit_code
+    if pod.status.reason:
+        return pod.status.reason, None
+    for condition in pod.status.conditions or []:
+        if condition.status == "False" and condition.reason:
+            return condition.reason, None
+    return None, None
+
+def _container_state(status) -> Dict:
+    """容器当前状态与上一次终止的原因、退出码"""
+    state = status.state
+    current = (state.waiting or state.terminated) if state else None
+    last = status.last_state.terminated if status.last_state else None
+    return {
+        "name": status.name,
+        "state": "waiting" if state and state.waiting else ("terminated" if state and state.terminated else "running"),
+        "reason": current.reason if current else None,
+        "exit_code": state.terminated.exit_code if state and state.terminated else None,
+        "last_reason": last.reason if last else None,
+        "last_exit_code": last.exit_code if last else None
+    }
+
+def _controller_uid(obj) -> Optional[str]:
+    for ref in obj.metadata.owner_references or []:
+        if ref.controller:
+            return ref.uid
+    return None
+
+def _abnormal_pod_entry(pod, topology: Optional[OwnershipGraph] = None) -> Dict:
+    root = topology.root_owner(pod.metadata.uid) if topology is not None else None
+    if root is not None:
+        owner_kind, owner_name = root[0], root[2]
+    else:
+        owner_kind, owner_name = _controller_owner(pod)
+    reason, exit_code = _failure_reason(pod)
+    container_statuses = pod.status.container_statuses or []
+    return {
+        "namespace": pod.metadata.namespace,
+        "pod_name": pod.metadata.name,
+        "status": pod.status.phase,
+        "uid": pod.metadata.uid,
+        "node": pod.spec.node_name,
+        "restart_count": sum(c.restart_count for c in container_statuses),
+        "owner_kind": owner_kind,
+        "owner_name": owner_name,
+        "reason": reason,
+        "exit_code": exit_code,
+        "top_event_reason": None
+    }
+
+def iter_non_running_pods(api_client: ApiClient, page_size: int = 500,
+                          time_budget: Optional[float] = None,
+                          cache: Optional[ClusterCache] = None,
+                          scan_state: Optional[Dict] = None) -> Iterator[Dict]:
+    """全集群分页扫描非 Running/Succeeded 的 Pod，由 apiserver 按 phase 过滤，边扫描边产出
+
+    time_budget 为整次扫描的秒数上限，超时（含单页请求超时）后停止翻页；已产出若干页后翻页失败时同样停止。
+    两种情况下已产出的结果保持有效，并在传入的 scan_state 中置 partial 为 True。
+    传入已同步的 cache 时直接读取本地索引，不访问 apiserver，所属控制器取自所有权图的顶层节点。
+    """
+    if scan_state is not None:
+        scan_state["partial"] = False
+    if cache is not None and cache.pods.has_synced():
+        for pod in cache.pods.by_index("abnormal", "abnormal"):
+            yield _abnormal_pod_entry(pod, cache.topology)
+        return
 
-def get_non_running_pods(api_client: ApiClient) -> List[Dict]:
     core_api = client.CoreV1Api(api_client)
-    namespaces = core_api.list_namespace().items
-    results = []
-    
-    for ns in namespaces:
-        pods = core_api.list_namespaced_pod(ns.metadata.name)
-        for pod in pods.items:
-            if pod.status.phase not in ("Running", "Succeeded"):
-                results.append({
-                    "namespace": pod.metadata.namespace,
-                    "pod_name": pod.metadata.name,
-                    "status": pod.status.phase
-                })
-    return results
-
-def get_pod_diagnostic_data(api_client: ApiClient, namespace: str, pod_name: str) -> Dict:
+    deadline = time.monotonic() + time_budget if time_budget else None
+    pods = _paged_list(
+        core_api.list_pod_for_all_namespaces,
+        page_size=page_size,
+        deadline=deadline,
+        field_selector=NON_RUNNING_POD_SELECTOR
+    )
+    produced = 0
+    try:
+        for pod in pods:
+            produced += 1
+            yield _abnormal_pod_entry(pod)
+    except ScanTruncated as e:
+        logger.warning("异常Pod扫描超出时间预算 %ss，返回部分结果（%d 个）: %s", time_budget, produced, e)
+    except Exception as e:
+        if not produced:
+            raise
+        logger.warning("异常Pod扫描翻页失败，返回部分结果（%d 个）: %s", produced, e)
+    else:
+        return
+    if scan_state is not None:
+        scan_state["partial"] = True
+
+def get_non_running_pods(api_client: ApiClient, page_size: int = 500,
+                         time_budget: Optional[float] = None,
+                         cache: Optional[ClusterCache] = None) -> PartialList:
+    """iter_non_running_pods 的列表形式，结果的 partial 属性表示扫描是否中途停止"""
+    scan_state = {}
+    pods = PartialList(iter_non_running_pods(api_client, page_size, time_budget, cache, scan_state))
+    pods.partial = scan_state["partial"]
+    return pods
+
+def _timed_call(func, *args, **kwargs):
+    started = time.monotonic()
+    try:
+        return func(*args, **kwargs), None, time.monotonic() - started
+    except Exception as e:
+        return None, e, time.monotonic() - started
+
+def _collect_events(core_api, namespace: str, pod_name: str, uid: Optional[str] = None) -> List[Dict]:
+    events = core_api.list_namespaced_event(
+        namespace,
+        field_selector=f"{POD_EVENT_SELECTOR},involvedObject.name={pod_name}"
+    )
+    return EventIndex(events.items).events_for("Pod", namespace, pod_name, uid)
+
+def prefetch_pod_events(api_client: ApiClient, namespaces: Iterable[str], page_size: int = 500,
+                        deadline: Optional[float] = None) -> Tuple[EventIndex, Set[str]]:
+    """批量列出 Pod 事件并按涉及对象建立索引，替代逐个 Pod 的事件查询
+
+    命名空间不超过 EVENT_PREFETCH_NAMESPACE_LIMIT 个时逐个命名空间分页列出，否则全集群分页列出一次。
+    deadline 为 time.monotonic() 时刻。返回 (索引, 未能列出的命名空间)，后者由调用方回退为逐个 Pod 查询。
+    """
+    core_api = client.CoreV1Api(api_client)
+    namespaces = set(namespaces)
+    index = EventIndex()
+    if len(namespaces) > EVENT_PREFETCH_NAMESPACE_LIMIT:
+        try:
+            for event in _paged_list(core_api.list_event_for_all_namespaces, page_size=page_size,
+                                     deadline=deadline, field_selector=POD_EVENT_SELECTOR):
+                index.add(event)
+            return index, set()
+        except Exception as e:
+            logger.warning("全集群事件预取失败，改为逐个 Pod 查询: %s", e)
+            return EventIndex(), namespaces
+
+    failed = set()
+    for namespace in namespaces:
+        try:
+            events = list(_paged_list(core_api.list_namespaced_event, page_size=page_size, deadline=deadline,
+                                      namespace=namespace, field_selector=POD_EVENT_SELECTOR))
+        except Exception as e:
+            logger.warning("命名空间 %s 事件预取失败，改为逐个 Pod 查询: %s", namespace, e)
+            failed.add(namespace)
+            continue
+        for event in events:
+            index.add(event)
+    return index, failed
+
+def get_node_health(api_client: ApiClient, node_names: Iterable[str],
+                    cache: Optional[ClusterCache] = None) -> Dict[str, Dict]:
+    """读取各节点的状况与污点，每个节点只读一次，返回 {节点名: node_health(...)}
+
+    传入已同步的 cache 时直接读取本地副本。已被删除的节点记为 NotFound，读取失败的节点不在结果中。
+    """
+    node_names = set(node_names)
+    if cache is not None and cache.nodes.has_synced():
+        return {name: node_health(cache.nodes.get(name)) for name in node_names}
+
+    core_api = client.CoreV1Api(api_client)
+    if len(node_names) > NODE_READ_LIMIT:
+        health = {name: node_health(None) for name in node_names}
+        try:
+            for node in _paged_list(core_api.list_node):
+                if node.metadata.name in node_names:
+                    health[node.metadata.name] = node_health(node)
+        except Exception as e:
+            logger.warning("节点列表获取失败: %s", e)
+            return {}
+        return health
+
+    def read(name: str):
+        try:
+            return name, node_health(core_api.read_node(name))
+        except client.ApiException as e:
+            if e.status == 404:
+                return name, node_health(None)
+            logger.warning("节点 %s 读取失败: HTTP %s", name, e.status)
+        except Exception as e:
+            logger.warning("节点 %s 读取失败: %s", name, e)
+        return name, None
+
+    with ThreadPoolExecutor(max_workers=DIAGNOSTIC_MAX_WORKERS) as executor:
+        return {name: state for name, state in executor.map(read, node_names) if state is not None}
+
+def add_top_event_reasons(api_client: ApiClient, pods: List[Dict],
+                          deadline: float = DIAGNOSTIC_DEADLINE) -> List[Dict]:
+    """批量预取事件，把每个 Pod 最主要的事件原因写入其 top_event_reason 字段，用于异常 Pod 的分组
+
+    在扫描时调用，结果随 Pod 列表一起写入快照；预取失败的命名空间与没有 Warning 事件的 Pod 保持为 None。
+    """
+    event_index, failed_namespaces = prefetch_pod_events(
+        api_client, {pod["namespace"] for pod in pods}, deadline=time.monotonic() + deadline
+    )
+    for pod in pods:
+        if pod["namespace"] not in failed_namespaces:
+            pod["top_event_reason"] = event_index.top_reason("Pod", pod["namespace"], pod["pod_name"], pod.get("uid"))
+    return pods
+
+def get_pod_diagnostic_data(api_client: ApiClient, namespace: str, pod_name: str,
+                            max_workers: int = DIAGNOSTIC_MAX_WORKERS,
+                            deadline: float = DIAGNOSTIC_DEADLINE,
+                            executor: Optional[ThreadPoolExecutor] = None,
+                            log_limit_bytes: int = DEFAULT_LOG_LIMIT_BYTES,
+                            log_since_seconds: Optional[int] = None,
+                            event_index: Optional[EventIndex] = None) -> Dict:
+    """收集 Pod 诊断数据：先读取 Pod，再并发获取事件与各容器当前/历史日志
+
+    deadline 为整次收集的秒数上限，超时未完成的部分记入 part_errors 并返回已有数据；
+    timings 记录每个部分的耗时。传入 executor 时共用其线程池（批量收集时使用）。
+    日志以流式读取为 LogBuffer，单段不超过 log_limit_bytes；只有确实终止过的容器才读取历史日志。
+    事件按最近发生时间倒序、重复的合并计数；传入 event_index（批量预取）时直接从索引读取。
+    """
     core_api = client.CoreV1Api(api_client)
-    data = {"basic": {}, "events": [], "logs": {}}
+    data = {"basic": {}, "events": [], "logs": {}, "part_errors": {}, "timings": {}}
+    started = time.monotonic()
     
-    try:
-        pod = core_api.read_namespaced_pod(pod_name, namespace)
+    pod, error, elapsed = _timed_call(core_api.read_namespaced_pod, pod_name, namespace)
+    data["timings"]["pod"] = round(elapsed, 3)
+    if error is not None:
+        data["error"] = str(error)
+        return data
         
-        container_statuses = pod.status.container_statuses if pod.status.container_statuses else []
-        
-        data["basic"] = {
-            "name": pod.metadata.name,
-            "namespace": namespace,
-            "status": pod.status.phase,
-            "restart_count": sum(c.restart_count for c in container_statuses),
-            "node": pod.spec.node_name
+    container_statuses = pod.status.container_statuses if pod.status.container_statuses else []
+    reason, exit_code = _failure_reason(pod)
+    
+    data["basic"] = {
+        "name": pod.metadata.name,
+        "namespace": namespace,
+        "status": pod.status.phase,
+        "restart_count": sum(c.restart_count for c in container_statuses),
+        "node": pod.spec.node_name,
+        "reason": reason,
+        "exit_code": exit_code,
+        "containers": [
+            _container_state(status) for status in (pod.status.init_container_statuses or []) + container_statuses
+        ]
+    }
+
+    terminated_before = {
+        status.name for status in container_statuses
+        if status.last_state and status.last_state.terminated
+    }
+    parts = {}
+    if event_index is not None:
+        data["events"] = event_index.events_for("Pod", namespace, pod_name, pod.metadata.uid)
+    else:
+        parts["events"] = (_collect_events, (core_api, namespace, pod_name, pod.metadata.uid), {})
+    for container in pod.spec.containers:
+        data["logs"][container.name] = {"current": "", "previous": ""}
+        kinds = ["current", "previous"] if container.name in terminated_before else ["current"]
+        for kind in kinds:
+            parts[f"logs/{container.name}/{kind}"] = (
+                read_pod_log,
+                (core_api, pod_name, namespace, container.name),
+                {
+                    "previous": kind == "previous",
+                    "limit_bytes": log_limit_bytes,
+                    "since_seconds": log_since_seconds
+                }
+            )
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(_timed_call, func, *args, **kwargs): part
+            for part, (func, args, kwargs) in parts.items()
         }
-        
-        events = core_api.list_namespaced_event(
-            namespace,
-            field_selector=f"involvedObject.name={pod_name}"
-        )
-        data["events"] = [{
-            "type": e.type,
-            "reason": e.reason,
-            "message": e.message,
-            "last_time": e.last_timestamp
-        } for e in events.items[:5]]
-        
-        data["logs"] = {}
-        for container in pod.spec.containers:
+
+        remaining = max(deadline - (time.monotonic() - started), 0)
+        done, not_done = wait(futures, timeout=remaining)
+
+        for future in done:
+            part = futures[future]
+            result, error, elapsed = future.result()
+            data["timings"][part] = round(elapsed, 3)
+            if error is not None:
+                data["part_errors"][part] = str(error)
+            if part == "events":
+                data["events"] = result or []
+                continue
+            _, container_name, kind = part.split("/", 2)
+            if error is not None:
+                data["logs"][container_name]["error"] = str(error)
+            else:
+                data["logs"][container_name][kind] = result
+
+        for future in not_done:
+            future.cancel()
+            part = futures[future]
+            data["part_errors"][part] = f"超过 {deadline}s 收集时限"
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    data["timings"]["total"] = round(time.monotonic() - started, 3)
+    return data
+
+def iter_pods_diagnostic_data(api_client: ApiClient, pods: List[Dict],
+                              max_pods: int = 4,
+                              max_workers: int = DIAGNOSTIC_MAX_WORKERS,
+                              deadline: float = DIAGNOSTIC_DEADLINE) -> Iterator[tuple]:
+    """批量收集多个 Pod 的诊断数据，按完成顺序产出 (pod, diagnostic_data)
+
+    max_pods 为同时处理的 Pod 数，各 Pod 的日志请求共用 max_workers 大小的线程池。
+    事件先按命名空间（或全集群）批量预取一次，预取失败的命名空间回退为逐个 Pod 查询。
+    """
+    event_index, failed_namespaces = prefetch_pod_events(
+        api_client, {pod["namespace"] for pod in pods}, deadline=time.monotonic() + deadline
+    )
+    parts_executor = ThreadPoolExecutor(max_workers=max_workers)
+    pods_executor = ThreadPoolExecutor(max_workers=max_pods)
+    try:
+        futures = {
+            pods_executor.submit(
+                get_pod_diagnostic_data,
+                api_client, pod["namespace"], pod["pod_name"],
+                deadline=deadline, executor=parts_executor,
+                event_index=None if pod["namespace"] in failed_namespaces else event_index
+            ): pod
+            for pod in pods
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        pods_executor.shutdown(wait=False, cancel_futures=True)
+        parts_executor.shutdown(wait=False, cancel_futures=True)
+
+def _application_entry(item, kind: str) -> Dict:
+    return {
+        "name": item.metadata.name,
+        "namespace": item.metadata.namespace,
+        "kind": kind,
+        "creation_time": str(item.metadata.creation_timestamp)
+    }
+
+def _workload_api(api_client: ApiClient, kind: str):
+    group = WORKLOAD_KINDS[kind][0]
+    return client.AppsV1Api(api_client) if group == "apps" else client.BatchV1Api(api_client)
+
+def list_workloads(api_client: ApiClient, kinds=tuple(WORKLOAD_KINDS), page_size: int = 500) -> Tuple[List[Dict], Dict[str, str]]:
+    """按类型分页列出全集群工作负载，每类一个并发的 list 请求链
+
+    返回 (工作负载列表, {类型: 错误信息})；某类失败（如无 RBAC 权限）不影响其余类型。
+    """
+    def list_kind(kind: str) -> List[Dict]:
+        list_func = getattr(_workload_api(api_client, kind), WORKLOAD_KINDS[kind][1])
+        return [_application_entry(item, kind) for item in _paged_list(list_func, page_size)]
+
+    results = []
+    errors = {}
+    with ThreadPoolExecutor(max_workers=len(kinds) or 1) as executor:
+        futures = {executor.submit(list_kind, kind): kind for kind in kinds}
+        for future in as_completed(futures):
+            kind = futures[future]
             try:
-                current_logs = core_api.read_namespaced_pod_log(
-                    pod_name, namespace, container=container.name, tail_lines=100
-                )
-                previous_logs = core_api.read_namespaced_pod_log(
-                    pod_name, namespace, container=container.name, previous=True, tail_lines=100
-                ) if data["basic"]["restart_count"] > 0 else ""
-                data["logs"][container.name] = {
-                    "current": current_logs,
-                    "previous": previous_logs
-                }
+                results.extend(future.result())
             except client.ApiException as e:
-                data["logs"][container.name] = {"error": str(e)}
-                
-    except client.ApiException as e:
-        data["error"] = str(e)
-        
-    return data
+                errors[kind] = f"HTTP {e.status}: {e.reason}"
+            except Exception as e:
+                errors[kind] = str(e)
+    for kind, error in errors.items():
+        logger.warning("%s 列表获取失败: %s", kind, error)
+    return results, errors
 
-def get_all_applications(api_client: ApiClient) -> List[Dict]:
-    apps_api = client.AppsV1Api(api_client)
-    core_api = client.CoreV1Api(api_client)
+def get_all_applications(api_client: ApiClient, cache: Optional[ClusterCache] = None) -> Tuple[List[Dict], Dict[str, str]]:
+    """列出全集群应用，返回 (按创建时间倒序的应用列表, {类型: 错误信息})
+
+    传入已同步的 cache 时 Deployment/StatefulSet 直接读取本地缓存，其余类型分页查询。
+    """
+    kinds = tuple(WORKLOAD_KINDS)
     results = []
-    
-    try:
-        namespaces = [ns.metadata.name for ns in core_api.list_namespace().items]
-        
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = []
-            for ns in namespaces:
-                futures.append(executor.submit(
-                    apps_api.list_namespaced_deployment,
-                    namespace=ns
-                ))
-                futures.append(executor.submit(
-                    apps_api.list_namespaced_stateful_set,
-                    namespace=ns
-                ))
-            
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    for item in result.items:
-                        kind = "Deployment" if isinstance(item, client.V1Deployment) else "StatefulSet"
-                        results.append({
-                            "name": item.metadata.name,
-                            "namespace": item.metadata.namespace,
-                            "kind": kind,
-                            "creation_time": str(item.metadata.creation_timestamp)
-                        })
-                except client.ApiException:
-                    continue
-    except Exception as e:
-        print(f"Error fetching cluster apps: {str(e)}")
-    
-    return sorted(results, key=lambda x: x["creation_time"], reverse=True)
+    if cache is not None and cache.deployments.has_synced() and cache.statefulsets.has_synced():
+        results = [_application_entry(d, "Deployment") for d in cache.deployments.list()]
+        results += [_application_entry(s, "StatefulSet") for s in cache.statefulsets.list()]
+        kinds = tuple(kind for kind in kinds if kind not in ("Deployment", "StatefulSet"))
+
+    listed, errors = list_workloads(api_client, kinds)
+    results += listed
+    return sorted(results, key=lambda x: x["creation_time"], reverse=True), errors
+
+def _application_pod_entry(pod) -> Dict:
+    container_statuses = pod.status.container_statuses or []
+    return {
+        "namespace": pod.metadata.namespace,
+        "pod_name": pod.metadata.name,
+        "status": pod.status.phase,
+        "restart_count": sum(c.restart_count for c in container_statuses),
+        "node": pod.spec.node_name
+    }
+
+def _get_cached_application_pods(cache: ClusterCache, namespace: str, app_name: str, kind: str) -> List[Dict]:
+    results = []
+    for _, pod_namespace, pod_name in cache.topology.descendants(kind, namespace, app_name, "Pod"):
+        pod = cache.pods.get(f"{pod_namespace}/{pod_name}")
+        if pod is not None:
+            results.append(_application_pod_entry(pod))
+    return sorted(results, key=lambda x: x["pod_name"])
+
+def _selector_string(selector) -> str:
+    """把 V1LabelSelector（含 matchExpressions）转换为 label_selector 查询串"""
+    parts = [f"{k}={v}" for k, v in (selector.match_labels or {}).items()]
+    for expression in selector.match_expressions or []:
+        values = ",".join(expression.values or [])
+        if expression.operator == "In":
+            parts.append(f"{expression.key} in ({values})")
+        elif expression.operator == "NotIn":
+            parts.append(f"{expression.key} notin ({values})")
+        elif expression.operator == "Exists":
+            parts.append(expression.key)
+        elif expression.operator == "DoesNotExist":
+            parts.append(f"!{expression.key}")
+    return ",".join(parts)
+
+def get_application_pods(api_client: ApiClient, namespace: str, app_name: str, kind: str,
+                         cache: Optional[ClusterCache] = None) -> List[Dict]:
+    """列出工作负载拥有的 Pod
+
+    传入已同步的 cache 时按所有权图直接查找，不访问 apiserver；否则按完整的标签选择器
+    （matchLabels + matchExpressions）查询，再按 ownerReferences 排除标签相同的其他工作负载的 Pod。
+    """
+    if cache is not None and cache.has_synced():
+        return _get_cached_application_pods(cache, namespace, app_name, kind)
 
-def get_application_pods(api_client: ApiClient, namespace: str, app_name: str, kind: str) -> List[Dict]:
     core_api = client.CoreV1Api(api_client)
-    apps_api = client.AppsV1Api(api_client)
     
     try:
-        label_selector = {}
+        if kind not in WORKLOAD_KINDS:
+            return []
+        read_func = getattr(_workload_api(api_client, kind), WORKLOAD_KINDS[kind][2])
+        workload = read_func(app_name, namespace)
+        selector_str = _selector_string(workload.spec.selector)
+
+        owner_uids = {workload.metadata.uid}
         if kind == "Deployment":
-            deployment = apps_api.read_namespaced_deployment(app_name, namespace)
-            label_selector = deployment.spec.selector.match_labels
-        elif kind == "StatefulSet":
-            statefulset = apps_api.read_namespaced_stateful_set(app_name, namespace)
-            label_selector = statefulset.spec.selector.match_labels
-        
-        selector_str = ",".join([f"{k}={v}" for k,v in label_selector.items()])
+            # Deployment 的 Pod 由其 ReplicaSet 直接拥有
+            replicasets = client.AppsV1Api(api_client).list_namespaced_replica_set(
+                namespace=namespace,
+                label_selector=selector_str
+            ).items
+            owner_uids = {rs.metadata.uid for rs in replicasets if _controller_uid(rs) == workload.metadata.uid}
         
         pods = core_api.list_namespaced_pod(
             namespace=namespace,
             label_selector=selector_str
         ).items
         
-        results = []
-        for pod in pods:
-            container_statuses = pod.status.container_statuses or []
-            restart_count = sum(c.restart_count for c in container_statuses)
-            
-            results.append({
-                "namespace": pod.metadata.namespace,
-                "pod_name": pod.metadata.name,
-                "status": pod.status.phase,
-                "restart_count": restart_count,
-                "node": pod.spec.node_name
-            })
+        results = [_application_pod_entry(pod) for pod in pods if _controller_uid(pod) in owner_uids]
             
         return sorted(results, key=lambda x: x["pod_name"])
         
     except client.ApiException as e:
+        logger.warning("获取 %s/%s 的 Pod 失败: HTTP %s", namespace, app_name, e.status)
         return [{"error": f"获取Pod失败: {str(e)}"}]
     except Exception as e:
+        logger.exception("获取 %s/%s 的 Pod 时发生未知错误", namespace, app_name)
         return [{"error": f"发生未知错误: {str(e)}"}]
 
-def get_cluster_summary(cluster_config: dict) -> dict:
+def count_resources(api_client: ApiClient, resource_path: str, page_size: int = 500,
+                    deadline: Optional[float] = None) -> int:
+    """统计资源数量，不下载完整对象也不构建模型
+
+    先以 limit=1 请求，apiserver 返回 metadata.remainingItemCount（估算值）时一次请求即可得出近似总数；
+    否则退化为按 page_size 分页拉取 PartialObjectMetadataList，只对原始 JSON 的 items 计数。
+    给出 deadline（time.monotonic() 时刻）时与 _paged_list 相同，每个请求的超时不超过剩余预算，
+    预算耗尽或请求因此超时都抛出 ScanTruncated。
+    """
+    count = 0
+    continue_token = None
+    limit = 1
+    while True:
+        query_params = [("limit", limit)]
+        if continue_token:
+            query_params.append(("continue", continue_token))
+        try:
+            resp = api_client.call_api(
+                resource_path, "GET",
+                query_params=query_params,
+                header_params={"Accept": PARTIAL_METADATA_ACCEPT},
+                auth_settings=["BearerToken"],
+                _return_http_data_only=True,
+                _preload_content=False,
+                _request_timeout=_deadline_timeout(deadline) if deadline is not None else None
+            )
+            try:
+                body = json.loads(resp.data)
+            finally:
+                resp.release_conn()
+        except Exception as e:
+            if deadline is not None and _is_request_timeout(e):
+                raise ScanTruncated(f"计数请求在时间预算内未返回: {e}") from e
+            raise
+
+        metadata = body.get("metadata") or {}
+        count += len(body.get("items") or [])
+        remaining = metadata.get("remainingItemCount")
+        if remaining is not None:
+            return count + remaining
+
+        continue_token = metadata.get("continue")
+        if not continue_token:
+            return count
+        limit = page_size
+
+def get_cluster_summary(cluster_config: dict, cache: Optional[ClusterCache] = None,
+                        deadline: Optional[float] = None) -> dict:
+    """统计集群节点、Pod、Deployment、StatefulSet 数量
+
+    精度：数量为估计值。apiserver 返回的 remainingItemCount 只是估算，分页期间对象的增删也不会反映在结果中，
+    四类资源各自统计，彼此之间不保证处于同一时刻，适合概览展示，不应作为精确计数使用。
+    延迟：apiserver 返回 remainingItemCount 时每类资源只需一次 limit=1 的请求，
+    与集群规模无关；否则为 ceil(N/500) 次仅含元数据的分页请求。
+    传入已同步的 cache 时直接返回本地缓存中的数量。
+    给出 deadline（time.monotonic() 时刻）时各请求的超时不超过剩余预算，未能按时完成则抛出 ScanTruncated，
+    由调用方决定如何展示；其余错误记录在结果的 error 中。
+    """
     result = {
         "cluster_name": cluster_config["cluster_name"],
         "status": "error",
@@ -168,29 +644,25 @@ def get_cluster_summary(cluster_config: dict) -> dict:
         "error": ""
     }
     
+    if cache is not None and cache.has_synced():
+        result["nodes"] = cache.nodes.count()
+        result["pods"] = cache.pods.count()
+        result["deployments"] = cache.deployments.count()
+        result["statefulsets"] = cache.statefulsets.count()
+        result["status"] = "success"
+        return result
+
     try:
-        api_client = create_k8s_client(
-            cluster_config["api_url"],
-            cluster_config["token"]
-        )
-        core_api = client.CoreV1Api(api_client)
-        apps_api = client.AppsV1Api(api_client)
-        
-        nodes = core_api.list_node().items
-        result["nodes"] = len(nodes)
-        
-        pods = core_api.list_pod_for_all_namespaces().items
-        result["pods"] = len(pods)
-        
-        deployments = apps_api.list_deployment_for_all_namespaces().items
-        result["deployments"] = len(deployments)
-        
-        statefulsets = apps_api.list_stateful_set_for_all_namespaces().items
-        result["statefulsets"] = len(statefulsets)
+        api_client = get_api_client(cluster_config)
+        for key, resource_path in COUNT_RESOURCE_PATHS.items():
+            result[key] = count_resources(api_client, resource_path, deadline=deadline)
         
         result["status"] = "success"
         
+    except ScanTruncated:
+        raise
     except Exception as e:
+        logger.warning("集群 %s 概要获取失败: %s", cluster_config.get("cluster_name"), e)
         result["error"] = f"集群连接异常: {str(e)}"
     
-    return result
\ No newline at end of file
+    return result
@@ -1,43 +1,122 @@
-import openai
-from typing import Dict
+import hashlib
+import json
+import threading
+from typing import Callable, Dict, Iterator, Optional
+from modules.analysis_cache import fingerprint, get_analysis_cache
+from modules.prompt_builder import budget_for_model, build_prompt as build_budgeted_prompt
+from modules.async_utils import iterate_sync, run_sync
+from modules.llm_pool import get_endpoint_pool
+from modules.node_rollup import build_rollup_prompt
+from modules.rule_engine import format_verdict, get_rule_set
 
 class LLMAnalyzer:
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, rules_config: Optional[Dict] = None):
         self.config = config
-        openai.api_key = config["api_key"]
-        if "base_url" in config:
-            openai.api_base = config["base_url"]
+        # 常见的机械性故障先由本地规则判断，命中时不调用 LLM
+        self.rules = get_rule_set(rules_config)
+        # 请求按 llm.yaml 的端点列表负载均衡、重试与熔断
+        self.pool = get_endpoint_pool(config)
+        # 缓存键沿用主模型名，不同端点对同一 Pod 的分析结果共用缓存
+        self.model = config.get("model") or self.pool.models[0]
+        # 提示需要能发给池中任一模型，取各模型预算的最小值
+        self.prompt_budget = min(
+            budget_for_model(model, config.get("prompt_token_budget")) for model in self.pool.models
+        )
+        self.cache = get_analysis_cache(config.get("cache", {}))
 
     def analyze_pod(self, diagnostic_data: Dict) -> str:
         """使用LLM分析Pod问题"""
-        prompt = self._build_prompt(diagnostic_data)
-        
+        return self.analyze(diagnostic_data)["content"]
+
+    def analyze(self, diagnostic_data: Dict, force_refresh: bool = False,
+                before_request: Optional[Callable[[str], bool]] = None) -> Optional[Dict]:
+        """分析Pod问题，优先使用本地规则的结论，其次是指纹相同的缓存结果
+
+        返回 {"content", "cached", "fingerprint", "failed", "rule"}，rule 为命中的本地规则 id。
+        before_request(prompt) 在真正请求 LLM 前调用（如限流），返回 False 时放弃请求并返回 None。
+        分析失败的结果不写入缓存；force_refresh 时跳过本地规则与缓存。
+        """
+        key = f"{self.model}:{fingerprint(diagnostic_data)}"
+        verdict = None if force_refresh else self.rules.classify(diagnostic_data)
+        if verdict is not None:
+            return {"content": format_verdict(verdict), "cached": False, "fingerprint": key, "failed": False,
+                    "rule": verdict["rule"]}
+        if self.cache is not None and not force_refresh:
+            content = self.cache.get(key)
+            if content is not None:
+                return {"content": content, "cached": True, "fingerprint": key, "failed": False, "rule": None}
+
+        prompt = self.build_prompt(diagnostic_data)
+        if before_request is not None and not before_request(prompt):
+            return None
         try:
-            response = openai.ChatCompletion.create(
-                model=self.config.get("model", "gpt-3.5-turbo"),
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3
-            )
-            return response.choices[0].message["content"]
+            content = self._complete(prompt)
         except Exception as e:
-            return f"分析失败: {str(e)}"
+            return {"content": f"分析失败: {str(e)}", "cached": False, "fingerprint": key, "failed": True, "rule": None}
+
+        if self.cache is not None:
+            self.cache.put(key, content)
+        return {"content": content, "cached": False, "fingerprint": key, "failed": False, "rule": None}
+
+    def stream_analysis(self, diagnostic_data: Dict, force_refresh: bool = False) -> Dict:
+        """流式分析Pod问题，返回 {"cached", "fingerprint", "stream", "failed", "rule"}
+
+        stream 为逐段产出回复内容的同步迭代器，可直接交给 st.write_stream；
+        命中本地规则或缓存时一次性产出结论，完整读取后的新结果写入缓存。
+        stream 读完后 failed 表示分析是否失败（失败原因已追加在产出内容末尾）。
+        """
+        key = f"{self.model}:{fingerprint(diagnostic_data)}"
+        verdict = None if force_refresh else self.rules.classify(diagnostic_data)
+        if verdict is not None:
+            return {"cached": False, "fingerprint": key, "stream": iter([format_verdict(verdict)]), "failed": False,
+                    "rule": verdict["rule"]}
+        return self._stream_cached(key, lambda: self.build_prompt(diagnostic_data), force_refresh)
+
+    def stream_incident_summary(self, digest: str, force_refresh: bool = False) -> Dict:
+        """对节点聚合摘要（node_rollup.format_digest）做一次集群级根因分析，返回值同 stream_analysis"""
+        key = f"{self.model}:rollup:{hashlib.sha256(digest.encode()).hexdigest()}"
+        return self._stream_cached(key, lambda: build_rollup_prompt(digest), force_refresh)
+
+    def _stream_cached(self, key: str, build_prompt: Callable[[], str], force_refresh: bool) -> Dict:
+        if self.cache is not None and not force_refresh:
+            content = self.cache.get(key)
+            if content is not None:
+                return {"cached": True, "fingerprint": key, "stream": iter([content]), "failed": False, "rule": None}
+        result = {"cached": False, "fingerprint": key, "failed": False, "rule": None}
+        result["stream"] = self._stream(build_prompt(), key, result)
+        return result
+
+    def _stream(self, prompt: str, key: str, result: Dict) -> Iterator[str]:
+        parts = []
+        try:
+            for delta in iterate_sync(self.pool.stream_chat(self._messages(prompt), temperature=0.3)):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            result["failed"] = True
+            yield f"\n\n分析失败: {str(e)}"
+            return
+        if self.cache is not None and parts:
+            self.cache.put(key, "".join(parts))
+
+    def _complete(self, prompt: str) -> str:
+        return run_sync(self.pool.chat(self._messages(prompt), temperature=0.3))
+
+    @staticmethod
+    def _messages(prompt: str) -> list:
+        return [{"role": "user", "content": prompt}]
     
-    def _build_prompt(self, data: Dict) -> str:
-        """构建分析提示"""
-        prompt = f"""分析Kubernetes Pod异常：
-
-Pod状态：{data['basic']['status']}
-重启次数：{data['basic']['restart_count']}
-所在节点：{data['basic']['node']}
-
-最近事件："""
-        for event in data["events"]:
-            prompt += f"\n- [{event['last_time']}] {event['type']}/{event['reason']}: {event['message']}"
-            
-        for ctr, logs in data["logs"].items():
-            prompt += f"\n\n容器 {ctr} 日志："
-            prompt += f"\n当前日志：\n{logs.get('current', '')[:1000]}"
-            prompt += f"\n历史日志：\n{logs.get('previous', '')[:1000]}"
-            
-        prompt += "\n\n请分析可能原因并提供解决步骤："
-        return prompt
\ No newline at end of file
+    def build_prompt(self, data: Dict) -> str:
+        """构建分析提示，总长度控制在模型的 token 预算内"""
+        return build_budgeted_prompt(data, self.prompt_budget)
+
+_analyzers: Dict[str, LLMAnalyzer] = {}
+_analyzers_lock = threading.Lock()
+
+def get_llm_analyzer(config: Dict, rules_config: Optional[Dict] = None) -> LLMAnalyzer:
+    """按配置内容共享分析器，页面重跑时不再重复构建；llm.yaml 或 rules.yaml 修改后得到新的实例"""
+    key = json.dumps([config, rules_config], sort_keys=True, default=str)
+    with _analyzers_lock:
+        if key not in _analyzers:
+            _analyzers[key] = LLMAnalyzer(config, rules_config)
+        return _analyzers[key]
@@ -0,0 +1,161 @@
+# llm_client.py
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+from modules import metrics
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_CONNECT_TIMEOUT = 10
+# 流式响应中两次数据之间的最长等待
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_REQUEST_TIMEOUT = 300
+
+# 粗略的令牌估算：CJK 字符约 1 token/字，其余约 4 字符/token
+_CJK_PATTERN = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的令牌数，用于限流与预算，不追求精确"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+class LLMRequestError(Exception):
+    """LLM 网关返回非 2xx 响应，retry_after 为响应头 Retry-After 给出的秒数（如有）"""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """只解析秒数形式的 Retry-After，HTTP 日期形式忽略"""
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
+
+class AsyncChatClient:
+    """OpenAI 兼容 /chat/completions 的异步流式客户端
+
+    每个实例独立持有地址、密钥、超时与连接池，不同网关的客户端可以并存。
+    每次请求记录首 token 延迟与生成速度，最近的记录保存在 history 中。
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 history_size: int = 200):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {"total": request_timeout, "sock_connect": connect_timeout, "sock_read": read_timeout}
+        self.history = deque(maxlen=history_size)
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            # aiohttp 导入较慢，首次请求时才加载，不拖慢页面冷启动
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=aiohttp.ClientTimeout(**self.timeouts)
+            )
+        return self._session
+
+    async def stream_chat(self, messages: List[Dict], model: str, **params) -> AsyncIterator[str]:
+        """流式请求，逐段产出回复内容"""
+        session = await self._get_session()
+        payload = dict(params, model=model, messages=messages, stream=True)
+        labels = {"endpoint": self.base_url, "model": model}
+        started = time.monotonic()
+        first_token_at = None
+        usage = None
+        content_parts = []
+        status = "error"
+
+        try:
+            async with session.post(f"{self.base_url}/chat/completions", json=payload) as resp:
+                status = str(resp.status)
+                if resp.status >= 400:
+                    raise LLMRequestError(
+                        resp.status, (await resp.text())[:500], _retry_after_seconds(resp.headers.get("Retry-After"))
+                    )
+                async for raw_line in resp.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or usage
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            if first_token_at is None:
+                                first_token_at = time.monotonic()
+                                metrics.observe("llm_time_to_first_token_seconds", first_token_at - started, **labels)
+                            content_parts.append(delta)
+                            yield delta
+        except (GeneratorExit, asyncio.CancelledError):
+            # 调用方中途放弃（如页面重跑），与网关错误分开计数
+            status = "cancelled"
+            raise
+        except Exception:
+            if status.startswith("2"):
+                status = "error"
+            raise
+        finally:
+            metrics.observe("llm_request_duration_seconds", time.monotonic() - started, **labels)
+            metrics.inc("llm_requests_total", status=status, **labels)
+
+        finished = time.monotonic()
+        completion_tokens = (usage or {}).get("completion_tokens") or estimate_tokens("".join(content_parts))
+        prompt_tokens = (usage or {}).get("prompt_tokens") or sum(
+            estimate_tokens(message.get("content") or "") for message in messages
+        )
+        metrics.inc("llm_tokens_total", prompt_tokens, type="prompt", **labels)
+        metrics.inc("llm_tokens_total", completion_tokens, type="completion", **labels)
+        generation_seconds = finished - first_token_at if first_token_at else 0
+        self.history.append({
+            "model": model,
+            "time_to_first_token": round(first_token_at - started, 3) if first_token_at else None,
+            "duration": round(finished - started, 3),
+            "completion_tokens": completion_tokens,
+            "tokens_per_second": round(completion_tokens / generation_seconds, 1) if generation_seconds else None
+        })
+
+    async def chat(self, messages: List[Dict], model: str, **params) -> str:
+        parts = [delta async for delta in self.stream_chat(messages, model, **params)]
+        return "".join(parts)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def stats(self) -> Dict:
+        """最近请求的平均首 token 延迟与生成速度"""
+        records = list(self.history)
+        ttft = [r["time_to_first_token"] for r in records if r["time_to_first_token"] is not None]
+        speed = [r["tokens_per_second"] for r in records if r["tokens_per_second"] is not None]
+        return {
+            "base_url": self.base_url,
+            "requests": len(records),
+            "avg_time_to_first_token": round(sum(ttft) / len(ttft), 3) if ttft else None,
+            "avg_tokens_per_second": round(sum(speed) / len(speed), 1) if speed else None
+        }
+
+_clients: Dict[tuple, AsyncChatClient] = {}
+_clients_lock = threading.Lock()
+
+def get_chat_client(api_key: str, base_url: str = DEFAULT_BASE_URL, **timeouts) -> AsyncChatClient:
+    """按网关地址、密钥与超时共享客户端，复用其连接池与性能记录"""
+    key = (api_key, base_url, tuple(sorted(timeouts.items())))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = AsyncChatClient(api_key, base_url=base_url, **timeouts)
+        return _clients[key]
@@ -0,0 +1,340 @@
+# llm_pool.py
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from modules import metrics
+from modules.llm_client import DEFAULT_BASE_URL, AsyncChatClient, LLMRequestError, get_chat_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 20.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60.0
+DEFAULT_HEDGE_MIN_DELAY = 2.0
+# 估算首 token 延迟 p95 所需的最少样本，样本不足时不发对冲请求
+HEDGE_MIN_SAMPLES = 10
+TIMEOUT_KEYS = ("connect_timeout", "read_timeout", "request_timeout")
+
+class LLMUnavailableError(Exception):
+    """所有端点都处于熔断状态"""
+
+def is_retryable(error: BaseException) -> bool:
+    """429、5xx、连接错误与超时值得退避或换端点重试；其余错误（如 400）重试也不会成功"""
+    if isinstance(error, LLMRequestError):
+        return error.status == 429 or error.status >= 500
+    import aiohttp
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次后熔断 reset_timeout 秒，之后放行一个试探请求，成功即恢复"""
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self.probing)
+
+    def on_start(self):
+        if self.state == "half-open":
+            self.probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> bool:
+        """记录一次失败，返回本次是否（重新）熔断"""
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def release(self):
+        """请求被取消或因请求本身的问题失败，不影响端点健康判断"""
+        self.probing = False
+
+class Endpoint:
+    """一个网关 + 模型组合，带权重、并发上限、熔断器与首 token 延迟记录"""
+
+    def __init__(self, name: str, client: AsyncChatClient, model: str, weight: float,
+                 max_concurrency: int, breaker: CircuitBreaker):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # 包括排队等待并发名额的请求
+        self.in_flight = 0
+        self.first_token_latency = deque(maxlen=200)
+
+    def first_token_p95(self) -> Optional[float]:
+        if len(self.first_token_latency) < HEDGE_MIN_SAMPLES:
+            return None
+        samples = sorted(self.first_token_latency)
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    async def stream(self, messages: List[Dict], **params) -> AsyncIterator[str]:
+        """占用一个并发名额发起流式请求，按结果更新熔断器与首 token 延迟"""
+        self.in_flight += 1
+        try:
+            async with self.semaphore:
+                self.breaker.on_start()
+                started = time.monotonic()
+                first = True
+                try:
+                    async for delta in self.client.stream_chat(messages, self.model, **params):
+                        if first:
+                            self.first_token_latency.append(time.monotonic() - started)
+                            first = False
+                        yield delta
+                except (GeneratorExit, asyncio.CancelledError):
+                    self.breaker.release()
+                    raise
+                except Exception as e:
+                    if not is_retryable(e):
+                        self.breaker.release()
+                    elif self.breaker.record_failure():
+                        logger.warning("LLM 端点 %s 熔断 %.0f 秒: %s", self.name, self.breaker.reset_timeout, e)
+                        metrics.inc("llm_circuit_open_total", endpoint=self.client.base_url, model=self.model)
+                    raise
+                self.breaker.record_success()
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        client_stats = self.client.stats()
+        p95 = self.first_token_p95()
+        return {
+            "name": self.name,
+            "model": self.model,
+            "weight": self.weight,
+            "in_flight": f"{self.in_flight}/{self.max_concurrency}",
+            "circuit": self.breaker.state,
+            "requests": client_stats["requests"],
+            "avg_time_to_first_token": client_stats["avg_time_to_first_token"],
+            "p95_time_to_first_token": round(p95, 3) if p95 is not None else None,
+            "avg_tokens_per_second": client_stats["avg_tokens_per_second"]
+        }
+
+async def _next_chunk(stream: AsyncIterator[str]) -> Optional[str]:
+    """取流的下一段，流结束时返回 None（内容段不会是 None）"""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+class EndpointPool:
+    """在多个端点间按权重与空闲并发分配请求
+
+    首段内容到达前的可重试失败会换一个端点重试，没有可换的端点时按 Retry-After 或带抖动的
+    指数退避等待后重试同一端点。开启对冲时，首 token 等待超过端点 p95 后向另一端点发同样的
+    请求，先产出内容的一方胜出，另一方被取消。内容开始产出后的失败不再重试。
+    """
+
+    def __init__(self, endpoints: List[Endpoint], max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE, backoff_max: float = DEFAULT_BACKOFF_MAX,
+                 hedge: bool = False, hedge_min_delay: float = DEFAULT_HEDGE_MIN_DELAY):
+        self.endpoints = endpoints
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+
+    @property
+    def models(self) -> List[str]:
+        return list(dict.fromkeys(endpoint.model for endpoint in self.endpoints))
+
+    def select(self, exclude: Set[Endpoint]) -> Optional[Endpoint]:
+        """在未熔断且不在 exclude 中的端点里选择：优先有空闲并发的，按权重随机；都满时选负载最低的"""
+        candidates = [e for e in self.endpoints if e not in exclude and e.breaker.allow()]
+        if not candidates:
+            return None
+        idle = [e for e in candidates if e.in_flight < e.max_concurrency]
+        if idle:
+            return random.choices(idle, weights=[e.weight for e in idle])[0]
+        return min(candidates, key=lambda e: e.in_flight / (e.max_concurrency * e.weight))
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # full jitter：在 [0, base * 2^attempt] 内均匀取值，避免多个请求同时重试
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _hedge_delay(self, endpoint: Endpoint) -> Optional[float]:
+        if not self.hedge or len(self.endpoints) < 2:
+            return None
+        p95 = endpoint.first_token_p95()
+        return None if p95 is None else max(p95, self.hedge_min_delay)
+
+    async def stream_chat(self, messages: List[Dict], **params) -> AsyncIterator[str]:
+        tried: Set[Endpoint] = set()
+        error: Optional[BaseException] = None
+        for attempt in range(self.max_attempts):
+            endpoint = self.select(tried)
+            if endpoint is None:
+                endpoint = self.select(set())
+                if endpoint is None:
+                    raise LLMUnavailableError("所有 LLM 端点均处于熔断状态") from error
+                if error is not None:
+                    await asyncio.sleep(self.backoff(attempt - 1, error))
+            if error is not None:
+                metrics.inc("llm_retries_total", endpoint=endpoint.client.base_url, model=endpoint.model)
+            tried.add(endpoint)
+            try:
+                stream, first = await self._open(endpoint, messages, params, tried)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                logger.warning("LLM 端点 %s 请求失败，准备重试: %s", endpoint.name, e)
+                error = e
+                continue
+
+            try:
+                if first is not None:
+                    yield first
+                    async for delta in stream:
+                        yield delta
+            finally:
+                await stream.aclose()
+            return
+
+    async def _open(self, endpoint: Endpoint, messages: List[Dict], params: Dict,
+                    tried: Set[Endpoint]) -> Tuple[AsyncIterator[str], Optional[str]]:
+        """发起请求并等到第一段内容，返回 (流, 第一段)；需要时在首 token 超时后对冲"""
+        stream = endpoint.stream(messages, **params)
+        task = asyncio.ensure_future(_next_chunk(stream))
+        delay = self._hedge_delay(endpoint)
+        if delay is not None:
+            done, _ = await asyncio.wait({task}, timeout=delay)
+            backup = None if done else self.select(tried)
+            if backup is not None:
+                tried.add(backup)
+                metrics.inc("llm_hedged_requests_total", endpoint=backup.client.base_url, model=backup.model)
+                backup_stream = backup.stream(messages, **params)
+                return await self._race({
+                    task: stream,
+                    asyncio.ensure_future(_next_chunk(backup_stream)): backup_stream
+                })
+        try:
+            return stream, await task
+        except BaseException:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await stream.aclose()
+            raise
+
+    async def _race(self, streams: Dict[asyncio.Future, AsyncIterator[str]]) -> Tuple[AsyncIterator[str], Optional[str]]:
+        """返回最先成功产出第一段的流，关闭其余的流；全部失败时抛出最后一个错误"""
+        pending = set(streams)
+        error: Optional[BaseException] = None
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+        finally:
+            for task, stream in streams.items():
+                if task is winner:
+                    continue
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await stream.aclose()
+        if winner is None:
+            raise error
+        return streams[winner], winner.result()
+
+    async def chat(self, messages: List[Dict], **params) -> str:
+        parts = [delta async for delta in self.stream_chat(messages, **params)]
+        return "".join(parts)
+
+    def stats(self) -> List[Dict]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+def endpoint_configs(config: Dict) -> List[Dict]:
+    """llm.yaml 中的端点列表；未配置 endpoints 时由顶层 base_url/model 组成单个端点
+
+    端点未写的 api_key、base_url、model 与超时沿用顶层配置。
+    """
+    defaults = {key: config[key] for key in ("api_key", "base_url", "model") + TIMEOUT_KEYS if key in config}
+    result = []
+    for endpoint in config.get("endpoints") or [{}]:
+        merged = dict(defaults, **endpoint)
+        merged.setdefault("base_url", DEFAULT_BASE_URL)
+        merged.setdefault("model", DEFAULT_MODEL)
+        merged.setdefault("name", f"{merged['base_url']} {merged['model']}")
+        result.append(merged)
+    return result
+
+_pools: Dict[str, EndpointPool] = {}
+_pools_lock = threading.Lock()
+
+def get_endpoint_pool(config: Dict) -> EndpointPool:
+    """按端点、重试、对冲与熔断配置共享端点池，熔断状态与延迟记录在页面重跑之间保留"""
+    endpoints = endpoint_configs(config)
+    retry = config.get("retry") or {}
+    hedge = config.get("hedge") or {}
+    breaker = config.get("circuit_breaker") or {}
+    key = json.dumps([endpoints, retry, hedge, breaker], sort_keys=True, default=str)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = EndpointPool(
+                [
+                    Endpoint(
+                        endpoint["name"],
+                        get_chat_client(
+                            endpoint["api_key"],
+                            base_url=endpoint["base_url"],
+                            **{k: endpoint[k] for k in TIMEOUT_KEYS if k in endpoint}
+                        ),
+                        endpoint["model"],
+                        endpoint.get("weight", 1),
+                        endpoint.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+                        CircuitBreaker(
+                            breaker.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD),
+                            breaker.get("reset_timeout", DEFAULT_RESET_TIMEOUT)
+                        )
+                    )
+                    for endpoint in endpoints
+                ],
+                max_attempts=retry.get("max_attempts", DEFAULT_MAX_ATTEMPTS),
+                backoff_base=retry.get("backoff_base", DEFAULT_BACKOFF_BASE),
+                backoff_max=retry.get("backoff_max", DEFAULT_BACKOFF_MAX),
+                hedge=hedge.get("enabled", False),
+                hedge_min_delay=hedge.get("min_delay", DEFAULT_HEDGE_MIN_DELAY)
+            )
+        return _pools[key]
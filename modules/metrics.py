@@ -0,0 +1,241 @@
+# metrics.py
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108
+
+METRIC_HELP = {
+    "k8s_api_request_duration_seconds": "Kubernetes API 请求耗时（流式响应只计到响应头）",
+    "k8s_api_requests_total": "Kubernetes API 请求数，按状态码区分",
+    "k8s_api_response_bytes_total": "Kubernetes API 响应的字节数",
+    "llm_request_duration_seconds": "LLM 请求总耗时",
+    "llm_time_to_first_token_seconds": "LLM 首 token 延迟",
+    "llm_requests_total": "LLM 请求数，按结果区分",
+    "llm_tokens_total": "LLM 令牌用量",
+    "llm_retries_total": "LLM 请求重试次数，按重试所用端点区分",
+    "llm_hedged_requests_total": "首 token 超时后发出的对冲请求数",
+    "llm_circuit_open_total": "LLM 端点熔断次数",
+    "rule_evaluations_total": "本地规则分类次数，按结果区分（hit/low_confidence/miss）",
+    "rule_hits_total": "各本地规则命中次数",
+    "result_store_evictions_total": "共享结果存储因内存上限淘汰的诊断数据数"
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # 最后一格为 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶线性插值估算分位数，不超过实际观测到的最大值"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.max
+                lower = self.buckets[index - 1] if index else 0.0
+                return min(lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+class MetricsRegistry:
+    """进程内的计数器与直方图，按指标名 + 标签聚合；单次记录只是一次加锁的字典更新"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def histogram_summary(self, name: str, group_by: Tuple[str, ...]) -> List[Dict]:
+        """按 group_by 标签合并直方图，返回每组的次数、平均值与估算的 p50/p95"""
+        merged: Dict[tuple, Histogram] = {}
+        with self._lock:
+            for labels, histogram in self._histograms.get(name, {}).items():
+                label_map = dict(labels)
+                key = tuple(label_map.get(label, "") for label in group_by)
+                target = merged.get(key)
+                if target is None:
+                    target = merged[key] = Histogram(histogram.buckets)
+                target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+                target.sum += histogram.sum
+                target.count += histogram.count
+                target.max = max(target.max, histogram.max)
+        rows = []
+        for key, histogram in sorted(merged.items()):
+            row = dict(zip(group_by, key))
+            row.update({
+                "count": histogram.count,
+                "avg_ms": round(histogram.sum / histogram.count * 1000, 1) if histogram.count else None,
+                "p50_ms": round(histogram.quantile(0.5) * 1000, 1) if histogram.count else None,
+                "p95_ms": round(histogram.quantile(0.95) * 1000, 1) if histogram.count else None
+            })
+            rows.append(row)
+        return rows
+
+    def counter_summary(self, name: str, group_by: Tuple[str, ...]) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        with self._lock:
+            for labels, value in self._counters.get(name, {}).items():
+                label_map = dict(labels)
+                key = tuple(label_map.get(label, "") for label in group_by)
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+registry = MetricsRegistry()
+
+def inc(name: str, value: float = 1, **labels):
+    registry.inc(name, value, **labels)
+
+def observe(name: str, value: float, **labels):
+    registry.observe(name, value, **labels)
+
+def k8s_summary() -> List[Dict]:
+    """按集群与操作汇总 Kubernetes API 调用：次数、错误数、耗时与响应字节数"""
+    group_by = ("cluster", "operation")
+    statuses = registry.counter_summary("k8s_api_requests_total", group_by + ("status",))
+    response_bytes = registry.counter_summary("k8s_api_response_bytes_total", group_by)
+    rows = registry.histogram_summary("k8s_api_request_duration_seconds", group_by)
+    for row in rows:
+        key = (row["cluster"], row["operation"])
+        row["errors"] = int(sum(v for k, v in statuses.items() if k[:2] == key and not k[2].startswith("2")))
+        row["response_kb"] = round(response_bytes.get(key, 0) / 1024, 1)
+    return rows
+
+def llm_summary() -> List[Dict]:
+    """按网关与模型汇总 LLM 请求：次数、错误数、耗时、首 token 延迟与令牌用量"""
+    group_by = ("endpoint", "model")
+    statuses = registry.counter_summary("llm_requests_total", group_by + ("status",))
+    tokens = registry.counter_summary("llm_tokens_total", group_by + ("type",))
+    first_token = {
+        (row["endpoint"], row["model"]): row
+        for row in registry.histogram_summary("llm_time_to_first_token_seconds", group_by)
+    }
+    rows = registry.histogram_summary("llm_request_duration_seconds", group_by)
+    for row in rows:
+        key = (row["endpoint"], row["model"])
+        row["errors"] = int(sum(v for k, v in statuses.items() if k[:2] == key and not k[2].startswith("2")))
+        row["ttft_p50_ms"] = first_token.get(key, {}).get("p50_ms")
+        row["prompt_tokens"] = int(tokens.get(key + ("prompt",), 0))
+        row["completion_tokens"] = int(tokens.get(key + ("completion",), 0))
+    return rows
+
+def rule_summary() -> List[Dict]:
+    """各本地规则的命中次数与命中率（占全部分类次数），最后一行为交给 LLM 的次数"""
+    evaluations = registry.counter_summary("rule_evaluations_total", ("result",))
+    total = sum(evaluations.values())
+    if not total:
+        return []
+    hits = registry.counter_summary("rule_hits_total", ("rule",))
+    rows = [
+        {"rule": rule, "hits": int(count), "hit_rate": f"{count / total:.0%}"}
+        for (rule,), count in sorted(hits.items(), key=lambda item: -item[1])
+    ]
+    to_llm = evaluations.get(("miss",), 0) + evaluations.get(("low_confidence",), 0)
+    rows.append({"rule": "（交给 LLM）", "hits": int(to_llm), "hit_rate": f"{to_llm / total:.0%}"})
+    return rows
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int = DEFAULT_METRICS_PORT, host: str = DEFAULT_METRICS_HOST) -> bool:
+    """在后台线程提供 /metrics；进程内只尝试一次，端口被占用时记录警告并返回 False"""
+    global _server, _server_failed
+    with _server_lock:
+        if _server is not None or _server_failed:
+            return _server is not None
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("指标端口 %s:%s 无法监听: %s", host, port, e)
+            _server_failed = True
+            return False
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("指标已在 http://%s:%s/metrics 提供", host, port)
+        return True
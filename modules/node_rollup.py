@@ -0,0 +1,133 @@
+# node_rollup.py
+from collections import Counter
+from typing import Dict, List, Optional
+from modules.llm_client import estimate_tokens
+
+# 值为 True 即异常的节点状况；Ready 相反，非 True 为异常
+PRESSURE_CONDITIONS = ("MemoryPressure", "DiskPressure", "PIDPressure", "NetworkUnavailable")
+# 单个节点上跨多个命名空间的异常 Pod 达到该数，视为可能由节点引起
+DEFAULT_MIN_PODS_PER_NODE = 5
+DEFAULT_TOP_ITEMS = 5
+UNSCHEDULED = "<未调度>"
+
+def node_health(node) -> Dict:
+    """提取节点的异常状况、污点与是否禁止调度；node 为 None 表示节点已不存在"""
+    if node is None:
+        return {"problems": ["NotFound"], "taints": [], "unschedulable": False}
+    problems = []
+    for condition in (node.status.conditions if node.status else None) or []:
+        if condition.type == "Ready":
+            if condition.status != "True":
+                problems.append(f"NotReady({condition.reason or condition.status})")
+        elif condition.type in PRESSURE_CONDITIONS and condition.status == "True":
+            problems.append(condition.type)
+    taints = [f"{taint.key}:{taint.effect}" for taint in (node.spec.taints if node.spec else None) or []]
+    return {"problems": problems, "taints": taints, "unschedulable": bool(node.spec and node.spec.unschedulable)}
+
+def _pod_reason(pod: Dict) -> str:
+    return pod.get("reason") or pod["status"]
+
+def concentrated_nodes(pods: List[Dict], min_pods: int = DEFAULT_MIN_PODS_PER_NODE) -> List[str]:
+    """异常 Pod 不少于 min_pods 个且分属多个命名空间的节点；不需要节点信息，可在读取节点前判断"""
+    namespaces_by_node: Dict[str, set] = {}
+    counts = Counter()
+    for pod in pods:
+        if pod.get("node"):
+            counts[pod["node"]] += 1
+            namespaces_by_node.setdefault(pod["node"], set()).add(pod["namespace"])
+    return [node for node, count in counts.most_common() if count >= min_pods and len(namespaces_by_node[node]) > 1]
+
+def build_rollup(pods: List[Dict], health: Dict[str, Dict], top: int = DEFAULT_TOP_ITEMS,
+                 min_pods: int = DEFAULT_MIN_PODS_PER_NODE) -> Dict:
+    """按 spec.nodeName 聚合异常 Pod 并附上节点状况，得到整次故障的结构化摘要
+
+    health 为 {节点名: node_health(...)}，读取失败的节点不在其中。返回
+    {"total_pods", "node_count", "reasons", "nodes"}；nodes 可疑的在前、再按异常 Pod 数降序，每项含 node、pods、
+    problems、taints、unschedulable、reasons、namespaces 与 suspect（节点自身异常或异常 Pod 扎堆）。
+    """
+    by_node: Dict[str, List[Dict]] = {}
+    for pod in pods:
+        by_node.setdefault(pod.get("node") or UNSCHEDULED, []).append(pod)
+    concentrated = set(concentrated_nodes(pods, min_pods))
+
+    nodes = []
+    for node, node_pods in by_node.items():
+        node_state = health.get(node, {})
+        entry = {
+            "node": node,
+            "pods": len(node_pods),
+            "problems": node_state.get("problems", []),
+            "taints": node_state.get("taints", []),
+            "unschedulable": node_state.get("unschedulable", False),
+            "reasons": Counter(_pod_reason(p) for p in node_pods).most_common(top),
+            "namespaces": Counter(p["namespace"] for p in node_pods).most_common(top)
+        }
+        unhealthy = bool(entry["problems"] or entry["unschedulable"])
+        entry["suspect"] = node != UNSCHEDULED and (unhealthy or node in concentrated)
+        # 节点自身异常的排最前，其次是异常 Pod 扎堆的节点
+        entry["_rank"] = 0 if unhealthy else (1 if entry["suspect"] else 2)
+        nodes.append(entry)
+    nodes.sort(key=lambda n: (n.pop("_rank"), -n["pods"], n["node"]))
+    return {
+        "total_pods": len(pods),
+        "node_count": len(by_node),
+        "reasons": Counter(_pod_reason(p) for p in pods).most_common(top),
+        "nodes": nodes
+    }
+
+def _counts(items) -> str:
+    return "、".join(f"{name}×{count}" for name, count in items)
+
+def format_digest(rollup: Dict, budget_tokens: int) -> str:
+    """把摘要压缩为文本：先写总体情况，再按可疑程度逐个节点追加，超出预算的节点只计入合计"""
+    lines = [
+        f"异常Pod共 {rollup['total_pods']} 个，分布在 {rollup['node_count']} 个节点（含未调度）。",
+        f"主要原因：{_counts(rollup['reasons'])}",
+        "节点明细（自身异常的节点在前，其次是异常Pod扎堆的节点）："
+    ]
+    budget_tokens -= sum(estimate_tokens(line) + 1 for line in lines)
+    omitted_nodes = omitted_pods = 0
+    for node in rollup["nodes"]:
+        parts = [f"- {node['node']}", f"异常Pod {node['pods']}"]
+        if node["problems"]:
+            parts.append("状况: " + ", ".join(node["problems"]))
+        if node["unschedulable"]:
+            parts.append("已禁止调度")
+        if node["taints"]:
+            parts.append("污点: " + ", ".join(node["taints"]))
+        parts.append("原因: " + _counts(node["reasons"]))
+        parts.append("命名空间: " + _counts(node["namespaces"]))
+        line = " | ".join(parts)
+        cost = estimate_tokens(line) + 1
+        if cost > budget_tokens:
+            omitted_nodes += 1
+            omitted_pods += node["pods"]
+            continue
+        lines.append(line)
+        budget_tokens -= cost
+    if omitted_nodes:
+        lines.append(f"其余 {omitted_nodes} 个节点共 {omitted_pods} 个异常Pod（篇幅所限未列出）")
+    return "\n".join(lines)
+
+def build_rollup_prompt(digest: str) -> str:
+    return f"""以下是 Kubernetes 集群一次故障中，异常 Pod 按所在节点聚合的摘要：
+
+{digest}
+
+请判断这些异常是否由节点层面的问题（节点失联、磁盘/内存/PID 压力、网络、污点驱逐等）引起，给出：
+1. 集群级的根因判断与依据
+2. 受影响的节点、命名空间与业务范围
+3. 按优先级排列的处理步骤
+与节点无关的异常，请指出应单独诊断哪些。"""
+
+def rollup_rows(rollup: Dict, limit: Optional[int] = None) -> List[Dict]:
+    """供表格展示的节点行"""
+    return [{
+        "node": node["node"],
+        "pods": node["pods"],
+        "suspect": "⚠️" if node["suspect"] else "",
+        "problems": ", ".join(node["problems"]),
+        "taints": ", ".join(node["taints"]),
+        "reasons": _counts(node["reasons"]),
+        "namespaces": _counts(node["namespaces"])
+    } for node in rollup["nodes"][:limit]]
@@ -0,0 +1,178 @@
+# pipeline.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from kubernetes.client import ApiClient
+from typing import Dict, Iterator, List, Optional
+from modules.k8s_utils import iter_pods_diagnostic_data
+from modules.llm_analyzer import LLMAnalyzer
+from modules.llm_client import estimate_tokens
+from modules.pod_logs import close_diagnostic_data
+
+logger = logging.getLogger(__name__)
+
+# 批量诊断的默认并发：同时收集的 Pod 数与同时进行的 LLM 请求数
+DEFAULT_COLLECT_CONCURRENCY = 4
+DEFAULT_LLM_CONCURRENCY = 2
+# 限流时为模型回复预留的令牌数
+DEFAULT_COMPLETION_TOKENS = 800
+
+class RateLimiter:
+    """LLM 网关的每分钟请求数/令牌数限流（令牌桶），进程内所有批量任务共用"""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        for name, per_minute in (("requests", requests_per_minute), ("tokens", tokens_per_minute)):
+            if per_minute:
+                # [容量, 当前余量, 每秒补充量]
+                self._buckets[name] = [float(per_minute), float(per_minute), per_minute / 60.0]
+        self._updated = time.monotonic()
+
+    def acquire(self, tokens: int, cancel_event: Optional[threading.Event] = None) -> bool:
+        """阻塞直到配额足够；被取消时返回 False"""
+        wanted = {"requests": 1.0, "tokens": float(tokens)}
+        while True:
+            with self._lock:
+                self._refill()
+                wait_seconds = 0.0
+                for name, (capacity, available, rate) in self._buckets.items():
+                    need = min(wanted[name], capacity)
+                    if available < need:
+                        wait_seconds = max(wait_seconds, (need - available) / rate)
+                if wait_seconds == 0:
+                    for name, bucket in self._buckets.items():
+                        bucket[1] -= min(wanted[name], bucket[0])
+                    return True
+            if cancel_event is not None:
+                if cancel_event.wait(min(wait_seconds, 1.0)):
+                    return False
+            else:
+                time.sleep(min(wait_seconds, 1.0))
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        for bucket in self._buckets.values():
+            bucket[1] = min(bucket[0], bucket[1] + elapsed * bucket[2])
+
+_limiters: Dict[tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(llm_config: Dict) -> RateLimiter:
+    """按网关地址与限额共享限流器，多个会话的批量任务合并计量"""
+    key = (
+        llm_config.get("base_url"),
+        llm_config.get("requests_per_minute"),
+        llm_config.get("tokens_per_minute")
+    )
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(key[1], key[2])
+        return _limiters[key]
+
+class DiagnosisPipeline:
+    """批量诊断流水线：收集诊断数据 → 构建提示 → 限流 → LLM 分析，各阶段跨 Pod 重叠执行
+
+    run() 按完成顺序产出每个 Pod 的结果；cancel() 或提前关闭生成器会停止后续收集与分析。
+    """
+
+    def __init__(self, api_client: ApiClient, analyzer: LLMAnalyzer, llm_config: Dict,
+                 collect_concurrency: int = DEFAULT_COLLECT_CONCURRENCY, force_refresh: bool = False):
+        self.api_client = api_client
+        self.analyzer = analyzer
+        self.collect_concurrency = collect_concurrency
+        self.force_refresh = force_refresh
+        self.llm_concurrency = llm_config.get("max_concurrency", DEFAULT_LLM_CONCURRENCY)
+        self.completion_tokens = llm_config.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+        self.rate_limiter = get_rate_limiter(llm_config)
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self, pods: List[Dict]) -> Iterator[Dict]:
+        results = queue.Queue()
+        analyze_executor = ThreadPoolExecutor(max_workers=self.llm_concurrency)
+        collector = threading.Thread(
+            target=self._collect,
+            args=(pods, analyze_executor, results),
+            name="diagnosis-collector",
+            daemon=True
+        )
+        collector.start()
+        try:
+            for _ in range(len(pods)):
+                while True:
+                    try:
+                        result = results.get(timeout=0.5)
+                        break
+                    except queue.Empty:
+                        if self.cancelled:
+                            return
+                yield result
+        finally:
+            self.cancel()
+            analyze_executor.shutdown(wait=False, cancel_futures=True)
+            # 提前结束时队列中未交给调用方的结果不会再被保存
+            while not results.empty():
+                close_diagnostic_data(results.get_nowait()["diagnostic_data"])
+
+    def _collect(self, pods: List[Dict], analyze_executor: ThreadPoolExecutor, results: queue.Queue):
+        pending = {(pod["namespace"], pod["pod_name"]): pod for pod in pods}
+        started = time.monotonic()
+        try:
+            for pod, data in iter_pods_diagnostic_data(self.api_client, pods, max_pods=self.collect_concurrency):
+                if self.cancelled:
+                    close_diagnostic_data(data)
+                    return
+                pending.pop((pod["namespace"], pod["pod_name"]), None)
+                if "error" in data:
+                    results.put(self._result(pod, data, None, data["error"], started))
+                    continue
+                analyze_executor.submit(self._analyze, pod, data, started, results)
+        except Exception as e:
+            logger.warning("批量收集诊断数据失败: %s", e)
+            for pod in pending.values():
+                results.put(self._result(pod, None, None, f"诊断数据收集失败: {str(e)}", started))
+
+    def _analyze(self, pod: Dict, data: Dict, started: float, results: queue.Queue):
+        # 取消后不再产出的诊断数据在这里关闭，产出的由调用方保存或关闭
+        if self.cancelled:
+            close_diagnostic_data(data)
+            return
+        try:
+            result = self.analyzer.analyze(
+                data,
+                force_refresh=self.force_refresh,
+                before_request=lambda prompt: self.rate_limiter.acquire(
+                    estimate_tokens(prompt) + self.completion_tokens, self._cancelled
+                )
+            )
+            if result is None:
+                close_diagnostic_data(data)
+                return
+            error = result["content"] if result["failed"] else None
+            results.put(self._result(pod, data, result, error, started))
+        except Exception as e:
+            results.put(self._result(pod, data, None, f"分析失败: {str(e)}", started))
+
+    @staticmethod
+    def _result(pod: Dict, data: Optional[Dict], analysis: Optional[Dict], error: Optional[str],
+                started: float) -> Dict:
+        return {
+            "pod": pod,
+            "diagnostic_data": data,
+            "analysis": analysis["content"] if analysis else None,
+            "cached": bool(analysis and analysis["cached"]),
+            "rule": analysis["rule"] if analysis else None,
+            "error": error,
+            "elapsed": round(time.monotonic() - started, 2)
+        }
@@ -0,0 +1,135 @@
+# pod_logs.py
+import tempfile
+import threading
+from typing import Dict, Iterator, Optional, Union
+
+# 单个容器日志的读取上限（字节），同时作为 limit_bytes 交给 apiserver
+DEFAULT_LOG_LIMIT_BYTES = 1024 * 1024
+# 日志超过该大小后从内存转存到临时文件
+SPOOL_MEMORY_BYTES = 256 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+# 原始数据展示时每段日志保留的末尾字节数
+PREVIEW_BYTES = 8 * 1024
+
+class LogBuffer:
+    """按字节流写入的容器日志，小日志留在内存，大日志自动转存到临时文件"""
+
+    def __init__(self):
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES, mode="w+b")
+        self._lock = threading.Lock()
+        self.size = 0
+        self.truncated = False
+
+    def write(self, data: bytes):
+        with self._lock:
+            self._file.seek(0, 2)
+            self._file.write(data)
+            self.size += len(data)
+
+    def _read(self, offset: int, size: int = -1) -> bytes:
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    def iter_lines(self) -> Iterator[str]:
+        offset = 0
+        pending = b""
+        while True:
+            chunk = self._read(offset, READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            offset += len(chunk)
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8", errors="replace")
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+
+    def text(self) -> str:
+        return self._read(0).decode("utf-8", errors="replace")
+
+    def tail_text(self, max_bytes: int) -> str:
+        return self._read(max(self.size - max_bytes, 0)).decode("utf-8", errors="replace")
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def close(self):
+        """关闭缓冲区，转存到磁盘的日志随之删除临时文件；可重复调用"""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "LogBuffer":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+def close_diagnostic_data(data: Optional[Dict]):
+    """关闭诊断数据中的所有日志缓冲区，在诊断数据被丢弃（淘汰、替换或不再保存）时调用"""
+    for logs in (data or {}).get("logs", {}).values():
+        for value in logs.values():
+            if isinstance(value, LogBuffer):
+                value.close()
+
+def log_text(value: Union[str, LogBuffer, None]) -> str:
+    if isinstance(value, LogBuffer):
+        return value.text()
+    return value or ""
+
+def log_tail(value: Union[str, LogBuffer, None], max_bytes: int) -> str:
+    """日志末尾不超过 max_bytes 的部分"""
+    if isinstance(value, LogBuffer):
+        return value.tail_text(max_bytes)
+    return (value or "")[-max_bytes:]
+
+def iter_log_lines(value: Union[str, LogBuffer, None]) -> Iterator[str]:
+    if isinstance(value, LogBuffer):
+        return value.iter_lines()
+    return iter((value or "").splitlines())
+
+def read_pod_log(core_api, pod_name: str, namespace: str, container: str, previous: bool = False,
+                 tail_lines: Optional[int] = 100, limit_bytes: int = DEFAULT_LOG_LIMIT_BYTES,
+                 since_seconds: Optional[int] = None) -> LogBuffer:
+    """流式读取容器日志，不把整个响应预加载为字符串；超过 limit_bytes 的部分丢弃"""
+    resp = core_api.read_namespaced_pod_log(
+        pod_name, namespace,
+        container=container,
+        previous=previous,
+        tail_lines=tail_lines,
+        limit_bytes=limit_bytes,
+        since_seconds=since_seconds,
+        _preload_content=False
+    )
+    buffer = LogBuffer()
+    try:
+        for chunk in resp.stream(READ_CHUNK_BYTES):
+            remaining = limit_bytes - buffer.size
+            buffer.write(chunk[:remaining])
+            if len(chunk) > remaining:
+                buffer.truncated = True
+                break
+    except BaseException:
+        buffer.close()
+        raise
+    finally:
+        resp.release_conn()
+    return buffer
+
+def diagnostic_preview(data: Dict, preview_bytes: int = PREVIEW_BYTES) -> Dict:
+    """把诊断数据中的日志替换为末尾预览，用于页面上的原始数据展示"""
+    preview = dict(data)
+    preview["logs"] = {}
+    for container, logs in data.get("logs", {}).items():
+        preview["logs"][container] = {
+            key: value.tail_text(preview_bytes) if isinstance(value, LogBuffer) else value
+            for key, value in logs.items()
+        }
+    return preview
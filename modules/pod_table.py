@@ -0,0 +1,96 @@
+# pod_table.py
+import math
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import streamlit as st
+
+PAGE_SIZES = (25, 50, 100, 200)
+DEFAULT_PAGE_SIZE = 50
+
+def filter_rows(rows: List[Dict], namespaces: Optional[List[str]] = None,
+                statuses: Optional[List[str]] = None, min_restarts: int = 0) -> List[Dict]:
+    """按命名空间、状态与最少重启次数过滤，条件为空时不过滤"""
+    namespaces = set(namespaces or ())
+    statuses = set(statuses or ())
+    return [
+        row for row in rows
+        if (not namespaces or row["namespace"] in namespaces)
+        and (not statuses or row["status"] in statuses)
+        and (row.get("restart_count") or 0) >= min_restarts
+    ]
+
+def sort_rows(rows: List[Dict], column: str, descending: bool = False) -> List[Dict]:
+    """按列排序，值为 None 的行始终排在最后"""
+    present = [row for row in rows if row.get(column) is not None]
+    missing = [row for row in rows if row.get(column) is None]
+    return sorted(present, key=lambda row: row[column], reverse=descending) + missing
+
+def paginate(rows: List[Dict], page: int, page_size: int) -> Tuple[List[Dict], int]:
+    """返回第 page 页（从 1 开始）的行与总页数"""
+    page_count = max(math.ceil(len(rows) / page_size), 1)
+    page = min(max(page, 1), page_count)
+    start = (page - 1) * page_size
+    return rows[start:start + page_size], page_count
+
+def default_row_key(row: Dict) -> Hashable:
+    """行的身份：优先 uid，否则为命名空间 + Pod 名"""
+    return row.get("uid") or (row["namespace"], row.get("pod_name"))
+
+def paged_table(rows: List[Dict], columns: Dict[str, str], key: str,
+                default_sort: str, default_descending: bool = True,
+                row_key: Callable[[Dict], Hashable] = default_row_key) -> Optional[Dict]:
+    """带筛选、排序、分页与单行选择的表格，返回选中的行（原始字典）或 None
+
+    筛选、排序与分页都在服务端完成，前端每次只收到当前页；columns 为 {字段: 表头}。
+    行需包含 namespace、status 字段，restart_count 可选；row_key 返回行的身份，用于判断当前页是否变化。
+    """
+    namespace_options = sorted({row["namespace"] for row in rows})
+    status_options = sorted({row["status"] for row in rows})
+    # 切换集群或刷新后，去掉已不在选项中的筛选值
+    for state_key, options in ((f"{key}_namespaces", namespace_options), (f"{key}_statuses", status_options)):
+        if state_key in st.session_state:
+            st.session_state[state_key] = [v for v in st.session_state[state_key] if v in options]
+
+    filter_cols = st.columns([3, 3, 2])
+    namespaces = filter_cols[0].multiselect("命名空间", namespace_options, key=f"{key}_namespaces")
+    statuses = filter_cols[1].multiselect("状态", status_options, key=f"{key}_statuses")
+    min_restarts = filter_cols[2].number_input("最少重启次数", min_value=0, step=1, key=f"{key}_min_restarts")
+
+    sort_cols = st.columns([3, 2, 2, 2])
+    fields = list(columns)
+    sort_column = sort_cols[0].selectbox(
+        "排序", fields, index=fields.index(default_sort), format_func=columns.get, key=f"{key}_sort"
+    )
+    descending = sort_cols[1].toggle("降序", value=default_descending, key=f"{key}_descending")
+    page_size = sort_cols[2].selectbox(
+        "每页行数", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key=f"{key}_page_size"
+    )
+
+    visible = sort_rows(filter_rows(rows, namespaces, statuses, min_restarts), sort_column, descending)
+    page_count = max(math.ceil(len(visible) / page_size), 1)
+    # 筛选后总页数变少时，把页码拉回范围内
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    page = sort_cols[3].number_input("页码", min_value=1, max_value=page_count, step=1, key=page_key)
+    page_rows, _ = paginate(visible, page, page_size)
+
+    # 当前页的行（按身份与顺序）变化后清除旧的选择，避免刷新后选中的行号指向另一行
+    table_key = f"{key}_table"
+    view = tuple(row_key(row) for row in page_rows)
+    if st.session_state.get(f"{key}_view") != view:
+        st.session_state[f"{key}_view"] = view
+        st.session_state.pop(table_key, None)
+
+    st.caption(f"共 {len(visible)} 行（筛选前 {len(rows)} 行），第 {page}/{page_count} 页")
+    event = st.dataframe(
+        [{header: row.get(field) for field, header in columns.items()} for row in page_rows],
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=table_key
+    )
+    selected = event.selection.rows
+    if selected and selected[0] < len(page_rows):
+        return page_rows[selected[0]]
+    return None
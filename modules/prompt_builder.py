@@ -0,0 +1,193 @@
+# prompt_builder.py
+import re
+from typing import Dict, List
+from modules.llm_client import estimate_tokens
+from modules.pod_logs import iter_log_lines
+
+# 常见模型的上下文窗口（token），未列出的模型按 DEFAULT_CONTEXT_TOKENS 处理
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+# 默认提示预算上限：更长的提示对诊断帮助有限，却明显拖慢响应、增加成本
+DEFAULT_PROMPT_BUDGET = 6000
+# 为模型回复预留的 token
+COMPLETION_RESERVE = 1000
+
+# 事件在预算中的占比，其余分给各容器日志
+EVENTS_SHARE = 0.15
+# 同时有历史日志时，历史日志（通常含崩溃堆栈）在单个容器预算中的占比
+PREVIOUS_LOG_SHARE = 0.6
+# 单个日志预算中固定保留给末尾行的占比，其余优先给匹配错误模式的行
+TAIL_SHARE = 0.5
+
+_ANSI_PATTERN = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+_LEADING_TIMESTAMP_PATTERN = re.compile(
+    r"^\[?\d{4}[-/]\d{2}[-/]\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?\]?\s*"
+)
+_ERROR_PATTERN = re.compile(
+    r"error|exception|fatal|panic|traceback|caused by|failed|failure|refused|timed? ?out|"
+    r"oom|out of memory|killed|segfault|denied|not found|unavailable|错误|异常|失败",
+    re.IGNORECASE
+)
+
+def budget_for_model(model: str, configured_budget: int = None) -> int:
+    """按模型上下文窗口确定提示预算，配置值优先但不超过窗口减去回复预留"""
+    context = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    budget = configured_budget or DEFAULT_PROMPT_BUDGET
+    return max(min(budget, context - COMPLETION_RESERVE), 500)
+
+def clean_log_lines(log) -> List[str]:
+    """去掉 ANSI 控制码与行首时间戳，并把连续重复的行折叠为一行加计数；log 可为字符串或 LogBuffer"""
+    lines = []
+    previous = None
+    repeat = 0
+    for raw_line in iter_log_lines(log):
+        line = _LEADING_TIMESTAMP_PATTERN.sub("", _ANSI_PATTERN.sub("", raw_line)).rstrip()
+        if not line:
+            continue
+        if line == previous:
+            repeat += 1
+            continue
+        if previous is not None:
+            lines.append(previous if repeat == 1 else f"{previous}  (重复 {repeat} 次)")
+        previous = line
+        repeat = 1
+    if previous is not None:
+        lines.append(previous if repeat == 1 else f"{previous}  (重复 {repeat} 次)")
+    return lines
+
+def _line_costs(lines: List[str]) -> List[int]:
+    return [estimate_tokens(line) + 1 for line in lines]
+
+def condense_lines(lines: List[str], budget_tokens: int) -> str:
+    """把清洗后的日志行压缩到预算内：保留末尾若干行，剩余预算从新到旧保留匹配错误模式的行"""
+    if not lines or budget_tokens <= 0:
+        return ""
+    costs = _line_costs(lines)
+    if sum(costs) <= budget_tokens:
+        return "\n".join(lines)
+
+    keep = set()
+    remaining = budget_tokens
+    tail_budget = budget_tokens * TAIL_SHARE
+    for i in range(len(lines) - 1, -1, -1):
+        if costs[i] > tail_budget:
+            break
+        keep.add(i)
+        tail_budget -= costs[i]
+        remaining -= costs[i]
+
+    tail_start = min(keep, default=len(lines))
+    for i in range(tail_start - 1, -1, -1):
+        if costs[i] <= remaining and _ERROR_PATTERN.search(lines[i]):
+            keep.add(i)
+            remaining -= costs[i]
+
+    # 错误行之外仍有余量时继续向前延长末尾
+    for i in range(tail_start - 1, -1, -1):
+        if i in keep:
+            continue
+        if costs[i] > remaining:
+            break
+        keep.add(i)
+        remaining -= costs[i]
+
+    if not keep:
+        # 单行就超出预算时保留最后一行的末尾部分
+        return "..." + lines[-1][-budget_tokens * 4:]
+
+    output = []
+    last = -1
+    for i in sorted(keep):
+        if i != last + 1:
+            output.append(f"... (省略 {i - last - 1} 行)")
+        output.append(lines[i])
+        last = i
+    return "\n".join(output)
+
+def condense_log(text: str, budget_tokens: int) -> str:
+    return condense_lines(clean_log_lines(text), budget_tokens)
+
+def fair_share(needs: Dict[str, int], total: int) -> Dict[str, int]:
+    """按需求从小到大分配预算：需求小的拿满，省下的额度平分给其余各项"""
+    shares = {}
+    remaining = max(total, 0)
+    pending = sorted(needs.items(), key=lambda item: item[1])
+    for index, (key, need) in enumerate(pending):
+        share = min(need, remaining // (len(pending) - index))
+        shares[key] = share
+        remaining -= share
+    return shares
+
+def format_events(events: List[Dict], budget_tokens: int) -> List[str]:
+    """事件按 类型/原因/消息 去重并累加次数，超出预算的部分丢弃"""
+    merged = {}
+    for event in events:
+        key = (event.get("type"), event.get("reason"), event.get("message"))
+        if key in merged:
+            merged[key]["count"] += event.get("count") or 1
+        else:
+            merged[key] = {"event": event, "count": event.get("count") or 1}
+
+    lines = []
+    for item in merged.values():
+        event = item["event"]
+        line = f"- [{event.get('last_time')}] {event.get('type')}/{event.get('reason')}: {event.get('message')}"
+        if item["count"] > 1:
+            line += f" (×{item['count']})"
+        cost = estimate_tokens(line) + 1
+        if cost > budget_tokens:
+            break
+        lines.append(line)
+        budget_tokens -= cost
+    return lines
+
+def build_prompt(data: Dict, budget_tokens: int) -> str:
+    """在 token 预算内构建分析提示：预算按事件、各容器、当前/历史日志分配，未用完的额度顺延"""
+    basic = data["basic"]
+    header = f"""分析Kubernetes Pod异常：
+
+Pod状态：{basic['status']}
+重启次数：{basic['restart_count']}
+所在节点：{basic['node']}
+
+最近事件："""
+    footer = "\n\n请分析可能原因并提供解决步骤："
+    remaining = budget_tokens - estimate_tokens(header) - estimate_tokens(footer)
+
+    event_lines = format_events(data.get("events", []), int(remaining * EVENTS_SHARE))
+    prompt = header + "".join(f"\n{line}" for line in event_lines)
+    remaining -= sum(estimate_tokens(line) + 1 for line in event_lines)
+
+    cleaned = {
+        ctr: (clean_log_lines(logs.get("current")), clean_log_lines(logs.get("previous")))
+        for ctr, logs in data.get("logs", {}).items()
+    }
+    needs = {ctr: sum(_line_costs(current)) + sum(_line_costs(previous)) for ctr, (current, previous) in cleaned.items()}
+    section_overhead = 20
+    shares = fair_share(needs, remaining - section_overhead * len(cleaned))
+
+    for ctr, logs in data.get("logs", {}).items():
+        current_lines, previous_lines = cleaned[ctr]
+        container_budget = shares[ctr]
+        current_need = sum(_line_costs(current_lines))
+        previous_budget = 0
+        if previous_lines:
+            previous_budget = max(int(container_budget * PREVIOUS_LOG_SHARE), container_budget - current_need)
+        previous_text = condense_lines(previous_lines, previous_budget)
+        current_text = condense_lines(current_lines, container_budget - estimate_tokens(previous_text))
+
+        section = f"\n\n容器 {ctr} 日志："
+        section += f"\n当前日志：\n{current_text}"
+        if previous_text:
+            section += f"\n历史日志：\n{previous_text}"
+        if logs.get("error"):
+            section += f"\n日志获取失败：{logs['error']}"
+        prompt += section
+
+    return prompt + footer
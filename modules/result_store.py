@@ -0,0 +1,249 @@
+# result_store.py
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterable, Optional, Tuple
+from modules import metrics
+from modules.pod_logs import SPOOL_MEMORY_BYTES, LogBuffer, close_diagnostic_data
+from modules.snapshot_store import ABNORMAL_PODS, APPLICATIONS, SUMMARY, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_LIMIT_MB = 512
+# 诊断数据的复用时限（秒），超过后重新收集
+DEFAULT_PAYLOAD_MAX_AGE = 300
+
+class Record(Mapping):
+    """只读的紧凑记录：字段存放在 __slots__ 中，取值重复度高的字符串字段经 sys.intern 共用同一对象
+
+    实现了只读的 Mapping 接口，现有按字典读取（record["namespace"]、record.get("reason")）的代码无需修改；
+    记录在各会话之间共享，不允许修改。
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: frozenset = frozenset()
+
+    def __init__(self, data: Mapping):
+        for field in self.FIELDS:
+            value = data.get(field)
+            if field in self.INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 为只读记录")
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+class PodRecord(Record):
+    FIELDS = ("namespace", "pod_name", "status", "uid", "node", "restart_count",
+              "owner_kind", "owner_name", "reason", "exit_code", "top_event_reason")
+    INTERNED = frozenset({"namespace", "status", "node", "owner_kind", "owner_name", "reason", "top_event_reason"})
+    __slots__ = FIELDS
+
+class ApplicationRecord(Record):
+    FIELDS = ("name", "namespace", "kind", "creation_time")
+    INTERNED = frozenset({"namespace", "kind"})
+    __slots__ = FIELDS
+
+class ClusterStatsRecord(Record):
+    FIELDS = ("cluster_name", "status", "timestamp", "nodes", "pods", "deployments", "statefulsets", "error")
+    INTERNED = frozenset({"cluster_name", "status"})
+    __slots__ = FIELDS
+
+RECORD_TYPES = {ABNORMAL_PODS: PodRecord, APPLICATIONS: ApplicationRecord, SUMMARY: ClusterStatsRecord}
+
+def _split_payload(kind: str, payload) -> Tuple[list, Dict]:
+    """快照内容拆为 (记录列表, 附带的错误信息)，与页面写入快照时的格式对应"""
+    if kind == APPLICATIONS:
+        return payload["applications"], payload.get("errors") or {}
+    if kind == SUMMARY:
+        return [payload], {}
+    return payload, {}
+
+def records_size(records: Iterable[Record]) -> int:
+    """记录列表占用的大致字节数，共用的字符串只计一次"""
+    total = 0
+    seen = set()
+    for record in records:
+        total += sys.getsizeof(record)
+        for field in record.FIELDS:
+            value = getattr(record, field)
+            if value is not None and id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+def payload_size(data: Dict) -> int:
+    """诊断数据占用的大致内存字节数；超出内存阈值、已转存到临时文件的日志只计内存部分"""
+    total = 1024
+    for event in data.get("events", []):
+        total += 200 + len(event.get("message") or "")
+    for logs in data.get("logs", {}).values():
+        for value in logs.values():
+            if isinstance(value, LogBuffer):
+                total += min(value.size, SPOOL_MEMORY_BYTES)
+            elif isinstance(value, str):
+                total += sys.getsizeof(value)
+    return total
+
+class ResultStore:
+    """进程内各会话共享的扫描结果与诊断数据
+
+    扫描结果（异常 Pod、应用列表、集群概览）按集群与类型各保留最新一份紧凑记录，与快照库的版本号对应，
+    快照库有新版本时才重新解析，多个会话读取同一份元组而不是各自的字典副本。诊断数据按 LRU 保存，
+    总占用超过 memory_limit_bytes 时淘汰最久未使用的诊断数据。
+    memory_limit_bytes 只约束这里保存的内容，不包含集群 informer 缓存中的完整对象，
+    后者按闲置时限淘汰（见 informer.evict_idle_caches）。
+    """
+
+    def __init__(self, memory_limit_bytes: int = DEFAULT_MEMORY_LIMIT_MB * 1024 * 1024,
+                 payload_max_age: float = DEFAULT_PAYLOAD_MAX_AGE):
+        self.memory_limit_bytes = memory_limit_bytes
+        self.payload_max_age = payload_max_age
+        self._lock = threading.Lock()
+        # {(集群, 类型): {"version", "created_at", "items", "errors", "size"}}
+        self._lists: Dict[Tuple[str, str], Dict] = {}
+        # {键: (写入时间, 诊断数据, 大小)}，按最近使用排序
+        self._payloads: "OrderedDict[tuple, Tuple[float, Dict, int]]" = OrderedDict()
+        self._list_bytes = 0
+        self._payload_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, cluster: str, kind: str, payload, version: Optional[int] = None,
+            created_at: Optional[float] = None) -> Dict:
+        """以快照格式的内容替换集群某类结果，返回 {"version", "created_at", "items", "errors"}"""
+        raw_items, errors = _split_payload(kind, payload)
+        record_type = RECORD_TYPES[kind]
+        items = tuple(record_type(item) for item in raw_items)
+        entry = {
+            "version": version,
+            "created_at": created_at or time.time(),
+            "items": items,
+            "errors": errors,
+            "size": records_size(items)
+        }
+        with self._lock:
+            previous = self._lists.get((cluster, kind))
+            # 并发写入时保留版本较新的一份
+            if previous is not None and version is not None and (previous["version"] or 0) > version:
+                return previous
+            self._list_bytes += entry["size"] - (previous["size"] if previous else 0)
+            self._lists[(cluster, kind)] = entry
+            self._evict()
+        return entry
+
+    def latest(self, snapshots: SnapshotStore, cluster: str, kind: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """取集群某类结果的最新版本：与快照库最新版本一致时直接返回共享的记录，否则解析一次快照并替换
+
+        快照库中没有 max_age 秒内的快照时返回 None。
+        """
+        head = snapshots.latest_version(cluster, kind, max_age)
+        if head is None:
+            return None
+        with self._lock:
+            entry = self._lists.get((cluster, kind))
+            if entry is not None and entry["version"] == head[0]:
+                return entry
+        snapshot = snapshots.latest(cluster, kind, max_age)
+        if snapshot is None:
+            return None
+        return self.put(cluster, kind, snapshot["payload"], snapshot["version"], snapshot["created_at"])
+
+    def publish(self, snapshots: SnapshotStore, cluster: str, kind: str, payload) -> Dict:
+        """把实时扫描的结果写入快照库，并作为新版本供所有会话共享"""
+        version = snapshots.put(cluster, kind, payload)
+        return self.put(cluster, kind, payload, version)
+
+    def get_payload(self, key: tuple) -> Optional[Dict]:
+        """未过期的诊断数据；命中时移到 LRU 末尾"""
+        with self._lock:
+            saved = self._payloads.get(key)
+            if saved is None or time.time() - saved[0] > self.payload_max_age:
+                if saved is not None:
+                    self._drop_payload(key)
+                self.misses += 1
+                return None
+            self._payloads.move_to_end(key)
+            self.hits += 1
+            return saved[1]
+
+    def put_payload(self, key: tuple, data: Dict):
+        size = payload_size(data)
+        with self._lock:
+            if key in self._payloads:
+                if self._payloads[key][1] is data:
+                    self._payloads.move_to_end(key)
+                    return
+                self._drop_payload(key)
+            self._payloads[key] = (time.time(), data, size)
+            self._payload_bytes += size
+            self._evict()
+
+    def _drop_payload(self, key: tuple):
+        _, data, size = self._payloads.pop(key)
+        self._payload_bytes -= size
+        # 过期、替换或淘汰的诊断数据不再共享，关闭日志缓冲区以及时删除转存的临时文件；
+        # 按 LRU 刚被读取的数据排在最后，正在展示的数据不会先被淘汰
+        close_diagnostic_data(data)
+
+    def _evict(self):
+        # 最近写入的一份不淘汰：调用方写入后随即要使用，淘汰会关闭其日志缓冲区
+        while len(self._payloads) > 1 and self._list_bytes + self._payload_bytes > self.memory_limit_bytes:
+            self._drop_payload(next(iter(self._payloads)))
+            self.evictions += 1
+            metrics.inc("result_store_evictions_total")
+        if self._list_bytes > self.memory_limit_bytes:
+            logger.warning("共享扫描结果占用 %.1f MB，已超过内存上限 %.1f MB",
+                           self._list_bytes / 1048576, self.memory_limit_bytes / 1048576)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "memory_mb": round((self._list_bytes + self._payload_bytes) / 1048576, 2),
+                "memory_limit_mb": round(self.memory_limit_bytes / 1048576, 2),
+                "result_sets": len(self._lists),
+                "records": sum(len(entry["items"]) for entry in self._lists.values()),
+                "records_mb": round(self._list_bytes / 1048576, 2),
+                "payloads": len(self._payloads),
+                "payloads_mb": round(self._payload_bytes / 1048576, 2),
+                "payload_hits": self.hits,
+                "payload_misses": self.misses,
+                "evictions": self.evictions
+            }
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+def get_result_store(config: Dict) -> ResultStore:
+    """进程内唯一的共享结果存储；修改配置后调整上限，已保存的内容保留"""
+    global _store
+    memory_limit = int(config.get("memory_limit_mb", DEFAULT_MEMORY_LIMIT_MB) * 1024 * 1024)
+    payload_max_age = config.get("payload_max_age", DEFAULT_PAYLOAD_MAX_AGE)
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore(memory_limit, payload_max_age)
+        elif (_store.memory_limit_bytes, _store.payload_max_age) != (memory_limit, payload_max_age):
+            with _store._lock:
+                _store.memory_limit_bytes = memory_limit
+                _store.payload_max_age = payload_max_age
+                _store._evict()
+        return _store
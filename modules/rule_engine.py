@@ -0,0 +1,189 @@
+# rule_engine.py
+import json
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from modules import metrics
+from modules.pod_logs import log_tail
+
+logger = logging.getLogger(__name__)
+
+# 规则置信度不低于该值时直接给出结论，不再调用 LLM
+DEFAULT_MIN_CONFIDENCE = 0.8
+DEFAULT_RULE_CONFIDENCE = 0.9
+# 每段日志只匹配末尾这么多字节
+DEFAULT_LOG_TAIL_BYTES = 16 * 1024
+# 依据中每条匹配文本保留的字符数
+EVIDENCE_CHARS = 200
+
+# 精确匹配的字段与按正则匹配的字段
+EXACT_FIELDS = ("status", "reasons", "exit_codes")
+PATTERN_FIELDS = ("events", "logs")
+FIELD_LABELS = {"status": "Pod状态", "reasons": "容器原因", "exit_codes": "退出码", "events": "事件", "logs": "日志"}
+
+class RuleConfigError(ValueError):
+    pass
+
+class Rule:
+    """一条故障规则：match 中各字段同时满足才算命中，同一字段内的多个取值满足其一即可"""
+
+    __slots__ = ("id", "title", "confidence", "cause", "fix", "exact", "patterns")
+
+    def __init__(self, spec: Dict):
+        self.id = spec.get("id")
+        match = spec.get("match") or {}
+        if not self.id or not match:
+            raise RuleConfigError(f"规则缺少 id 或 match: {spec}")
+        unknown = set(match) - set(EXACT_FIELDS) - set(PATTERN_FIELDS)
+        if unknown:
+            raise RuleConfigError(f"规则 {self.id} 含未知的匹配字段: {', '.join(sorted(unknown))}")
+        self.title = spec.get("title") or self.id
+        self.confidence = float(spec.get("confidence", DEFAULT_RULE_CONFIDENCE))
+        self.cause = (spec.get("cause") or "").strip()
+        self.fix = (spec.get("fix") or "").strip()
+        self.exact = {
+            field: {str(value) for value in _as_list(match[field])} for field in EXACT_FIELDS if field in match
+        }
+        try:
+            self.patterns = {
+                field: re.compile("|".join(f"(?:{p})" for p in _as_list(match[field])), re.IGNORECASE)
+                for field in PATTERN_FIELDS if field in match
+            }
+        except re.error as e:
+            raise RuleConfigError(f"规则 {self.id} 的正则无效: {e}") from e
+
+    def match(self, facts: Dict[str, List[str]]) -> Optional[List[Tuple[str, str]]]:
+        """命中时返回依据 [(字段, 匹配的内容)]，否则返回 None"""
+        evidence = []
+        for field, values in self.exact.items():
+            hit = next((value for value in facts[field] if value in values), None)
+            if hit is None:
+                return None
+            evidence.append((field, hit))
+        for field, pattern in self.patterns.items():
+            hit = next((text for text in facts[field] if pattern.search(text)), None)
+            if hit is None:
+                return None
+            evidence.append((field, hit[:EVIDENCE_CHARS]))
+        return evidence
+
+def _as_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+def diagnostic_facts(diagnostic_data: Dict, log_tail_bytes: int = DEFAULT_LOG_TAIL_BYTES) -> Dict[str, List[str]]:
+    """从 get_pod_diagnostic_data 的结果中取出规则匹配用的文本"""
+    basic = diagnostic_data.get("basic", {})
+    reasons, exit_codes = [], []
+    for value in [basic.get("reason")] + [
+        reason for container in basic.get("containers", []) for reason in (container["reason"], container["last_reason"])
+    ]:
+        if value:
+            reasons.append(value)
+    for value in [basic.get("exit_code")] + [
+        code for container in basic.get("containers", []) for code in (container["exit_code"], container["last_exit_code"])
+    ]:
+        if value is not None:
+            exit_codes.append(str(value))
+    logs = []
+    for container_logs in diagnostic_data.get("logs", {}).values():
+        for kind in ("previous", "current"):
+            text = log_tail(container_logs.get(kind), log_tail_bytes)
+            if text:
+                logs.extend(line for line in text.splitlines() if line.strip())
+    return {
+        "status": [basic["status"]] if basic.get("status") else [],
+        "reasons": reasons,
+        "exit_codes": exit_codes,
+        "events": [f"{e.get('reason') or ''}: {e.get('message') or ''}" for e in diagnostic_data.get("events", [])],
+        "logs": logs
+    }
+
+class RuleSet:
+    """预编译的规则集，在调用 LLM 之前对诊断数据做本地分类
+
+    事件与日志两类文本先用合并了所有规则正则的一个模式整体扫描，没有任何命中时直接跳过依赖该字段的规则，
+    常见的「无规则命中」只需每类文本扫描一遍。
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.min_confidence = float(config.get("min_confidence", DEFAULT_MIN_CONFIDENCE))
+        self.log_tail_bytes = int(config.get("log_tail_bytes", DEFAULT_LOG_TAIL_BYTES))
+        self.rules = [Rule(spec) for spec in config.get("rules") or []]
+        duplicated = {rule.id for rule in self.rules if sum(r.id == rule.id for r in self.rules) > 1}
+        if duplicated:
+            raise RuleConfigError(f"规则 id 重复: {', '.join(sorted(duplicated))}")
+        self._prefilters = {}
+        for field in PATTERN_FIELDS:
+            sources = [rule.patterns[field].pattern for rule in self.rules if field in rule.patterns]
+            if sources:
+                self._prefilters[field] = re.compile("|".join(f"(?:{s})" for s in sources), re.IGNORECASE)
+
+    def classify(self, diagnostic_data: Dict) -> Optional[Dict]:
+        """返回置信度最高的命中规则给出的结论；没有规则命中或置信度不足时返回 None，由 LLM 分析
+
+        结论为 {"rule", "title", "confidence", "cause", "fix", "evidence"}。每次分类按结果计入
+        rule_evaluations_total，命中的规则计入 rule_hits_total。
+        """
+        if not self.enabled or not self.rules:
+            return None
+        facts = diagnostic_facts(diagnostic_data, self.log_tail_bytes)
+        # 合并模式在整段文本上未命中的字段，依赖它的规则都不可能命中
+        skipped = {
+            field for field, prefilter in self._prefilters.items()
+            if not prefilter.search("\n".join(facts[field]))
+        }
+        best = None
+        for rule in self.rules:
+            if skipped.intersection(rule.patterns) or (best is not None and rule.confidence <= best[0].confidence):
+                continue
+            evidence = rule.match(facts)
+            if evidence is not None:
+                best = (rule, evidence)
+
+        if best is None:
+            metrics.inc("rule_evaluations_total", result="miss")
+            return None
+        rule, evidence = best
+        if rule.confidence < self.min_confidence:
+            metrics.inc("rule_evaluations_total", result="low_confidence")
+            return None
+        metrics.inc("rule_evaluations_total", result="hit")
+        metrics.inc("rule_hits_total", rule=rule.id)
+        return {
+            "rule": rule.id,
+            "title": rule.title,
+            "confidence": rule.confidence,
+            "cause": rule.cause,
+            "fix": rule.fix,
+            "evidence": evidence
+        }
+
+def format_verdict(verdict: Dict) -> str:
+    """把规则结论渲染为与 LLM 分析结果同样可直接展示的 Markdown"""
+    lines = [
+        f"**⚙️ {verdict['title']}**（本地规则 `{verdict['rule']}`，置信度 {verdict['confidence']:.0%}）",
+        "",
+        f"**原因**：{verdict['cause']}"
+    ]
+    if verdict["fix"]:
+        lines += ["", "**处理建议**：", verdict["fix"]]
+    lines += ["", "**依据**："] + [f"- {FIELD_LABELS[field]}：`{text}`" for field, text in verdict["evidence"]]
+    return "\n".join(lines)
+
+_rule_sets: Dict[str, RuleSet] = {}
+_rule_sets_lock = threading.Lock()
+
+def get_rule_set(config: Optional[Dict]) -> RuleSet:
+    """按配置内容共享编译好的规则集；配置无效时记录错误并返回空规则集，分析全部交给 LLM"""
+    key = json.dumps(config, sort_keys=True, default=str)
+    with _rule_sets_lock:
+        if key not in _rule_sets:
+            try:
+                _rule_sets[key] = RuleSet(config)
+            except RuleConfigError as e:
+                logger.error("规则配置无效，已停用本地规则: %s", e)
+                _rule_sets[key] = RuleSet()
+        return _rule_sets[key]
@@ -0,0 +1,150 @@
+# search_index.py
+import bisect
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+NGRAM_SIZE = 3
+# 查询词与名称共有的 n-gram 占查询 n-gram 的最低比例，低于该值不视为模糊匹配
+MIN_NGRAM_SIMILARITY = 0.5
+DEFAULT_SEARCH_LIMIT = 200
+
+_TOKEN_SPLIT = re.compile(r"[\s\-_./:]+")
+
+def workload_key(workload: Dict) -> Tuple[str, str, str]:
+    return (workload["kind"], workload["namespace"], workload["name"])
+
+def _ngrams(text: str) -> Set[str]:
+    if len(text) < NGRAM_SIZE:
+        return set()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+def _tokens(text: str) -> Set[str]:
+    return {token for token in _TOKEN_SPLIT.split(text) if token}
+
+class WorkloadSearchIndex:
+    """工作负载名称的 n-gram + 词前缀索引，支持按相关度排序的模糊搜索
+
+    索引文本为 名称/命名空间/类型。update() 对比新旧列表只增删变化的条目，
+    同一列表对象重复传入时直接跳过，页面每次重跑的开销与工作负载总数无关。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, Dict] = {}
+        self._texts: Dict[tuple, str] = {}
+        self._ngram_postings: Dict[str, Set[tuple]] = defaultdict(set)
+        self._token_postings: Dict[str, Set[tuple]] = defaultdict(set)
+        # 有序的词表，前缀查询用二分定位
+        self._sorted_tokens: List[str] = []
+        self._source: Optional[List[Dict]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, workloads: List[Dict]):
+        """用最新的工作负载列表增量更新索引"""
+        with self._lock:
+            if workloads is self._source:
+                return
+            latest = {workload_key(w): w for w in workloads}
+            for key in [k for k in self._entries if k not in latest]:
+                self._remove(key)
+            for key, workload in latest.items():
+                if key not in self._entries:
+                    self._add(key, workload)
+                else:
+                    # 名称未变时只替换条目本身（如创建时间）
+                    self._entries[key] = workload
+            self._source = workloads
+
+    def _add(self, key: tuple, workload: Dict):
+        text = f"{workload['name']} {workload['namespace']} {workload['kind']}".lower()
+        self._entries[key] = workload
+        self._texts[key] = text
+        for gram in _ngrams(text):
+            self._ngram_postings[gram].add(key)
+        for token in _tokens(text):
+            if token not in self._token_postings:
+                bisect.insort(self._sorted_tokens, token)
+            self._token_postings[token].add(key)
+
+    def _remove(self, key: tuple):
+        text = self._texts.pop(key)
+        del self._entries[key]
+        for gram in _ngrams(text):
+            postings = self._ngram_postings[gram]
+            postings.discard(key)
+            if not postings:
+                del self._ngram_postings[gram]
+        for token in _tokens(text):
+            postings = self._token_postings[token]
+            postings.discard(key)
+            if not postings:
+                del self._token_postings[token]
+                index = bisect.bisect_left(self._sorted_tokens, token)
+                del self._sorted_tokens[index]
+
+    def _prefix_matches(self, term: str) -> Set[tuple]:
+        keys = set()
+        index = bisect.bisect_left(self._sorted_tokens, term)
+        while index < len(self._sorted_tokens) and self._sorted_tokens[index].startswith(term):
+            keys |= self._token_postings[self._sorted_tokens[index]]
+            index += 1
+        return keys
+
+    def _ngram_scores(self, term: str) -> Dict[tuple, float]:
+        grams = _ngrams(term)
+        if not grams:
+            return {}
+        hits: Dict[tuple, int] = defaultdict(int)
+        for gram in grams:
+            for key in self._ngram_postings.get(gram, ()):
+                hits[key] += 1
+        return {key: count / len(grams) for key, count in hits.items() if count / len(grams) >= MIN_NGRAM_SIMILARITY}
+
+    def _term_scores(self, term: str) -> Dict[tuple, float]:
+        """单个查询词的候选及得分：名称完全匹配 > 词前缀 > 子串 > n-gram 相似"""
+        scores = self._ngram_scores(term)
+        for key in self._prefix_matches(term):
+            scores[key] = 2.0
+        for key, score in list(scores.items()):
+            name = self._entries[key]["name"].lower()
+            if name == term:
+                scores[key] = 4.0
+            elif name.startswith(term):
+                scores[key] = max(score, 3.0)
+            elif term in self._texts[key]:
+                scores[key] = max(score, 1.5)
+        return scores
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Dict]:
+        """按空白分词，每个词都需匹配；结果按总得分降序、名称长度升序排列"""
+        terms = [term for term in query.lower().split() if term]
+        with self._lock:
+            if not terms:
+                return list(self._entries.values())[:limit]
+            total: Optional[Dict[tuple, float]] = None
+            for term in terms:
+                scores = self._term_scores(term)
+                if total is None:
+                    total = scores
+                else:
+                    total = {key: total[key] + score for key, score in scores.items() if key in total}
+                if not total:
+                    return []
+            ranked = sorted(total.items(), key=lambda item: (-item[1], len(item[0][2]), item[0][2]))
+            return [self._entries[key] for key, _ in ranked[:limit]]
+
+_indexes: Dict[str, WorkloadSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_search_index(cluster_name: str, workloads: List[Dict]) -> WorkloadSearchIndex:
+    """取得集群的搜索索引（进程内各会话共享），并用传入的列表增量更新"""
+    with _indexes_lock:
+        index = _indexes.get(cluster_name)
+        if index is None:
+            index = _indexes[cluster_name] = WorkloadSearchIndex()
+    index.update(workloads)
+    return index
@@ -0,0 +1,102 @@
+# snapshot_store.py
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+DEFAULT_STORE_PATH = Path(__file__).parent.parent / ".cache" / "snapshots.db"
+# 每个集群每类快照保留的版本数
+DEFAULT_KEEP_VERSIONS = 20
+# 页面只使用该时间（秒）内的快照，更旧的快照视为采集进程未运行，改为实时扫描
+DEFAULT_MAX_AGE = 600
+
+# 快照类型
+SUMMARY = "summary"
+ABNORMAL_PODS = "abnormal_pods"
+APPLICATIONS = "applications"
+
+class SnapshotStore:
+    """按集群与类型保存带版本号的扫描快照，采集进程写入、页面读取最新版本
+
+    使用 WAL 模式，采集进程与 Streamlit 进程可以同时读写同一个文件。
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, keep_versions: int = DEFAULT_KEEP_VERSIONS):
+        self.path = Path(path)
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "cluster TEXT NOT NULL, kind TEXT NOT NULL, version INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, payload TEXT NOT NULL, "
+            "PRIMARY KEY (cluster, kind, version))"
+        )
+        self._conn.commit()
+
+    def put(self, cluster: str, kind: str, payload) -> int:
+        """写入新版本快照并清理过旧的版本，返回新版本号
+
+        先以 BEGIN IMMEDIATE 取得数据库写锁再读取最大版本号，采集进程与页面同时写入同一集群时
+        后到者等待前者提交，不会分到相同的版本号。
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT MAX(version) FROM snapshots WHERE cluster = ? AND kind = ?", (cluster, kind)
+            ).fetchone()
+            version = (row[0] or 0) + 1
+            self._conn.execute(
+                "INSERT INTO snapshots (cluster, kind, version, created_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (cluster, kind, version, time.time(), json.dumps(payload, ensure_ascii=False, default=_json_default))
+            )
+            self._conn.execute(
+                "DELETE FROM snapshots WHERE cluster = ? AND kind = ? AND version <= ?",
+                (cluster, kind, version - self.keep_versions)
+            )
+            return version
+
+    def latest_version(self, cluster: str, kind: str, max_age: Optional[float] = None) -> Optional[Tuple[int, float]]:
+        """最新快照的 (版本号, 生成时间)，不读取快照内容；没有 max_age 秒内的快照时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, created_at FROM snapshots WHERE cluster = ? AND kind = ? "
+                "ORDER BY version DESC LIMIT 1",
+                (cluster, kind)
+            ).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return row[0], row[1]
+
+    def latest(self, cluster: str, kind: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """返回最新快照 {"version", "created_at", "payload"}；没有快照或快照早于 max_age 秒时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, created_at, payload FROM snapshots WHERE cluster = ? AND kind = ? "
+                "ORDER BY version DESC LIMIT 1",
+                (cluster, kind)
+            ).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return {"version": row[0], "created_at": row[1], "payload": json.loads(row[2])}
+
+def _json_default(value):
+    # 共享结果中的只读记录按字典写入
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+_stores: Dict[str, SnapshotStore] = {}
+_stores_lock = threading.Lock()
+
+def get_snapshot_store(collector_config: Dict) -> SnapshotStore:
+    path = str(collector_config.get("store_path", DEFAULT_STORE_PATH))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SnapshotStore(path, collector_config.get("keep_versions", DEFAULT_KEEP_VERSIONS))
+        return _stores[path]
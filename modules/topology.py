@@ -0,0 +1,122 @@
+# topology.py
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+# (kind, namespace, name)
+ObjectRef = Tuple[str, str, str]
+
+class OwnershipGraph:
+    """由 ownerReferences 构建的集群所有权图：Pod → ReplicaSet → Deployment、Pod → StatefulSet、Job → CronJob 等
+
+    以 uid 为节点、controller 引用为边，双向均为常数时间查找：
+    owner_chain / root_owner 从对象向上，descendants 从工作负载向下。
+    通过 handler(kind) 注册为 informer 回调，随 ADDED/MODIFIED/DELETED 事件增量维护，不额外访问 apiserver。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, ObjectRef] = {}
+        self._uids: Dict[ObjectRef, str] = {}
+        self._parent: Dict[str, str] = {}
+        self._children: Dict[str, Set[str]] = {}
+        # 由 informer 直接观察到的对象；其余节点只来自子对象的 ownerReferences
+        self._observed: Set[str] = set()
+
+    def clear(self):
+        with self._lock:
+            self._nodes.clear()
+            self._uids.clear()
+            self._parent.clear()
+            self._children.clear()
+            self._observed.clear()
+
+    def handler(self, kind: str):
+        """返回供 ResourceInformer.add_handler 使用的回调；list 返回的对象不带 kind，需由调用方指定"""
+        return lambda event_type, obj: self.handle(event_type, obj, kind)
+
+    def handle(self, event_type: str, obj, kind: str):
+        metadata = obj.metadata
+        ref = (kind, metadata.namespace or "", metadata.name)
+        with self._lock:
+            if event_type == "DELETED":
+                self._observed.discard(metadata.uid)
+                self._set_parent(metadata.uid, None)
+                self._drop_if_orphan(metadata.uid)
+                return
+
+            self._set_node(metadata.uid, ref)
+            self._observed.add(metadata.uid)
+            owner_uid = None
+            for owner in metadata.owner_references or []:
+                if owner.controller:
+                    owner_uid = owner.uid
+                    if owner_uid not in self._nodes:
+                        self._set_node(owner_uid, (owner.kind, metadata.namespace or "", owner.name))
+                    break
+            self._set_parent(metadata.uid, owner_uid)
+
+    def _set_node(self, uid: str, ref: ObjectRef):
+        old = self._nodes.get(uid)
+        if old is not None and old != ref:
+            self._uids.pop(old, None)
+        self._nodes[uid] = ref
+        self._uids[ref] = uid
+
+    def _set_parent(self, uid: str, owner_uid: Optional[str]):
+        old_owner = self._parent.get(uid)
+        if old_owner == owner_uid:
+            return
+        if old_owner is not None:
+            siblings = self._children.get(old_owner)
+            if siblings is not None:
+                siblings.discard(uid)
+                if not siblings:
+                    del self._children[old_owner]
+            self._drop_if_orphan(old_owner)
+        if owner_uid is None:
+            self._parent.pop(uid, None)
+        else:
+            self._parent[uid] = owner_uid
+            self._children.setdefault(owner_uid, set()).add(uid)
+
+    def _drop_if_orphan(self, uid: str):
+        # 未被观察到且不再被任何对象引用的节点可以移除
+        if uid in self._observed or uid in self._children or uid in self._parent:
+            return
+        ref = self._nodes.pop(uid, None)
+        if ref is not None and self._uids.get(ref) == uid:
+            del self._uids[ref]
+
+    # ---------- 查询 ----------
+
+    def uid_of(self, kind: str, namespace: str, name: str) -> Optional[str]:
+        with self._lock:
+            return self._uids.get((kind, namespace, name))
+
+    def owner_chain(self, uid: str) -> List[ObjectRef]:
+        """从对象的直接控制器开始，逐级向上直到顶层控制器"""
+        chain = []
+        with self._lock:
+            current = self._parent.get(uid)
+            while current is not None and len(chain) < 10:
+                chain.append(self._nodes[current])
+                current = self._parent.get(current)
+        return chain
+
+    def root_owner(self, uid: str) -> Optional[ObjectRef]:
+        chain = self.owner_chain(uid)
+        return chain[-1] if chain else None
+
+    def descendants(self, kind: str, namespace: str, name: str, descendant_kind: Optional[str] = None) -> List[ObjectRef]:
+        """工作负载直接或间接拥有的对象，可按类型过滤"""
+        results = []
+        with self._lock:
+            root = self._uids.get((kind, namespace, name))
+            pending = list(self._children.get(root, ())) if root else []
+            while pending:
+                uid = pending.pop()
+                ref = self._nodes[uid]
+                if descendant_kind is None or ref[0] == descendant_kind:
+                    results.append(ref)
+                pending.extend(self._children.get(uid, ()))
+        return results
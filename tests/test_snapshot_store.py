@@ -0,0 +1,28 @@
+import threading
+from modules.snapshot_store import ABNORMAL_PODS, SnapshotStore
+
+def test_concurrent_writers_get_distinct_versions(tmp_path):
+    # 两个连接模拟采集进程与页面进程同时写入同一集群的同一类快照
+    path = tmp_path / "snapshots.db"
+    stores = [SnapshotStore(path, keep_versions=1000), SnapshotStore(path, keep_versions=1000)]
+    rounds = 200
+    barrier = threading.Barrier(len(stores))
+    versions, errors = [], []
+
+    def write(store):
+        barrier.wait()
+        for i in range(rounds):
+            try:
+                versions.append(store.put("c1", ABNORMAL_PODS, [{"round": i}]))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(versions) == list(range(1, len(stores) * rounds + 1))
+    assert stores[0].latest("c1", ABNORMAL_PODS)["version"] == len(stores) * rounds